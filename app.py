@@ -10,10 +10,13 @@ This structure makes the application portable to run on any IDE.
 """
 
 import os
+import json
 import logging
 import hashlib
-from flask import Flask, render_template, request, jsonify, session
+import msgspec
+from flask import Flask, render_template, request, jsonify, session, Response, stream_with_context
 from flask_session import Session
+from werkzeug.utils import secure_filename
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -28,14 +31,44 @@ app.config["SESSION_PERMANENT"] = False
 app.config["SESSION_USE_SIGNER"] = True
 Session(app)
 
+# Upper bound on passwords accepted by one batch analysis request
+app.config["MAX_BATCH_PASSWORDS"] = int(os.environ.get("MAX_BATCH_PASSWORDS", 50000))
+
+# Upper bound on emails accepted by one bulk breach check
+app.config["MAX_BULK_EMAILS"] = int(os.environ.get("MAX_BULK_EMAILS", 10000))
+
+# Upper bound on binary encrypt/decrypt bodies, which are held in memory;
+# larger files go through the streaming /api/encrypt-file endpoints
+app.config["MAX_CRYPTO_BODY_BYTES"] = int(os.environ.get("MAX_CRYPTO_BODY_BYTES", 64 * 1024 * 1024))
+
 # Import models
-from tools.password_analyzer import analyze_password, load_password_model
-from models.leakcheck_integration import check_breach
-from tools.file_integrity import calculate_checksum, verify_checksum
-from tools.encryption_tool import encrypt_text, decrypt_text, available_algorithms
+from tools.password_analyzer import analyze_password, analyze_passwords, init_password_model
+from models.leakcheck_integration import (check_breach_with_deadline, check_breaches_bulk,
+                                          read_emails_csv, BreachLookupTimeout)
+from tools.file_integrity import (calculate_checksum, calculate_checksums, calculate_checksums_stream,
+                                  verify_checksum, archive_manifest, ArchiveTooLarge, algorithm_info,
+                                  recommend_algorithm,
+                                  available_algorithms as available_hash_algorithms)
+from tools.encryption_tool import (encrypt_text, decrypt_text, encrypt_bytes, decrypt_bytes,
+                                   encrypt_stream, decrypt_stream, cached_derive, available_algorithms)
+from tools.crypto_executor import CryptoExecutor, CryptoExecutorBusy
+from tools.kdf import kdf_info
 
-# Initialize password model
-load_password_model()
+# Key derivation and ciphers run in a dedicated process pool with a bounded
+# queue (CRYPTO_WORKERS=0 runs them inline in the request thread). The pool
+# defaults to this web worker's share of the CPUs (cpu_count / WEB_CONCURRENCY);
+# the queue limit and 503 backpressure need threaded web workers
+# (see gunicorn.conf.py) since a sync worker has one request in flight
+crypto_executor = CryptoExecutor(
+    int(os.environ["CRYPTO_WORKERS"]) if os.environ.get("CRYPTO_WORKERS") else None,
+    int(os.environ["CRYPTO_MAX_QUEUE"]) if os.environ.get("CRYPTO_MAX_QUEUE") else None)
+# Derives keys on the pool but caches them in this process, so repeated
+# decryptions reuse a key whichever pool worker derived it
+pooled_derive = cached_derive(crypto_executor.run)
+
+# Initialize password model: 'lazy' (default) loads on first request, 'eager'
+# loads or trains at startup, 'prebuilt' requires an existing artifact
+init_password_model(os.environ.get("PASSWORD_MODEL_STARTUP", "lazy"))
 
 # Main routes (Controller functions)
 @app.route('/')
@@ -69,6 +102,35 @@ def api_analyze_password():
     result = analyze_password(password)
     return jsonify(result)
 
+@app.route('/api/analyze-passwords', methods=['POST'])
+def api_analyze_passwords():
+    """
+    API endpoint to analyze many passwords in one request
+    
+    The pattern search (pattern_entropy, guesses_log10, patterns) is only
+    run when the body sets "patterns": true, keeping the default batch on
+    the vectorized path.
+    """
+    data = request.get_json(silent=True) or {}
+    passwords = data.get('passwords')
+    
+    if not isinstance(passwords, list) or not all(isinstance(p, str) for p in passwords):
+        return jsonify({
+            'error': 'Expected a JSON body with a "passwords" list of strings'
+        }), 400
+    
+    max_batch = app.config["MAX_BATCH_PASSWORDS"]
+    if len(passwords) > max_batch:
+        return jsonify({
+            'error': f'Too many passwords (maximum {max_batch} per request)'
+        }), 413
+    
+    results = analyze_passwords(passwords, patterns=data.get('patterns') is True)
+    return jsonify({
+        'count': len(results),
+        'results': results
+    })
+
 # Dark Web Monitor routes
 @app.route('/dark-web-monitor')
 def dark_web_monitor():
@@ -87,10 +149,16 @@ def api_check_breaches():
         })
     
     try:
-        breaches = check_breach(email)
+        # Runs on the breach I/O pool, so a slow upstream holds this request
+        # thread for at most the lookup deadline
+        breaches = check_breach_with_deadline(email)
+        return Response(msgspec.json.encode({'breaches': breaches}),
+                        mimetype='application/json')
+    except BreachLookupTimeout:
         return jsonify({
-            'breaches': breaches
-        })
+            'error': 'Breach lookup timed out, please try again shortly',
+            'breaches': []
+        }), 504
     except Exception as e:
         logging.error(f"Error checking breaches: {str(e)}")
         return jsonify({
@@ -98,11 +166,57 @@ def api_check_breaches():
             'message': str(e)
         }), 500
 
+@app.route('/api/check-breaches/bulk', methods=['POST'])
+def api_check_breaches_bulk():
+    """
+    API endpoint to check many emails, streaming results as NDJSON
+    
+    Accepts a JSON body with an "emails" list or an uploaded CSV file
+    ("file" field). Each output line is one email's result, written as
+    soon as its lookup finishes.
+    """
+    if 'file' in request.files:
+        try:
+            text = request.files['file'].read().decode('utf-8-sig')
+        except UnicodeDecodeError:
+            return jsonify({'error': 'CSV file must be UTF-8 encoded'}), 400
+        emails = read_emails_csv(text)
+    else:
+        data = request.get_json(silent=True) or {}
+        emails = data.get('emails')
+        if not isinstance(emails, list) or not all(isinstance(e, str) for e in emails):
+            return jsonify({
+                'error': 'Expected a JSON body with an "emails" list of strings or a CSV "file" upload'
+            }), 400
+    
+    max_emails = app.config["MAX_BULK_EMAILS"]
+    if len(emails) > max_emails:
+        return jsonify({
+            'error': f'Too many emails (maximum {max_emails} per request)'
+        }), 413
+    
+    def generate():
+        for result in check_breaches_bulk(emails):
+            yield msgspec.json.encode(result) + b'\n'
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 # File Integrity Checker routes
 @app.route('/file-integrity')
 def file_integrity():
     """File integrity checker page"""
-    return render_template('file_integrity.html')
+    return render_template('file_integrity.html', hash_algorithms=algorithm_info(measure=False))
+
+@app.route('/api/hash-algorithms')
+def api_hash_algorithms():
+    """API endpoint listing hashing algorithms with measured throughput and recommendations"""
+    return jsonify({
+        'algorithms': algorithm_info(),
+        'recommended': {
+            'secure': recommend_algorithm(cryptographic=True),
+            'fastest': recommend_algorithm(cryptographic=False)
+        }
+    })
 
 @app.route('/api/calculate-checksum', methods=['POST'])
 def api_calculate_checksum():
@@ -120,6 +234,11 @@ def api_calculate_checksum():
             'error': 'No file selected'
         }), 400
     
+    if algorithm not in available_hash_algorithms():
+        return jsonify({
+            'error': f'Unsupported algorithm: {algorithm}'
+        }), 400
+    
     try:
         checksum = calculate_checksum(file, algorithm)
         return jsonify({
@@ -134,6 +253,121 @@ def api_calculate_checksum():
             'message': str(e)
         }), 500
 
+@app.route('/api/calculate-checksums', methods=['POST'])
+def api_calculate_checksums():
+    """API endpoint to calculate several file checksums in one pass"""
+    if 'file' not in request.files:
+        return jsonify({
+            'error': 'No file provided'
+        }), 400
+    
+    file = request.files['file']
+    
+    # Repeated "algorithms" fields and/or comma-separated lists
+    algorithms = [name.strip() for value in request.form.getlist('algorithms')
+                  for name in value.split(',') if name.strip()] or ['sha256']
+    
+    if file.filename == '':
+        return jsonify({
+            'error': 'No file selected'
+        }), 400
+    
+    unsupported = [name for name in algorithms if name not in available_hash_algorithms()]
+    if unsupported:
+        return jsonify({
+            'error': f'Unsupported algorithm(s): {", ".join(unsupported)}'
+        }), 400
+    
+    try:
+        checksums = calculate_checksums(file, algorithms)
+        return jsonify({
+            'filename': file.filename,
+            'checksums': checksums
+        })
+    except Exception as e:
+        logging.error(f"Error calculating checksums: {str(e)}")
+        return jsonify({
+            'error': 'Error calculating checksums',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/calculate-checksum/stream', methods=['POST'])
+def api_calculate_checksum_stream():
+    """
+    API endpoint to hash a raw application/octet-stream upload as it arrives
+    
+    The request body is the file itself; algorithms (comma-separated) and
+    an optional filename are given in the query string. The body is hashed
+    while it is received instead of being parsed into request.files first.
+    """
+    algorithms = [name.strip() for value in request.args.getlist('algorithms')
+                  for name in value.split(',') if name.strip()] or ['sha256']
+    filename = request.args.get('filename') or request.headers.get('X-Filename', '')
+    
+    unsupported = [name for name in algorithms if name not in available_hash_algorithms()]
+    if unsupported:
+        return jsonify({
+            'error': f'Unsupported algorithm(s): {", ".join(unsupported)}'
+        }), 400
+    
+    try:
+        checksums, size = calculate_checksums_stream(request.stream, algorithms)
+        return jsonify({
+            'filename': filename,
+            'size': size,
+            'checksums': checksums
+        })
+    except Exception as e:
+        logging.error(f"Error calculating checksums: {str(e)}")
+        return jsonify({
+            'error': 'Error calculating checksums',
+            'message': str(e)
+        }), 500
+
+@app.route('/api/archive-manifest', methods=['POST'])
+def api_archive_manifest():
+    """API endpoint to build a sha256sum-format manifest of an uploaded tar/zip archive"""
+    if 'file' not in request.files:
+        return jsonify({
+            'error': 'No file provided'
+        }), 400
+    
+    file = request.files['file']
+    algorithm = request.form.get('algorithm', 'sha256')
+    
+    if file.filename == '':
+        return jsonify({
+            'error': 'No file selected'
+        }), 400
+    
+    if algorithm not in available_hash_algorithms():
+        return jsonify({
+            'error': f'Unsupported algorithm: {algorithm}'
+        }), 400
+    
+    try:
+        manifest, file_count = archive_manifest(file, algorithm)
+        return jsonify({
+            'filename': file.filename,
+            'algorithm': algorithm,
+            'files': file_count,
+            'manifest': manifest
+        })
+    except ArchiveTooLarge as e:
+        return jsonify({
+            'error': str(e)
+        }), 413
+    except ValueError as e:
+        return jsonify({
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logging.error(f"Error building archive manifest: {str(e)}")
+        return jsonify({
+            'error': 'Error building archive manifest',
+            'message': str(e)
+        }), 500
+
 @app.route('/api/verify-checksum', methods=['POST'])
 def api_verify_checksum():
     """API endpoint to verify file checksum"""
@@ -156,6 +390,11 @@ def api_verify_checksum():
             'error': 'No checksum provided'
         }), 400
     
+    if algorithm not in available_hash_algorithms():
+        return jsonify({
+            'error': f'Unsupported algorithm: {algorithm}'
+        }), 400
+    
     try:
         is_valid, calculated_checksum = verify_checksum(file, provided_checksum, algorithm)
         return jsonify({
@@ -178,9 +417,104 @@ def encryption_tool():
     algorithms = available_algorithms()
     return render_template('encryption_tool.html', algorithms=algorithms)
 
+def crypto_busy_response(error):
+    """503 response telling the client when to retry a rejected crypto request"""
+    response = jsonify({
+        'error': 'Encryption service is busy, please retry shortly',
+        'retry_after': error.retry_after
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+@app.route('/api/crypto-executor')
+def api_crypto_executor():
+    """API endpoint reporting crypto executor queue depth and wait times"""
+    return jsonify(crypto_executor.stats())
+
+def read_binary_body():
+    """
+    Read an application/octet-stream request body into one preallocated buffer
+    
+    Returns:
+        memoryview: The body, or None if it exceeds MAX_CRYPTO_BODY_BYTES
+    """
+    limit = app.config["MAX_CRYPTO_BODY_BYTES"]
+    length = request.content_length
+    if length is None:
+        # Chunked upload: size unknown up front
+        data = request.stream.read(limit + 1)
+        return memoryview(data) if len(data) <= limit else None
+    if length > limit:
+        return None
+    
+    buffer = bytearray(length)
+    view = memoryview(buffer)
+    received = 0
+    while received < length:
+        count = request.stream.readinto(view[received:])
+        if not count:
+            break
+        received += count
+    return view[:received]
+
+def binary_crypto_response(function, *args, **kwargs):
+    """
+    Run encrypt_bytes or decrypt_bytes on the request body and return the
+    result as an application/octet-stream response
+    """
+    password = request.headers.get('X-Encryption-Password', '')
+    if not password:
+        return jsonify({
+            'error': 'No password provided'
+        }), 400
+    
+    data = read_binary_body()
+    if data is None:
+        return jsonify({
+            'error': f'Request body exceeds {app.config["MAX_CRYPTO_BODY_BYTES"]} bytes, '
+                     f'use /api/encrypt-file for large files'
+        }), 413
+    
+    try:
+        result = function(data, password, *args, derive=pooled_derive, **kwargs)
+    except CryptoExecutorBusy as e:
+        return crypto_busy_response(e)
+    except ValueError as e:
+        return jsonify({
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logging.error(f"Error in binary {function.__name__}: {str(e)}")
+        return jsonify({
+            'error': 'Error processing data',
+            'message': str(e)
+        }), 500
+    
+    return Response(result, mimetype='application/octet-stream')
+
+@app.route('/api/kdfs')
+def api_kdfs():
+    """API endpoint listing key derivation functions and their cost profiles"""
+    return jsonify({
+        'kdfs': kdf_info()
+    })
+
 @app.route('/api/encrypt', methods=['POST'])
 def api_encrypt():
-    """API endpoint for encrypting text"""
+    """
+    API endpoint for encrypting text
+    
+    An application/octet-stream body is encrypted as raw bytes instead and
+    answered with the binary message format (see encrypt_bytes); the
+    password goes in the X-Encryption-Password header and the algorithm,
+    kdf and cost profile in the query string.
+    """
+    if request.mimetype == 'application/octet-stream':
+        return binary_crypto_response(encrypt_bytes, request.args.get('algorithm', 'aes'),
+                                      kdf=request.args.get('kdf'),
+                                      profile=request.args.get('profile'))
+    
     text = request.form.get('text', '')
     algorithm = request.form.get('algorithm', 'aes')
     password = request.form.get('password', '')
@@ -196,12 +530,14 @@ def api_encrypt():
         }), 400
     
     try:
-        encrypted_data, salt = encrypt_text(text, password, algorithm)
+        encrypted_data, salt = crypto_executor.run(encrypt_text, text, password, algorithm)
         return jsonify({
             'encrypted': encrypted_data,
             'salt': salt,
             'algorithm': algorithm
         })
+    except CryptoExecutorBusy as e:
+        return crypto_busy_response(e)
     except Exception as e:
         logging.error(f"Error encrypting text: {str(e)}")
         return jsonify({
@@ -211,7 +547,15 @@ def api_encrypt():
 
 @app.route('/api/decrypt', methods=['POST'])
 def api_decrypt():
-    """API endpoint for decrypting text"""
+    """
+    API endpoint for decrypting text
+    
+    An application/octet-stream body is read as a binary message from the
+    octet-stream mode of /api/encrypt and answered with the raw plaintext.
+    """
+    if request.mimetype == 'application/octet-stream':
+        return binary_crypto_response(decrypt_bytes)
+    
     encrypted_data = request.form.get('encrypted', '')
     salt = request.form.get('salt', '')
     algorithm = request.form.get('algorithm', 'aes')
@@ -233,10 +577,12 @@ def api_decrypt():
         }), 400
     
     try:
-        decrypted_text = decrypt_text(encrypted_data, salt, password, algorithm)
+        decrypted_text = decrypt_text(encrypted_data, salt, password, algorithm, derive=pooled_derive)
         return jsonify({
             'decrypted': decrypted_text
         })
+    except CryptoExecutorBusy as e:
+        return crypto_busy_response(e)
     except Exception as e:
         logging.error(f"Error decrypting text: {str(e)}")
         return jsonify({
@@ -244,6 +590,91 @@ def api_decrypt():
             'message': str(e)
         }), 500
 
+def streamed_file_response(chunks, filename):
+    """Stream generated chunks back as an application/octet-stream download"""
+    response = Response(stream_with_context(chunks), mimetype='application/octet-stream')
+    filename = secure_filename(filename)
+    if filename:
+        response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+@app.route('/api/encrypt-file', methods=['POST'])
+def api_encrypt_file():
+    """
+    API endpoint to encrypt a raw application/octet-stream upload as it arrives
+    
+    The request body is the file itself and the response body is the
+    encrypted file, streamed chunk by chunk so memory use does not grow with
+    the file size. The password is given in the X-Encryption-Password header
+    (kept out of URLs and logs); algorithm, kdf, cost profile and filename
+    in the query string.
+    """
+    password = request.headers.get('X-Encryption-Password', '')
+    algorithm = request.args.get('algorithm', 'aes')
+    filename = request.args.get('filename') or request.headers.get('X-Filename', '')
+    
+    if not password:
+        return jsonify({
+            'error': 'No password provided'
+        }), 400
+    
+    try:
+        chunks = encrypt_stream(request.stream, password, algorithm,
+                                derive=pooled_derive,
+                                kdf=request.args.get('kdf'), profile=request.args.get('profile'))
+    except CryptoExecutorBusy as e:
+        return crypto_busy_response(e)
+    except ValueError as e:
+        return jsonify({
+            'error': str(e)
+        }), 400
+    except Exception as e:
+        logging.error(f"Error encrypting file: {str(e)}")
+        return jsonify({
+            'error': 'Error encrypting file',
+            'message': str(e)
+        }), 500
+    
+    return streamed_file_response(chunks, f'{filename}.enc' if filename else '')
+
+@app.route('/api/decrypt-file', methods=['POST'])
+def api_decrypt_file():
+    """
+    API endpoint to decrypt a raw application/octet-stream upload from /api/encrypt-file
+    
+    A wrong password or damaged header is reported with a 400 before any
+    output is sent. Corruption found later aborts the streamed response, so
+    a client must treat an incomplete body as a failed decryption.
+    """
+    password = request.headers.get('X-Encryption-Password', '')
+    filename = request.args.get('filename') or request.headers.get('X-Filename', '')
+    
+    if not password:
+        return jsonify({
+            'error': 'No password provided'
+        }), 400
+    
+    try:
+        chunks = decrypt_stream(request.stream, password,
+                                derive=pooled_derive)
+    except CryptoExecutorBusy as e:
+        return crypto_busy_response(e)
+    except ValueError as e:
+        return jsonify({
+            'error': 'Error decrypting file',
+            'message': str(e)
+        }), 400
+    except Exception as e:
+        logging.error(f"Error decrypting file: {str(e)}")
+        return jsonify({
+            'error': 'Error decrypting file',
+            'message': str(e)
+        }), 500
+    
+    if filename.endswith('.enc'):
+        filename = filename[:-len('.enc')]
+    return streamed_file_response(chunks, filename)
+
 # Error handlers
 @app.errorhandler(404)
 def page_not_found(e):
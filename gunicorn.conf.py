@@ -0,0 +1,26 @@
+"""
+Gunicorn configuration for the Cybersecurity Toolkit
+
+Loaded automatically by `gunicorn main:app` from the project directory.
+
+Workers are threaded (gthread): a request waiting on LeakCheck or on the
+crypto process pool holds one thread instead of a whole worker process, so
+slow upstream calls do not starve password analysis and checksum requests,
+and the crypto executor's bounded queue can push back with 503s.
+
+Environment:
+    WEB_CONCURRENCY   Web worker processes (default: 2)
+    GUNICORN_THREADS  Request threads per worker (default: 8)
+    PORT              Listen port (default: 5000)
+"""
+
+import os
+
+workers = int(os.environ.get('WEB_CONCURRENCY', 2))
+worker_class = 'gthread'
+threads = int(os.environ.get('GUNICORN_THREADS', 8))
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+timeout = 60
+
+# The app sizes per-worker pools (e.g. the crypto executor) from this
+os.environ['WEB_CONCURRENCY'] = str(workers)
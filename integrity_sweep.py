@@ -0,0 +1,71 @@
+"""
+Integrity sweep script for Cybersecurity Toolkit
+
+Builds and verifies sha256sum-format checksum manifests for directory trees.
+A persistent SQLite hash index lets repeated sweeps skip files whose size
+and modification time have not changed, and changed files are hashed by a
+process pool.
+"""
+
+import os
+import sys
+import argparse
+
+
+def parse_arguments():
+    """Parse command line arguments"""
+    parser = argparse.ArgumentParser(description='Build or verify directory checksum manifests')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    manifest_parser = subparsers.add_parser('manifest', help='Write a manifest for a directory')
+    manifest_parser.add_argument('directory', help='Directory to sweep')
+    manifest_parser.add_argument('-o', '--output', help='Manifest file to write (default: stdout)')
+
+    verify_parser = subparsers.add_parser('verify', help='Verify a directory against a manifest')
+    verify_parser.add_argument('directory', help='Directory the manifest paths are relative to')
+    verify_parser.add_argument('manifest', help='Manifest file to check')
+
+    for subparser in (manifest_parser, verify_parser):
+        subparser.add_argument('--algorithm', default='sha256', help='Hashing algorithm (default: sha256)')
+        subparser.add_argument('--index', help='SQLite hash index used to skip unchanged files')
+        subparser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    return parser.parse_args()
+
+
+def main():
+    """Run the integrity sweep"""
+    args = parse_arguments()
+
+    # Add project root to Python path to ensure imports work
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    from tools.file_integrity import build_directory_manifest, verify_directory_manifest
+
+    if args.command == 'manifest':
+        manifest, stats = build_directory_manifest(args.directory, args.algorithm,
+                                                   args.index, args.workers)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(manifest)
+        else:
+            sys.stdout.write(manifest)
+        print(f"{stats['hashed']} hashed, {stats['skipped']} unchanged", file=sys.stderr)
+        return 0
+
+    with open(args.manifest, encoding='utf-8') as f:
+        manifest = f.read()
+    result = verify_directory_manifest(args.directory, manifest, args.algorithm,
+                                       args.index, args.workers)
+    for path in result['ok']:
+        print(f"{path}: OK")
+    for path in result['failed']:
+        print(f"{path}: FAILED")
+    for path in result['missing']:
+        print(f"{path}: MISSING")
+    print(f"{len(result['ok'])} OK, {len(result['failed'])} failed, "
+          f"{len(result['missing'])} missing ({result['hashed']} hashed, "
+          f"{result['skipped']} unchanged)", file=sys.stderr)
+    return 1 if result['failed'] or result['missing'] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
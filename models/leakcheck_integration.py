@@ -4,89 +4,484 @@ This module provides direct integration with the LeakCheck API for breach checki
 """
 
 from leakcheck import LeakCheckAPI_Public
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import os
 import logging
+import hashlib
+import tempfile
+import threading
+import io
+import csv
 import json
+import time
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FutureTimeoutError
+import msgspec
+from tools.result_cache import LRUCache, SQLiteCache, SingleFlight
+
+# Addresses answered with demo data, without contacting LeakCheck
+DEMO_EMAILS = frozenset(['test@example.com', 'demo@example.com', 'breach@example.com'])
+
+# Maximum LeakCheck sources turned into breach records (0 for all of them)
+MAX_BREACH_SOURCES = int(os.environ.get('MAX_BREACH_SOURCES', 0))
+
+# LeakCheck field name -> HIBP-style data class; other fields are capitalized
+FIELD_DATA_CLASSES = {
+    'username': 'Usernames',
+    'email': 'Email addresses',
+    'password': 'Passwords',
+    'first_name': 'Names',
+    'last_name': 'Names',
+    'name': 'Names',
+    'phone': 'Phone numbers',
+    'address': 'Addresses',
+    'ip': 'IP addresses',
+    'ip1': 'IP addresses',
+    'ip2': 'IP addresses'
+}
+
+# Characters removed from a source name to form its Domain
+_DOMAIN_STRIP = str.maketrans('', '', ' .')
+
+BREACH_LOGO_PATH = 'https://haveibeenpwned.com/Content/Images/PwnedLogos/Breach.png'
+
+class BreachRecord(msgspec.Struct, rename='pascal', omit_defaults=True):
+    """
+    Compact, slotted breach record in the standardized breach format
+
+    Records are returned to callers and cached as structs;
+    msgspec.json.encode(record) writes one straight to JSON with the field
+    names the frontend expects (Name, BreachDate, ..., found, and demo for
+    demo data only).
+    """
+    name: str
+    title: str
+    domain: str
+    breach_date: str
+    added_date: str
+    description: str
+    data_classes: list
+    logo_path: str
+    pwn_count: int
+    is_verified: bool
+    found: int = msgspec.field(name='found')
+    demo: bool = msgspec.field(default=False, name='demo')
+
+
+# Decodes a cached breach list (see create_breach_cache)
+_breach_list_decoder = msgspec.json.Decoder(list[BreachRecord])
+
+
+# Connection settings for the shared LeakCheck client
+CONNECT_TIMEOUT = float(os.environ.get('LEAKCHECK_CONNECT_TIMEOUT', 3.05))
+READ_TIMEOUT = float(os.environ.get('LEAKCHECK_READ_TIMEOUT', 10))
+MAX_RETRIES = int(os.environ.get('LEAKCHECK_MAX_RETRIES', 2))
+RETRY_BACKOFF = float(os.environ.get('LEAKCHECK_RETRY_BACKOFF', 0.5))
+POOL_SIZE = int(os.environ.get('LEAKCHECK_POOL_SIZE', 10))
+
+# Breach-result cache: lifetime of found breaches, shorter lifetime of
+# "no breaches" answers (0 turns either off), and size limit (see
+# create_breach_cache)
+BREACH_CACHE_TTL = float(os.environ.get('BREACH_CACHE_TTL', 86400))
+BREACH_CACHE_NEGATIVE_TTL = float(os.environ.get('BREACH_CACHE_NEGATIVE_TTL', 3600))
+BREACH_CACHE_SIZE = int(os.environ.get('BREACH_CACHE_SIZE', 10000))
+
+# Upstream request budget: sustained requests per second (0 disables the
+# limit) and burst size, shared by every lookup in this process
+RATE_LIMIT = float(os.environ.get('LEAKCHECK_RATE_LIMIT', 3))
+RATE_BURST = int(os.environ.get('LEAKCHECK_RATE_BURST', 5))
+
+# Fraction of that budget bulk checks may use, so interactive lookups keep
+# the rest however large a bulk run is
+BULK_RATE_SHARE = float(os.environ.get('LEAKCHECK_BULK_RATE_SHARE', 0.5))
+
+# Concurrent upstream lookups made by one bulk check
+BULK_WORKERS = int(os.environ.get('BULK_BREACH_WORKERS', 8))
+
+# Interactive lookups run on a dedicated I/O pool and are abandoned after
+# this many seconds (see check_breach_with_deadline)
+LOOKUP_DEADLINE = float(os.environ.get('BREACH_LOOKUP_DEADLINE', 8))
+IO_WORKERS = int(os.environ.get('BREACH_IO_WORKERS', 32))
+
+# Shared client, created on first use (see get_leakcheck_client)
+_leakcheck_client = None
+_client_lock = threading.Lock()
+
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTP adapter that applies a default timeout to every request it sends"""
+
+    def __init__(self, timeout=None, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+
+class BreachLookupTimeout(Exception):
+    """Raised when a breach lookup does not finish within its deadline"""
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket rate limiter.
+
+    Tokens refill continuously at rate per second up to capacity; acquire
+    blocks until a token is available.
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        """
+        Args:
+            rate (float): Tokens added per second (0 or less disables limiting)
+            capacity (int): Maximum tokens held, i.e. the allowed burst
+            clock (callable): Monotonic time source, replaceable for testing
+        """
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._clock = clock
+        self._tokens = float(self.capacity)
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Take one token, sleeping until one is available"""
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = self._clock()
+                self._tokens = min(self.capacity,
+                                   self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+upstream_rate_limiter = TokenBucket(RATE_LIMIT, RATE_BURST)
+# Bulk lookups pass this bucket before the shared one (see fetch_breaches)
+bulk_rate_limiter = TokenBucket(RATE_LIMIT * BULK_RATE_SHARE, max(1, RATE_BURST // 2))
+
+
+def create_leakcheck_client():
+    """
+    Build a LeakCheck public API client on a pooled, keep-alive session
+    
+    Requests get connect/read timeouts, and connection errors, 429 and 5xx
+    responses are retried a bounded number of times with exponential backoff
+    (honouring Retry-After).
+    
+    Returns:
+        LeakCheckAPI_Public: Client whose session reuses its connections
+    """
+    api = LeakCheckAPI_Public()
+    retries = Retry(
+        total=MAX_RETRIES,
+        backoff_factor=RETRY_BACKOFF,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset(['GET']),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = TimeoutHTTPAdapter(timeout=(CONNECT_TIMEOUT, READ_TIMEOUT),
+                                 max_retries=retries,
+                                 pool_connections=1,
+                                 pool_maxsize=POOL_SIZE)
+    api.session.mount('https://', adapter)
+    api.session.mount('http://', adapter)
+    return api
+
+
+def get_leakcheck_client():
+    """Return the shared LeakCheck client, creating it on first use"""
+    global _leakcheck_client
+
+    if _leakcheck_client is None:
+        with _client_lock:
+            if _leakcheck_client is None:
+                _leakcheck_client = create_leakcheck_client()
+    return _leakcheck_client
+
+
+def create_breach_cache():
+    """
+    Build the breach-result cache selected by BREACH_CACHE_BACKEND
+    
+    'memory' (default) keeps results in a per-process LRU; 'sqlite' stores
+    them in the file named by BREACH_CACHE_PATH, shared by every worker
+    process on the host.
+    
+    Returns:
+        LRUCache or SQLiteCache: The configured cache
+    """
+    backend = os.environ.get('BREACH_CACHE_BACKEND', 'memory')
+    if backend == 'sqlite':
+        path = os.environ.get('BREACH_CACHE_PATH') or os.path.join(
+            tempfile.gettempdir(), 'acg_breach_cache.sqlite3')
+        return SQLiteCache(path, maxsize=BREACH_CACHE_SIZE, ttl=BREACH_CACHE_TTL,
+                           encode=msgspec.json.encode, decode=_breach_list_decoder.decode)
+    if backend != 'memory':
+        logging.warning(f"Unknown BREACH_CACHE_BACKEND {backend!r}, using memory")
+    return LRUCache(maxsize=BREACH_CACHE_SIZE, ttl=BREACH_CACHE_TTL)
+
+
+breach_cache = create_breach_cache()
+_breach_lookups = SingleFlight()
+_io_executor = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix='breach-io')
+
+
+def normalize_email(email):
+    """Canonical form of an email address for lookups and cache keys"""
+    return email.strip().lower()
+
+
+def _breach_cache_key(normalized_email):
+    """Hash identifying an email in the breach cache, so addresses are not stored"""
+    return hashlib.sha256(normalized_email.encode('utf-8')).hexdigest()
+
 
 def check_breach(email):
     """
     Check if an email has been involved in any data breaches using LeakCheck API
     
+    Results are cached per normalized email (see breach_cache); concurrent
+    lookups of the same email share a single upstream request.
+    
     Args:
         email (str): The email to check
         
     Returns:
-        list: List of standardized breach data
+        list: BreachRecord per breach
     """
     try:
-        # Initialize the LeakCheck public API
-        api = LeakCheckAPI_Public()
+        return _check_normalized_email(normalize_email(email))
+    except Exception as e:
+        # Failed lookups are not cached so the next request retries
+        logging.error(f"Error checking LeakCheck API: {str(e)}")
+        return []
+
+
+def check_breach_with_deadline(email, deadline=None):
+    """
+    Check an email for breaches, giving up once the deadline passes
+    
+    The cached, coalesced check runs on the shared breach I/O pool so a slow
+    LeakCheck response holds the calling request thread for at most the
+    deadline. A lookup still queued at the deadline is cancelled; one
+    already in flight finishes in the background and fills the cache for
+    the next request. Concurrency per web worker comes from its request
+    threads (gthread workers, see gunicorn.conf.py).
+    
+    Args:
+        email (str): The email to check
+        deadline (float, optional): Seconds to wait (default LOOKUP_DEADLINE)
         
-        # Make the API request
-        logging.info(f"Checking breaches for email: {email[:3]}***")
-        response = api.lookup(query=email)
+    Returns:
+        list: BreachRecord per breach
         
-        # If this is a test email, use demo data
-        if email.lower() in ['test@example.com', 'demo@example.com', 'breach@example.com']:
-            return get_demo_breaches()
-            
-        # Process the breach data if found
-        if response and isinstance(response, dict) and response.get('success'):
-            found_count = response.get('found', 0)
-            logging.info(f"LeakCheck found {found_count} breaches")
-            
-            # If no breaches found, return empty list
-            if found_count == 0 or not response.get('sources'):
-                return []
-                
-            # Process the sources into standardized breach format
-            breaches = []
-            
-            # Strictly follow the LeakCheck API JSON format
-            # Include the total count only once in the first breach
-            for idx, source in enumerate(response.get('sources', [])[:20]):  # Limit to 20 sources
-                breach = {
-                    'Name': source.get('name', 'Unknown Source'),
-                    'Title': source.get('name', 'Unknown Source'),
-                    'Domain': source.get('name', 'unknown').lower().replace(' ', '').replace('.', ''),
-                    'BreachDate': source.get('date', '2023-01-01'),
-                    'AddedDate': '2023-01-01',
-                    'Description': f"Your data was found in the {source.get('name', 'Unknown')} breach.",
-                    'DataClasses': get_data_classes(response),
-                    'LogoPath': 'https://haveibeenpwned.com/Content/Images/PwnedLogos/Breach.png',
-                    'PwnCount': source.get('entries', found_count),
-                    'IsVerified': True,
-                    'found': found_count  # Add the total count from the API response
-                }
-                breaches.append(breach)
-                
-            return breaches
-        else:
-            logging.warning(f"LeakCheck response not successful: {response}")
-            return []
-            
+    Raises:
+        BreachLookupTimeout: If the lookup did not finish in time
+    """
+    future = _io_executor.submit(_check_normalized_email, normalize_email(email))
+    try:
+        return future.result(timeout=LOOKUP_DEADLINE if deadline is None else deadline)
+    except FutureTimeoutError:
+        future.cancel()
+        raise BreachLookupTimeout("Breach lookup exceeded its deadline")
     except Exception as e:
+        # Failed lookups are not cached so the next request retries
         logging.error(f"Error checking LeakCheck API: {str(e)}")
         return []
+
+
+def _check_normalized_email(normalized, bulk=False):
+    """Cached, coalesced breach check that raises when the lookup fails"""
+    # If this is a test email, use demo data without any network I/O
+    if normalized in DEMO_EMAILS:
+        return get_demo_breaches()
+
+    cache_key = _breach_cache_key(normalized)
+    breaches = breach_cache.get(cache_key)
+    if breaches is None:
+        breaches = _breach_lookups.do(cache_key, _lookup_and_cache,
+                                      normalized, cache_key, bulk)
+
+    return _copy_breaches(breaches)
+
+
+def _copy_breaches(breaches):
+    """Copies of cached breach records, so callers cannot alter the cache"""
+    return [msgspec.structs.replace(breach, data_classes=list(breach.data_classes))
+            for breach in breaches]
+
+
+def read_emails_csv(text):
+    """
+    Extract email addresses from CSV text
+    
+    Uses the column headed "email" when there is one, otherwise the first
+    column; cells without an "@" (such as a header row) are skipped.
+    
+    Args:
+        text (str): CSV content
+        
+    Returns:
+        list: Email addresses in file order
+    """
+    rows = list(csv.reader(io.StringIO(text)))
+    column = 0
+    if rows:
+        header = [cell.strip().lower() for cell in rows[0]]
+        if 'email' in header:
+            column = header.index('email')
+    return [row[column].strip() for row in rows
+            if len(row) > column and '@' in row[column]]
+
+
+def check_breaches_bulk(emails, max_workers=None):
+    """
+    Check many emails, yielding each result as soon as its lookup finishes
+    
+    Emails are normalized and deduplicated first. Lookups go through the
+    breach cache and run on a bounded thread pool; upstream requests are
+    paced by bulk_rate_limiter, which keeps them to BULK_RATE_SHARE of the
+    upstream budget. Closing the generator early cancels the
+    lookups that have not started yet.
+    
+    Args:
+        emails (iterable): The emails to check
+        max_workers (int, optional): Concurrent lookups (default BULK_WORKERS)
         
+    Yields:
+        dict: {'email', 'breaches'} per email, or {'email', 'error'} if its
+              lookup failed, in completion order
+    """
+    unique_emails = [email for email in dict.fromkeys(
+        normalize_email(email) for email in emails) if email]
+    if not unique_emails:
+        return
+
+    executor = ThreadPoolExecutor(max_workers=max_workers or BULK_WORKERS,
+                                  thread_name_prefix='breach-bulk')
+    try:
+        futures = {executor.submit(_check_normalized_email, email, True): email
+                   for email in unique_emails}
+        for future in as_completed(futures):
+            email = futures[future]
+            try:
+                yield {'email': email, 'breaches': future.result()}
+            except Exception as e:
+                logging.error(f"Error checking LeakCheck API: {str(e)}")
+                yield {'email': email, 'error': 'Error checking breaches'}
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _lookup_and_cache(email, cache_key, bulk=False):
+    """Query LeakCheck for a normalized email and cache the outcome"""
+    breaches = fetch_breaches(email, bulk)
+    breach_cache.set(cache_key, breaches,
+                     ttl=BREACH_CACHE_TTL if breaches else BREACH_CACHE_NEGATIVE_TTL)
+    return breaches
+
+
+def fetch_breaches(email, bulk=False):
+    """
+    Query LeakCheck for an email, bypassing the cache
+    
+    Args:
+        email (str): The email to check
+        bulk (bool): Part of a bulk check; waits for bulk_rate_limiter first
+            so bulk runs cannot starve interactive lookups
+        
+    Returns:
+        list: BreachRecord per breach source (empty if none were found)
+        
+    Raises:
+        ValueError: If the API request fails or reports an error
+    """
+    # Reuse the shared, connection-pooled LeakCheck client
+    api = get_leakcheck_client()
+
+    # Make the API request once the upstream rate limit allows it
+    if bulk:
+        bulk_rate_limiter.acquire()
+    upstream_rate_limiter.acquire()
+    logging.info(f"Checking breaches for email: {email[:3]}***")
+    try:
+        response = api.lookup(query=email)
+    except ValueError as e:
+        # The public API reports an unknown email as an error
+        if 'not found' in str(e).lower():
+            logging.info("LeakCheck found 0 breaches")
+            return []
+        raise
+
+    # Process the breach data if found
+    if not (response and isinstance(response, dict) and response.get('success')):
+        raise ValueError(f"LeakCheck response not successful: {response}")
+
+    found_count = response.get('found', 0)
+    logging.info(f"LeakCheck found {found_count} breaches")
+
+    # If no breaches found, return empty list
+    if found_count == 0 or not response.get('sources'):
+        return []
+
+    # Process the sources into standardized breach format
+    return list(iter_breach_records(response, MAX_BREACH_SOURCES or None))
+
+
+def iter_breach_records(response, limit=None):
+    """
+    Convert a LeakCheck response into breach records in a single pass
+    
+    The response-level data classes are computed once and shared by every
+    record; sources are consumed lazily, so large source lists can be
+    streamed.
+    
+    Args:
+        response (dict): Successful LeakCheck public API response
+        limit (int, optional): Maximum number of sources converted
+        
+    Yields:
+        BreachRecord: One record per source, in response order
+    """
+    found_count = response.get('found', 0)
+    data_classes = get_data_classes(response)
+
+    # Strictly follow the LeakCheck API JSON format
+    for source in islice(response.get('sources') or (), limit):
+        name = source.get('name', 'Unknown Source')
+        yield BreachRecord(
+            name=name,
+            title=name,
+            domain=source.get('name', 'unknown').lower().translate(_DOMAIN_STRIP),
+            breach_date=source.get('date', '2023-01-01'),
+            added_date='2023-01-01',
+            description=f"Your data was found in the {source.get('name', 'Unknown')} breach.",
+            data_classes=data_classes,
+            logo_path=BREACH_LOGO_PATH,
+            pwn_count=source.get('entries', found_count),
+            is_verified=True,
+            found=found_count  # Add the total count from the API response
+        )
+
+
 def get_data_classes(response):
     """Extract data classes from LeakCheck response"""
-    data_classes = []
-    
-    if 'fields' in response and response['fields']:
-        for field in response['fields']:
-            if field == 'username': data_classes.append('Usernames')
-            elif field == 'email': data_classes.append('Email addresses')
-            elif field == 'password': data_classes.append('Passwords')
-            elif field in ['first_name', 'last_name', 'name']: data_classes.append('Names')
-            elif field == 'phone': data_classes.append('Phone numbers')
-            elif field == 'address': data_classes.append('Addresses')
-            elif field in ['ip', 'ip1', 'ip2']: data_classes.append('IP addresses')
-            else: data_classes.append(field.capitalize())
-    else:
+    fields = response.get('fields')
+    if not fields:
         # Default data class if none specified
-        data_classes = ['Email addresses']
-        
-    return data_classes
+        return ['Email addresses']
+    return [FIELD_DATA_CLASSES.get(field) or field.capitalize() for field in fields]
     
 def get_demo_breaches():
     """Return demo breach data for test emails"""
@@ -94,32 +489,32 @@ def get_demo_breaches():
     total_found = 6300000
     
     return [
-        {
-            'Name': 'DemoBreachData',
-            'Title': 'Demo Breach',
-            'Domain': 'demo-service.com',
-            'BreachDate': '2023-01-15',
-            'AddedDate': '2023-02-01',
-            'Description': 'This is a simulated breach for educational purposes. In a real scenario, this would contain information about an actual data breach.',
-            'DataClasses': ['Email addresses', 'Passwords', 'Names', 'IP addresses'],
-            'LogoPath': 'https://haveibeenpwned.com/Content/Images/PwnedLogos/Adobe.png',
-            'PwnCount': 5430000,
-            'IsVerified': True,
-            'demo': True,
-            'found': total_found
-        },
-        {
-            'Name': 'AnotherDemoBreachData',
-            'Title': 'Another Demo Breach',
-            'Domain': 'another-demo.com',
-            'BreachDate': '2022-11-20',
-            'AddedDate': '2022-12-05',
-            'Description': 'Another simulated breach for demonstration. This represents how multiple breaches would be displayed.',
-            'DataClasses': ['Email addresses', 'Geographic locations', 'Phone numbers'],
-            'LogoPath': 'https://haveibeenpwned.com/Content/Images/PwnedLogos/Yahoo.png',
-            'PwnCount': 870000,
-            'IsVerified': True,
-            'demo': True,
-            'found': total_found
-        }
-    ]
\ No newline at end of file
+        BreachRecord(
+            name='DemoBreachData',
+            title='Demo Breach',
+            domain='demo-service.com',
+            breach_date='2023-01-15',
+            added_date='2023-02-01',
+            description='This is a simulated breach for educational purposes. In a real scenario, this would contain information about an actual data breach.',
+            data_classes=['Email addresses', 'Passwords', 'Names', 'IP addresses'],
+            logo_path='https://haveibeenpwned.com/Content/Images/PwnedLogos/Adobe.png',
+            pwn_count=5430000,
+            is_verified=True,
+            demo=True,
+            found=total_found
+        ),
+        BreachRecord(
+            name='AnotherDemoBreachData',
+            title='Another Demo Breach',
+            domain='another-demo.com',
+            breach_date='2022-11-20',
+            added_date='2022-12-05',
+            description='Another simulated breach for demonstration. This represents how multiple breaches would be displayed.',
+            data_classes=['Email addresses', 'Geographic locations', 'Phone numbers'],
+            logo_path='https://haveibeenpwned.com/Content/Images/PwnedLogos/Yahoo.png',
+            pwn_count=870000,
+            is_verified=True,
+            demo=True,
+            found=total_found
+        )
+    ]
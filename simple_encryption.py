@@ -2,7 +2,9 @@
 Simple Encryption Module
 
 This module provides encryption and decryption functionality for the application.
-It's designed to be portable and work in any environment.
+It's designed to be portable and work in any environment: inside the toolkit
+keys come from the KDF registry (tools.kdf), and copied on its own it falls
+back to the same PBKDF2 derivation.
 """
 
 import os
@@ -12,6 +14,27 @@ from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 from cryptography.hazmat.backends import default_backend
 
+try:
+    from tools.kdf import LEGACY_KDF, derive
+except ImportError:  # Used outside the toolkit
+    LEGACY_KDF = derive = None
+
+def _derive_key(password, salt):
+    """
+    Derive a 256-bit AES key with the text format's PBKDF2-HMAC-SHA256
+    (100,000 iterations, tools.kdf.LEGACY_KDF)
+    """
+    if derive is not None:
+        return derive(LEGACY_KDF, password.encode(), salt, 32)
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,  # 256 bits for AES-256
+        salt=salt,
+        iterations=100000,
+        backend=default_backend()
+    )
+    return kdf.derive(password.encode())
+
 def encrypt_text(text, password, algorithm='aes'):
     """
     Encrypt text using the specified algorithm
@@ -28,14 +51,7 @@ def encrypt_text(text, password, algorithm='aes'):
     salt = os.urandom(16)
     
     # Derive key from password
-    kdf = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=32,  # 256 bits for AES-256
-        salt=salt,
-        iterations=100000,
-        backend=default_backend()
-    )
-    key = kdf.derive(password.encode())
+    key = _derive_key(password, salt)
     
     # Generate initialization vector
     iv = os.urandom(16)
@@ -82,14 +98,7 @@ def decrypt_text(encrypted_base64, salt_base64, password, algorithm='aes'):
         encrypted = encrypted_data[16:]
         
         # Derive key from password and salt
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,  # 256 bits for AES-256
-            salt=salt,
-            iterations=100000,
-            backend=default_backend()
-        )
-        key = kdf.derive(password.encode())
+        key = _derive_key(password, salt)
         
         # Create AES cipher
         cipher = Cipher(algorithms.AES(key), modes.CBC(iv), backend=default_backend())
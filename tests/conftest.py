@@ -0,0 +1,38 @@
+import os
+import sys
+
+import pytest
+
+# Import the application packages (tools, models) from the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+class FakeClock:
+    """Manually advanced time source for caches that take a clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture(scope='session')
+def app_client(tmp_path_factory):
+    """Test client of the Flask app (needs the app's full requirements)"""
+    pytest.importorskip('leakcheck')
+    # Flask-Session puts its session directory in the working directory
+    # current when it is first imported
+    cwd = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp('app'))
+    try:
+        pytest.importorskip('flask_session')
+        from app import app
+    finally:
+        os.chdir(cwd)
+    return app.test_client()
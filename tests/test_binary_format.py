@@ -0,0 +1,59 @@
+"""Round trips and header validation of the binary transport format"""
+
+import os
+
+import pytest
+
+from tools import encryption_tool as et
+
+PASSWORD = 'correct horse battery staple'
+
+
+@pytest.mark.parametrize('algorithm', ['aes', 'fernet', 'chacha20'])
+@pytest.mark.parametrize('size', [0, 1, 15, 16, 17, 4096])
+def test_binary_round_trip(algorithm, size):
+    data = os.urandom(size)
+    message = et.encrypt_bytes(data, PASSWORD, algorithm)
+    assert message[:4] == et.BINARY_MAGIC
+    assert bytes(et.decrypt_bytes(message, PASSWORD)) == data
+
+
+def test_binary_wrong_password():
+    # Fernet is the authenticated cipher of the binary format
+    message = et.encrypt_bytes(b'secret data', PASSWORD, 'fernet')
+    with pytest.raises(ValueError, match='Wrong password'):
+        et.decrypt_bytes(message, 'not the password')
+
+
+def test_binary_rejects_bad_headers():
+    message = et.encrypt_bytes(b'data', PASSWORD)
+    with pytest.raises(ValueError):
+        et.decrypt_bytes(b'XXXX' + bytes(message[4:]), PASSWORD)
+    with pytest.raises(ValueError):
+        et.decrypt_bytes(message[:4] + bytes([99]) + message[5:], PASSWORD)
+    with pytest.raises(ValueError):
+        et.decrypt_bytes(message[:et._BINARY_HEADER.size + 3], PASSWORD)
+
+
+@pytest.mark.parametrize('algorithm', ['aes', 'fernet', 'chacha20'])
+def test_binary_version_1_still_decrypts(algorithm):
+    # Version 1 has no KDF block and always used the text format's PBKDF2
+    salt = os.urandom(16)
+    key, _ = et.derive_key(PASSWORD, salt, algorithm)
+    body = et._seal(b'written by version 1', key, algorithm)
+    message = et._BINARY_HEADER.pack(et.BINARY_MAGIC, 1, et._BINARY_ALGORITHMS[algorithm],
+                                     len(salt), et._BINARY_NONCE_SIZES[algorithm]) + salt + body
+    assert bytes(et.decrypt_bytes(message, PASSWORD)) == b'written by version 1'
+
+
+def test_binary_endpoint_wrong_password_is_a_client_error(app_client):
+    message = bytes(et.encrypt_bytes(b'secret data', PASSWORD, 'fernet'))
+
+    def decrypt(password):
+        return app_client.post('/api/decrypt', data=message, content_type='application/octet-stream',
+                               headers={'X-Encryption-Password': password})
+
+    assert decrypt(PASSWORD).data == b'secret data'
+    response = decrypt('not the password')
+    assert response.status_code == 400
+    assert response.get_json() == {'error': 'Wrong password or corrupted data'}
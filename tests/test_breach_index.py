@@ -0,0 +1,54 @@
+"""Building and querying the offline breached password index"""
+
+import pytest
+
+from tools.breach_index import BreachedPasswordIndex, build_index, hash_password
+
+BREACHED = ['password', '123456', 'qwerty', 'letmein', 'correct horse', 'pässwörd']
+NOT_BREACHED = ['Tr0ub4dor&3', 'not in the list', '']
+
+
+def _write_hash_list(path, passwords, hash_type):
+    lines = ['# comment', '', 'not a hash']
+    for count, password in enumerate(passwords, 1):
+        lines.append(f"{hash_password(password, hash_type).hex().upper()}:{count}")
+    # Duplicates are stored once
+    lines.append(hash_password(passwords[0], hash_type).hex())
+    path.write_text('\n'.join(lines) + '\n')
+
+
+@pytest.mark.parametrize('hash_type', ['sha1', 'ntlm'])
+@pytest.mark.parametrize('chunk_size', [2, 10_000_000])
+def test_build_and_lookup(tmp_path, hash_type, chunk_size):
+    # chunk_size 2 spills sorted runs to disk and merges them
+    source = tmp_path / 'hashes.txt'
+    _write_hash_list(source, BREACHED, hash_type)
+    output = str(tmp_path / 'breached.idx')
+
+    assert build_index(str(source), output, hash_type, chunk_size=chunk_size) == len(BREACHED)
+
+    with BreachedPasswordIndex(output) as index:
+        assert len(index) == len(BREACHED)
+        for password in BREACHED:
+            assert index.contains(password)
+        for password in NOT_BREACHED:
+            assert not index.contains(password)
+        assert not index.contains_hash(b'\x00' * 3)
+
+
+def test_ntlm_hash_matches_known_value():
+    assert hash_password('password', 'ntlm').hex() == '8846f7eaee8fb117ad06bdd830b7586c'
+
+
+def test_build_rejects_unknown_hash_type(tmp_path):
+    source = tmp_path / 'hashes.txt'
+    source.write_text('')
+    with pytest.raises(ValueError):
+        build_index(str(source), str(tmp_path / 'out.idx'), 'md5')
+
+
+def test_open_rejects_foreign_file(tmp_path):
+    path = tmp_path / 'not_an_index'
+    path.write_bytes(b'x' * 128)
+    with pytest.raises(ValueError):
+        BreachedPasswordIndex(str(path))
@@ -0,0 +1,107 @@
+"""Checksums of uploads and files: every read path must give hashlib's digests"""
+
+import hashlib
+import io
+import os
+
+import pytest
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Request
+
+from tools import file_integrity as fi
+
+ALGORITHMS = ['md5', 'sha256', 'sha512']
+
+
+def _expected(data, algorithms=ALGORITHMS):
+    return {name: hashlib.new(name, data).hexdigest() for name in algorithms}
+
+
+def _upload(data):
+    """An uploaded file as Flask sees it in request.files"""
+    builder = EnvironBuilder(method='POST', data={'file': (io.BytesIO(data), 'upload.bin')})
+    return Request(builder.get_environ()).files['file']
+
+
+@pytest.mark.parametrize('unwrap', [False, True])
+def test_small_upload_is_hashed_in_memory(unwrap):
+    data = os.urandom(100 * 1024)
+    upload = _upload(data)
+    spool = upload.stream
+    assert not spool._rolled
+
+    file = spool if unwrap else upload
+    assert fi.calculate_checksums(file, ALGORITHMS) == _expected(data)
+    # Hashing must not force Werkzeug's spool over to a temporary file
+    assert not spool._rolled
+    assert spool.tell() == 0
+
+
+def test_large_upload_is_hashed_from_its_temporary_file():
+    data = os.urandom(600 * 1024)
+    upload = _upload(data)
+    assert upload.stream._rolled
+    assert fi.calculate_checksums(upload, ALGORITHMS) == _expected(data)
+
+
+@pytest.mark.parametrize('size', [0, 1, 4096])
+def test_files_on_disk_and_in_memory(tmp_path, size):
+    data = os.urandom(size)
+    path = tmp_path / 'data.bin'
+    path.write_bytes(data)
+    with open(path, 'rb') as file:
+        assert fi.calculate_checksums(file, ALGORITHMS) == _expected(data)
+    assert fi.calculate_checksums(io.BytesIO(data), ALGORITHMS) == _expected(data)
+    assert fi.calculate_checksum(io.BytesIO(data), 'sha256') == _expected(data)['sha256']
+
+
+def test_large_multi_algorithm_files_hash_on_parallel_threads(tmp_path, monkeypatch):
+    data = os.urandom(3 * 1024 * 1024)
+    path = tmp_path / 'large.bin'
+    path.write_bytes(data)
+    monkeypatch.setattr(fi, 'PIPELINE_MIN_SIZE', 1024 * 1024)
+    monkeypatch.setattr(fi.os, 'cpu_count', lambda: 4)
+    calls = []
+    hash_buffer = fi._hash_buffer
+    monkeypatch.setattr(fi, '_hash_buffer', lambda view, hash_objs, parallel=False:
+                        calls.append(parallel) or hash_buffer(view, hash_objs, parallel))
+
+    with open(path, 'rb') as file:
+        assert fi.calculate_checksums(file, ALGORITHMS) == _expected(data)
+    assert fi.calculate_checksums(_upload(data), ALGORITHMS) == _expected(data)
+    assert fi.calculate_checksums(_upload(data), ['sha256']) == _expected(data, ['sha256'])
+    assert calls == [True, True, False]
+
+
+def test_parallel_hashing_reraises_a_failed_hash():
+    class Failing:
+        def update(self, data):
+            raise RuntimeError('hash failed')
+
+    sha256 = hashlib.sha256()
+    with pytest.raises(RuntimeError):
+        fi._hash_buffer(memoryview(b'data'), [sha256, Failing()], parallel=True)
+    assert sha256.hexdigest() == hashlib.sha256(b'data').hexdigest()
+
+
+def test_file_objects_without_a_buffer_are_read_in_chunks():
+    data = os.urandom(10_000)
+
+    class Unmappable(io.BufferedReader):
+        def fileno(self):
+            raise io.UnsupportedOperation('fileno')
+
+    file = Unmappable(io.BytesIO(data))
+    assert fi.calculate_checksums(file, ALGORITHMS, chunk_size=1000) == _expected(data)
+
+
+def test_stream_checksums_count_bytes():
+    data = os.urandom(5000)
+    checksums, size = fi.calculate_checksums_stream(io.BytesIO(data), ALGORITHMS, chunk_size=1000)
+    assert checksums == _expected(data)
+    assert size == len(data)
+
+
+def test_unknown_algorithm_is_rejected():
+    with pytest.raises(ValueError):
+        fi.calculate_checksums(io.BytesIO(b'data'), ['not-a-hash'])
@@ -0,0 +1,72 @@
+"""Round trips and tamper detection of the chunked AEAD file format"""
+
+import io
+import os
+
+import pytest
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+
+from tools import encryption_tool as et
+from tools.kdf import KdfParams
+
+PASSWORD = 'correct horse battery staple'
+
+
+def _encrypt_file(data, algorithm='aes', chunk_size=None):
+    return b''.join(et.encrypt_stream(io.BytesIO(data), PASSWORD, algorithm, chunk_size))
+
+
+def _decrypt_file(encrypted, password=PASSWORD):
+    return b''.join(et.decrypt_stream(io.BytesIO(encrypted), password))
+
+
+@pytest.mark.parametrize('algorithm', ['aes', 'chacha20'])
+@pytest.mark.parametrize('size', [0, 1, 1023, 1024, 1025, 5000])
+def test_file_round_trip(algorithm, size):
+    data = os.urandom(size)
+    encrypted = _encrypt_file(data, algorithm, chunk_size=1024)
+    assert encrypted[:4] == et.FILE_MAGIC
+    assert _decrypt_file(encrypted) == data
+
+
+def test_file_wrong_password_fails_before_output():
+    encrypted = _encrypt_file(b'x' * 3000, chunk_size=1024)
+    with pytest.raises(ValueError):
+        et.decrypt_stream(io.BytesIO(encrypted), 'not the password')
+
+
+def test_file_detects_tampering_and_truncation():
+    encrypted = _encrypt_file(os.urandom(5000), chunk_size=1024)
+    record_size = 1024 + et._FILE_TAG_SIZE
+    second_record = et._FILE_HEADER.size + record_size
+
+    tampered = bytearray(encrypted)
+    tampered[second_record + 10] ^= 1
+    with pytest.raises(ValueError):
+        _decrypt_file(bytes(tampered))
+
+    # Dropping whole trailing records must not pass as a shorter file
+    with pytest.raises(ValueError):
+        _decrypt_file(encrypted[:second_record + record_size])
+    with pytest.raises(ValueError):
+        _decrypt_file(encrypted[:et._FILE_HEADER.size + record_size])
+
+
+def test_file_rejects_foreign_input_and_bad_chunk_size():
+    with pytest.raises(ValueError):
+        _decrypt_file(b'not an encrypted file')
+    with pytest.raises(ValueError):
+        _encrypt_file(b'data', chunk_size=et.MAX_FILE_CHUNK_SIZE + 1)
+
+
+def test_file_version_1_still_decrypts():
+    # Version 1 recorded only PBKDF2 iterations in its header
+    data = os.urandom(2500)
+    salt, nonce_prefix, chunk_size, iterations = os.urandom(16), os.urandom(7), 1024, 1000
+    key, _ = et.derive_key(PASSWORD, salt, 'aes',
+                           kdf=KdfParams('pbkdf2-sha256', None, (iterations,)))
+    header = et._FILE_HEADER_V1.pack(et.FILE_MAGIC, 1, 1, 1, iterations, salt,
+                                     nonce_prefix, chunk_size)
+    encrypted = b''.join(et._seal_chunks(io.BytesIO(data), AESGCM(key), header,
+                                         nonce_prefix, chunk_size))
+    assert _decrypt_file(encrypted) == data
@@ -0,0 +1,163 @@
+"""Directory manifests, verify sweeps, the hash index and the integrity_sweep CLI"""
+
+import hashlib
+import io
+import os
+import subprocess
+import sys
+import tarfile
+import zipfile
+
+import pytest
+
+from tools import file_integrity as fi
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                      'integrity_sweep.py')
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / 'tree'
+    (root / 'sub' / 'deeper').mkdir(parents=True)
+    files = {'a.txt': b'alpha', 'sub/b.bin': os.urandom(3000),
+             'sub/deeper/c': b'', 'name with\nnewline': b'odd'}
+    for name, data in files.items():
+        (root / name).write_bytes(data)
+    return root, files
+
+
+def test_manifest_lists_every_file(tree):
+    root, files = tree
+    manifest, stats = fi.build_directory_manifest(str(root), max_workers=1)
+    assert fi.parse_manifest(manifest) == {name: hashlib.sha256(data).hexdigest()
+                                           for name, data in files.items()}
+    assert stats == {'hashed': len(files), 'skipped': 0, 'missing': 0}
+
+
+def test_verify_reports_modified_and_missing_files(tree):
+    root, files = tree
+    manifest, _ = fi.build_directory_manifest(str(root), max_workers=1)
+    assert fi.verify_directory_manifest(str(root), manifest, max_workers=1)['ok'] == sorted(files)
+
+    (root / 'a.txt').write_bytes(b'tampered')
+    (root / 'sub' / 'b.bin').unlink()
+    result = fi.verify_directory_manifest(str(root), manifest, max_workers=1)
+    assert result['failed'] == ['a.txt']
+    assert result['missing'] == ['sub/b.bin']
+    assert sorted(result['ok']) == sorted(set(files) - {'a.txt', 'sub/b.bin'})
+
+
+def test_verify_survives_unusable_entries(tree, tmp_path, monkeypatch):
+    root, _ = tree
+    (tmp_path / 'secret').write_bytes(b'outside the tree')
+    secret_digest = hashlib.sha256(b'outside the tree').hexdigest()
+    manifest = fi.format_manifest({
+        'a.txt': hashlib.sha256(b'alpha').hexdigest(),
+        'sub': '0' * 64,  # a directory
+        '../secret': secret_digest,  # escapes the root
+        str(tmp_path / 'secret'): secret_digest,  # absolute path
+        'sub/b.bin': '0' * 64,  # unreadable, see below
+    })
+
+    unreadable = os.path.realpath(root / 'sub' / 'b.bin')
+    real_open = open
+
+    def fake_open(path, *args, **kwargs):
+        if path == unreadable:
+            raise PermissionError(13, 'Permission denied', path)
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(fi, 'open', fake_open, raising=False)
+    result = fi.verify_directory_manifest(str(root), manifest, max_workers=1)
+    assert result['ok'] == ['a.txt']
+    assert result['failed'] == []
+    assert sorted(result['missing']) == sorted(['sub', '../secret', str(tmp_path / 'secret'),
+                                                'sub/b.bin'])
+
+
+def test_index_skips_unchanged_files(tree, tmp_path):
+    root, files = tree
+    index_path = str(tmp_path / 'index.sqlite3')
+    fi.build_directory_manifest(str(root), index_path=index_path, max_workers=1)
+
+    (root / 'a.txt').write_bytes(b'changed')
+    manifest, stats = fi.build_directory_manifest(str(root), index_path=index_path, max_workers=1)
+    assert stats == {'hashed': 1, 'skipped': len(files) - 1, 'missing': 0}
+    assert fi.parse_manifest(manifest)['a.txt'] == hashlib.sha256(b'changed').hexdigest()
+
+
+def test_process_pool_sweep_matches_serial(tmp_path, monkeypatch):
+    root = tmp_path / 'many'
+    root.mkdir()
+    for i in range(10):
+        (root / f'{i}.dat').write_bytes(os.urandom(100 + i))
+    monkeypatch.setattr(fi, 'SWEEP_TASK_FILES', 3)
+    serial, _ = fi.build_directory_manifest(str(root), max_workers=1)
+    parallel, stats = fi.build_directory_manifest(str(root), max_workers=2)
+    assert parallel == serial
+    assert stats['hashed'] == 10
+
+
+def _sweep(*args):
+    return subprocess.run([sys.executable, SCRIPT, *args], capture_output=True, text=True)
+
+
+def test_cli_manifest_and_verify(tree, tmp_path):
+    root, _ = tree
+    manifest = str(tmp_path / 'SHA256SUMS')
+    assert _sweep('manifest', str(root), '-o', manifest, '--workers', '1').returncode == 0
+
+    verified = _sweep('verify', str(root), manifest, '--workers', '1')
+    assert verified.returncode == 0
+    assert 'a.txt: OK' in verified.stdout
+
+    (root / 'a.txt').write_bytes(b'tampered')
+    verified = _sweep('verify', str(root), manifest, '--workers', '1')
+    assert verified.returncode == 1
+    assert 'a.txt: FAILED' in verified.stdout
+
+
+def _zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    buffer.seek(0)
+    return buffer
+
+
+def _tar(members):
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode='w:gz') as archive:
+        for name, data in members.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.mark.parametrize('pack', [_zip, _tar])
+def test_archive_manifest(pack):
+    members = {'a.txt': b'alpha', 'dir/b.bin': os.urandom(2000)}
+    manifest, count = fi.archive_manifest(pack(members))
+    assert count == 2
+    assert fi.parse_manifest(manifest) == {name: hashlib.sha256(data).hexdigest()
+                                           for name, data in members.items()}
+
+
+@pytest.mark.parametrize('pack', [_zip, _tar])
+def test_archive_limits(pack, monkeypatch):
+    monkeypatch.setattr(fi, 'MAX_ARCHIVE_UNCOMPRESSED_BYTES', 10_000)
+    with pytest.raises(fi.ArchiveTooLarge):
+        fi.archive_manifest(pack({'bomb': bytes(50_000)}))
+
+    monkeypatch.setattr(fi, 'MAX_ARCHIVE_MEMBERS', 3)
+    with pytest.raises(fi.ArchiveTooLarge):
+        fi.archive_manifest(pack({str(i): b'x' for i in range(5)}))
+
+
+def test_archive_manifest_rejects_other_files():
+    with pytest.raises(ValueError):
+        fi.archive_manifest(io.BytesIO(b'not an archive at all'))
@@ -0,0 +1,89 @@
+"""KDF registry: header encoding, cost bounds and use by the encryption formats"""
+
+import io
+import os
+import json
+
+import pytest
+
+import simple_encryption
+from tools import encryption_tool as et
+from tools.kdf import (KDFS, KDF_HEADER_SIZE, KdfParams, available_kdfs, load_calibration,
+                       pack_kdf_params, profile_params, unpack_kdf_params)
+
+PASSWORD = 'correct horse battery staple'
+
+
+@pytest.mark.parametrize('name', available_kdfs())
+@pytest.mark.parametrize('profile', ['interactive', 'bulk', 'archival'])
+def test_header_round_trip(name, profile):
+    params = profile_params(name, profile)
+    block = pack_kdf_params(params)
+    assert len(block) == KDF_HEADER_SIZE
+    assert unpack_kdf_params(block) == params
+
+
+def test_unknown_kdf_and_profile_are_rejected():
+    with pytest.raises(ValueError):
+        profile_params('md5-crypt', 'interactive')
+    with pytest.raises(ValueError):
+        profile_params('pbkdf2-sha256', 'extreme')
+    block = bytearray(pack_kdf_params(profile_params('pbkdf2-sha256', 'interactive')))
+    block[0] = 200
+    with pytest.raises(ValueError):
+        unpack_kdf_params(bytes(block))
+
+
+@pytest.mark.parametrize('params', [
+    KdfParams('pbkdf2-sha256', None, (9_000_000,)),  # above the work ceiling
+    KdfParams('scrypt', None, (24, 32, 1)),  # 64 GiB of memory
+])
+def test_hostile_costs_are_rejected(params):
+    with pytest.raises(ValueError):
+        unpack_kdf_params(pack_kdf_params(params))
+
+
+def test_crafted_binary_header_cannot_force_a_huge_kdf():
+    header = et._BINARY_HEADER.pack(et.BINARY_MAGIC, et.BINARY_VERSION, 1, 16, 16)
+    block = pack_kdf_params(KdfParams('pbkdf2-sha256', None, (9_000_000,)))
+    with pytest.raises(ValueError):
+        et.decrypt_bytes(header + block + os.urandom(64), PASSWORD)
+
+
+def test_formats_record_the_kdf_used():
+    message = et.encrypt_bytes(b'data', PASSWORD, kdf='scrypt', profile='interactive')
+    assert unpack_kdf_params(message, et._BINARY_HEADER.size) == profile_params('scrypt', 'interactive')
+    assert bytes(et.decrypt_bytes(message, PASSWORD)) == b'data'
+
+    encrypted = b''.join(et.encrypt_stream(io.BytesIO(b'file data'), PASSWORD,
+                                           kdf='scrypt', profile='interactive'))
+    assert b''.join(et.decrypt_stream(io.BytesIO(encrypted), PASSWORD)) == b'file data'
+
+
+def test_registry_entries_are_consistent():
+    for spec in KDFS.values():
+        assert len(spec.parameters) == len(spec.limits)
+        for params in spec.profiles.values():
+            assert len(params) == len(spec.parameters)
+
+
+def test_low_calibration_keeps_the_builtin_ceiling(monkeypatch, tmp_path):
+    monkeypatch.setitem(KDFS, 'pbkdf2-sha256', KDFS['pbkdf2-sha256'])
+    calibration = tmp_path / 'calibration.json'
+    calibration.write_text(json.dumps({'pbkdf2-sha256': {'archival': [100000]}}))
+    load_calibration(str(calibration))
+    assert profile_params('pbkdf2-sha256', 'archival').params == (100000,)
+
+    # Written on a host using the built-in archival profile
+    foreign = KdfParams('pbkdf2-sha256', None, (3_000_000,))
+    assert unpack_kdf_params(pack_kdf_params(foreign)) == foreign
+    with pytest.raises(ValueError):
+        unpack_kdf_params(pack_kdf_params(KdfParams('pbkdf2-sha256', None, (9_000_000,))))
+
+
+def test_simple_encryption_works_without_the_registry(monkeypatch):
+    encrypted, salt = simple_encryption.encrypt_text('portable', PASSWORD)
+    monkeypatch.setattr(simple_encryption, 'derive', None)
+    assert simple_encryption.decrypt_text(encrypted, salt, PASSWORD) == 'portable'
+    encrypted, salt = simple_encryption.encrypt_text('portable', PASSWORD)
+    assert et.decrypt_text(encrypted, salt, PASSWORD) == 'portable'
@@ -0,0 +1,77 @@
+"""Expiry, eviction and zeroing in the derived key cache"""
+
+import time
+
+from tools import encryption_tool as et
+from tools.key_cache import DerivedKeyCache
+
+
+def _slot_bytes(cache):
+    return bytes(cache._slab)
+
+
+def test_derived_key_cache_expiry_zeroes_slot(clock):
+    cache = DerivedKeyCache(maxsize=4, ttl=30, clock=clock)
+    tag = cache.tag(b'password', b'salt')
+    key = b'k' * 32
+    cache.set(tag, key)
+    assert cache.get(tag) == key
+    assert key in _slot_bytes(cache)
+
+    clock.now += 31
+    assert cache.get(tag) is None
+    assert _slot_bytes(cache) == bytes(len(cache._slab))
+    assert len(cache) == 0
+
+
+def test_derived_key_cache_eviction_and_clear_zero_slots(clock):
+    cache = DerivedKeyCache(maxsize=2, ttl=30, clock=clock)
+    tags = [cache.tag(bytes([i])) for i in range(3)]
+    for i, tag in enumerate(tags):
+        cache.set(tag, bytes([i + 1]) * 32)
+    assert cache.get(tags[0]) is None
+    assert bytes([1]) * 32 not in _slot_bytes(cache)
+    assert cache.stats()['evictions'] == 1
+
+    cache.clear()
+    assert _slot_bytes(cache) == bytes(len(cache._slab))
+
+
+def test_derived_key_cache_tags_depend_on_split():
+    cache = DerivedKeyCache(maxsize=1)
+    assert cache.tag(b'ab', b'c') != cache.tag(b'a', b'bc')
+
+
+def test_derived_key_cache_purges_while_idle():
+    cache = DerivedKeyCache(maxsize=2, ttl=0.05)
+    cache.set(cache.tag(b'password'), b'k' * 32)
+    deadline = time.monotonic() + 2
+    while len(cache) and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert len(cache) == 0
+    assert _slot_bytes(cache) == bytes(len(cache._slab))
+
+
+def test_cached_derive_sends_only_misses_to_the_pool(monkeypatch):
+    monkeypatch.setattr(et, 'derived_key_cache', DerivedKeyCache(maxsize=4, ttl=30))
+    calls = []
+
+    def run(function, *args):
+        calls.append(args)
+        return function(*args)
+
+    derive = et.cached_derive(run)
+    message = et.encrypt_bytes(b'secret data', 'password', derive=derive)
+    assert len(calls) == 1
+
+    for _ in range(3):
+        assert bytes(et.decrypt_bytes(message, 'password', derive=derive)) == b'secret data'
+    assert len(calls) == 2
+    # Workers derive without caching, the key is kept in this process only
+    assert [use_cache for _, _, _, use_cache, _ in calls] == [False, False]
+    assert et.derived_key_cache.stats()['hits'] == 2
+
+    encrypted, salt = et.encrypt_text('text', 'password')
+    assert et.decrypt_text(encrypted, salt, 'password', derive=derive) == 'text'
+    assert et.decrypt_text(encrypted, salt, 'password', derive=derive) == 'text'
+    assert len(calls) == 3
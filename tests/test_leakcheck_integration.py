@@ -0,0 +1,274 @@
+"""Breach lookups against a fake LeakCheck client: caching, bulk checks and deadlines"""
+
+import io
+import json
+import threading
+
+import pytest
+
+pytest.importorskip('leakcheck')
+
+from models import leakcheck_integration as li
+from tools.result_cache import LRUCache, SingleFlight
+
+
+def _response(*sources):
+    return {'success': True, 'found': len(sources), 'fields': ['email', 'password'],
+            'sources': [{'name': name, 'date': '2020-01'} for name in sources]}
+
+
+class FakeClient:
+    """Stands in for LeakCheckAPI_Public, answering from a dict by email"""
+
+    def __init__(self, responses=None):
+        self.responses = responses or {}
+        self.queries = []
+        self.lock = threading.Lock()
+
+    def lookup(self, query):
+        with self.lock:
+            self.queries.append(query)
+        response = self.responses.get(query)
+        if isinstance(response, Exception):
+            raise response
+        if response is None:
+            raise ValueError('Not found')
+        return response
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """Fresh cache, coalescer and fake client, with rate limits turned off"""
+    fake = FakeClient()
+    monkeypatch.setattr(li, '_leakcheck_client', fake)
+    monkeypatch.setattr(li, 'breach_cache', LRUCache(maxsize=100, ttl=60))
+    monkeypatch.setattr(li, '_breach_lookups', SingleFlight())
+    monkeypatch.setattr(li, 'upstream_rate_limiter', li.TokenBucket(0, 1))
+    monkeypatch.setattr(li, 'bulk_rate_limiter', li.TokenBucket(0, 1))
+    return fake
+
+
+def test_demo_emails_are_answered_offline(client):
+    breaches = li.check_breach('  Demo@Example.com ')
+    assert len(breaches) == 2
+    assert client.queries == []
+
+
+def test_client_is_shared_and_pooled(monkeypatch):
+    monkeypatch.setattr(li, '_leakcheck_client', None)
+    api = li.get_leakcheck_client()
+    assert li.get_leakcheck_client() is api
+    adapter = api.session.get_adapter('https://leakcheck.io')
+    assert isinstance(adapter, li.TimeoutHTTPAdapter)
+    assert adapter.timeout == (li.CONNECT_TIMEOUT, li.READ_TIMEOUT)
+
+
+def test_token_bucket_allows_burst_then_paces():
+    now = [0.0]
+    bucket = li.TokenBucket(rate=10, capacity=2, clock=lambda: now[0])
+    bucket.acquire()
+    bucket.acquire()
+    assert bucket._tokens < 1
+    now[0] += 0.1
+    bucket.acquire()
+
+
+def test_email_variants_share_one_cache_entry(client):
+    client.responses['user@example.org'] = _response('Foo.com')
+    variants = ['user@example.org', 'User@Example.ORG', '  user@example.org\n', 'USER@EXAMPLE.ORG ']
+    results = [li.check_breach(email) for email in variants]
+    assert client.queries == ['user@example.org']
+    assert all(result == results[0] for result in results)
+    assert len(li.breach_cache) == 1
+
+
+def test_cache_keys_do_not_store_addresses(client):
+    client.responses['user@example.org'] = _response('Foo.com')
+    li.check_breach('user@example.org')
+    assert 'user@example.org' not in li.breach_cache._entries
+    assert li._breach_cache_key('user@example.org') in li.breach_cache._entries
+
+
+def test_no_breaches_are_cached_with_the_negative_ttl(client, monkeypatch):
+    ttls = []
+    set_entry = li.breach_cache.set
+    monkeypatch.setattr(li.breach_cache, 'set',
+                        lambda key, value, ttl=None: ttls.append(ttl) or set_entry(key, value, ttl))
+    client.responses['found@example.org'] = _response('Foo.com')
+    assert li.check_breach('clean@example.org') == []
+    assert li.check_breach('clean@example.org') == []
+    li.check_breach('found@example.org')
+    assert ttls == [li.BREACH_CACHE_NEGATIVE_TTL, li.BREACH_CACHE_TTL]
+    assert client.queries == ['clean@example.org', 'found@example.org']
+
+
+def test_failed_lookups_are_not_cached(client):
+    client.responses['user@example.org'] = ConnectionError('upstream down')
+    assert li.check_breach('user@example.org') == []
+    client.responses['user@example.org'] = _response('Foo.com')
+    assert len(li.check_breach('user@example.org')) == 1
+    assert client.queries == ['user@example.org'] * 2
+
+
+def test_concurrent_lookups_are_coalesced(client):
+    release = threading.Event()
+    lookup = client.lookup
+
+    def slow_lookup(query):
+        release.wait(5)
+        return lookup(query)
+
+    client.lookup = slow_lookup
+    client.responses['user@example.org'] = _response('Foo.com')
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(li.check_breach('User@example.org')))
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert client.queries == ['user@example.org']
+    assert len(results) == 8 and all(len(result) == 1 for result in results)
+
+
+def test_callers_get_copies_of_cached_records(client):
+    client.responses['user@example.org'] = _response('Foo.com')
+    li.check_breach('user@example.org')[0].data_classes.append('Tampered')
+    assert 'Tampered' not in li.check_breach('user@example.org')[0].data_classes
+
+
+class CountingBucket(li.TokenBucket):
+    def __init__(self):
+        super().__init__(0, 1)
+        self.acquired = 0
+
+    def acquire(self):
+        self.acquired += 1
+
+
+def test_bulk_check_deduplicates_and_reports_failures(client, monkeypatch):
+    bucket = CountingBucket()
+    monkeypatch.setattr(li, 'bulk_rate_limiter', bucket)
+    client.responses['a@example.org'] = _response('Foo.com', 'Bar')
+    client.responses['broken@example.org'] = RuntimeError('upstream error')
+    emails = ['a@example.org', ' A@example.org', 'b@example.org', '', 'broken@example.org',
+              'test@example.com']
+
+    results = {result['email']: result for result in li.check_breaches_bulk(emails, max_workers=3)}
+    assert set(results) == {'a@example.org', 'b@example.org', 'broken@example.org',
+                            'test@example.com'}
+    assert len(results['a@example.org']['breaches']) == 2
+    assert results['b@example.org']['breaches'] == []
+    assert 'error' in results['broken@example.org']
+    assert sorted(client.queries) == ['a@example.org', 'b@example.org', 'broken@example.org']
+    # Every upstream request of a bulk run passes the bulk share first
+    assert bucket.acquired == 3
+
+
+def test_interactive_lookups_skip_the_bulk_bucket(client, monkeypatch):
+    bucket = CountingBucket()
+    monkeypatch.setattr(li, 'bulk_rate_limiter', bucket)
+    li.check_breach('user@example.org')
+    assert bucket.acquired == 0
+
+
+def test_read_emails_csv():
+    assert li.read_emails_csv('name,Email\nAnn,ann@example.org\nBob,bob@example.org\n') == \
+        ['ann@example.org', 'bob@example.org']
+    assert li.read_emails_csv('x@example.org\nnot an email\n y@example.org ') == \
+        ['x@example.org', 'y@example.org']
+
+
+def _ndjson(response):
+    return {item['email']: item for item in map(json.loads, response.data.splitlines())}
+
+
+def test_bulk_endpoint_streams_ndjson(client, app_client):
+    client.responses['a@example.org'] = _response('Foo.com')
+    response = app_client.post('/api/check-breaches/bulk',
+                               json={'emails': ['a@example.org', 'A@EXAMPLE.ORG', 'b@example.org']})
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    results = _ndjson(response)
+    assert set(results) == {'a@example.org', 'b@example.org'}
+    assert results['a@example.org']['breaches'][0]['Name'] == 'Foo.com'
+
+
+def test_bulk_endpoint_accepts_csv_uploads(client, app_client):
+    response = app_client.post('/api/check-breaches/bulk', data={
+        'file': (io.BytesIO(b'\xef\xbb\xbfemail\nc@example.org\n'), 'emails.csv')})
+    assert set(_ndjson(response)) == {'c@example.org'}
+
+
+def test_bulk_endpoint_rejects_bad_requests(client, app_client, monkeypatch):
+    assert app_client.post('/api/check-breaches/bulk', json={'emails': 'a@example.org'}).status_code == 400
+    assert app_client.post('/api/check-breaches/bulk', json={'emails': [1, 2]}).status_code == 400
+    monkeypatch.setitem(app_client.application.config, 'MAX_BULK_EMAILS', 2)
+    response = app_client.post('/api/check-breaches/bulk',
+                               json={'emails': ['a@example.org', 'b@example.org', 'c@example.org']})
+    assert response.status_code == 413
+    assert client.queries == []
+
+
+def test_slow_lookups_time_out_and_still_fill_the_cache(client, app_client, monkeypatch):
+    monkeypatch.setattr(li, 'LOOKUP_DEADLINE', 0.05)
+    release = threading.Event()
+    lookup = client.lookup
+
+    def slow_lookup(query):
+        release.wait(5)
+        return lookup(query)
+
+    client.lookup = slow_lookup
+    client.responses['slow@example.org'] = _response('Foo.com')
+    with pytest.raises(li.BreachLookupTimeout):
+        li.check_breach_with_deadline('slow@example.org')
+    response = app_client.post('/api/check-breaches', data={'email': 'slow@example.org'})
+    assert response.status_code == 504
+    assert response.get_json()['breaches'] == []
+
+    release.set()
+    assert len(li.check_breach_with_deadline('slow@example.org', deadline=5)) == 1
+    assert client.queries == ['slow@example.org']
+
+
+def test_records_use_the_standard_breach_fields():
+    response = dict(_response('Some Site.com', 'Other'), fields=['email', 'ip1', 'dob'])
+    records = list(li.iter_breach_records(response))
+    assert [record.domain for record in records] == ['somesitecom', 'other']
+    assert records[0].data_classes == ['Email addresses', 'IP addresses', 'Dob']
+    assert len(list(li.iter_breach_records(response, limit=1))) == 1
+
+    encoded = json.loads(li.msgspec.json.encode(records[0]))
+    assert encoded['Name'] == 'Some Site.com'
+    assert encoded['found'] == 2
+    assert encoded['DataClasses'] == records[0].data_classes
+    assert 'demo' not in encoded
+    assert json.loads(li.msgspec.json.encode(li.get_demo_breaches()))[0]['demo'] is True
+
+
+def test_endpoint_returns_breach_json(client, app_client):
+    client.responses['user@example.org'] = _response('Foo.com')
+    breach = app_client.post('/api/check-breaches',
+                             data={'email': 'user@example.org'}).get_json()['breaches'][0]
+    assert breach['Name'] == 'Foo.com'
+    assert breach['DataClasses'] == ['Email addresses', 'Passwords']
+
+
+def test_sqlite_breach_cache_round_trips_records(client, monkeypatch, tmp_path):
+    monkeypatch.setenv('BREACH_CACHE_BACKEND', 'sqlite')
+    monkeypatch.setenv('BREACH_CACHE_PATH', str(tmp_path / 'breaches.sqlite3'))
+    monkeypatch.setattr(li, 'breach_cache', li.create_breach_cache())
+    client.responses['user@example.org'] = _response('Foo.com')
+    first = li.check_breach('user@example.org')
+    assert li.check_breach('user@example.org') == first
+    assert isinstance(first[0], li.BreachRecord)
+    assert client.queries == ['user@example.org']
+
+    # Entries written as plain JSON by earlier versions still decode
+    li.breach_cache._connect().execute(
+        'INSERT INTO cache_entries (key, value, expires_at) VALUES (?, ?, NULL)',
+        (li._breach_cache_key('old@example.org'),
+         json.dumps(json.loads(li.msgspec.json.encode(first)))))
+    assert li.check_breach('old@example.org') == first
@@ -0,0 +1,113 @@
+"""Merkle-tree checksums and locating corrupted chunks with verify_merkle"""
+
+import hashlib
+import io
+import os
+
+import pytest
+
+from tools import file_integrity as fi
+
+CHUNK = 4096
+
+
+@pytest.fixture
+def data():
+    return os.urandom(CHUNK * 40 + 123)
+
+
+def _flip(data, offset):
+    corrupted = bytearray(data)
+    corrupted[offset] ^= 1
+    return bytes(corrupted)
+
+
+def test_paths_and_file_objects_give_the_same_manifest(tmp_path, data, monkeypatch):
+    # Few chunks per task so the path is hashed by several pool tasks
+    monkeypatch.setattr(fi, 'MERKLE_TASK_CHUNKS', 4)
+    path = tmp_path / 'data.bin'
+    path.write_bytes(data)
+    from_path = fi.merkle_checksum(str(path), chunk_size=CHUNK, max_workers=2)
+    from_file = fi.merkle_checksum(io.BytesIO(data), chunk_size=CHUNK)
+    assert from_path == from_file
+    assert len(from_path['chunks']) == 41
+    assert from_path['size'] == len(data)
+
+
+def test_any_changed_byte_changes_the_root(data):
+    manifest = fi.merkle_checksum(io.BytesIO(data), chunk_size=CHUNK)
+    for offset in (0, CHUNK * 17 + 5, len(data) - 1):
+        corrupted = fi.merkle_checksum(io.BytesIO(_flip(data, offset)), chunk_size=CHUNK)
+        assert corrupted['root'] != manifest['root']
+        changed = [i for i, (a, b) in enumerate(zip(manifest['chunks'], corrupted['chunks']))
+                   if a != b]
+        assert changed == [offset // CHUNK]
+
+
+def test_leaf_and_node_digests_are_domain_separated():
+    # A single chunk's root must not be the plain hash of its bytes
+    manifest = fi.merkle_checksum(io.BytesIO(b'data'), chunk_size=CHUNK)
+    assert manifest['root'] != hashlib.sha256(b'data').hexdigest()
+
+
+@pytest.mark.parametrize('source', ['path', 'file'])
+def test_verify_locates_corrupted_chunks(tmp_path, data, source, monkeypatch):
+    monkeypatch.setattr(fi, 'MERKLE_TASK_CHUNKS', 4)
+    manifest = fi.merkle_checksum(io.BytesIO(data), chunk_size=CHUNK)
+    corrupted = _flip(_flip(data, CHUNK * 3 + 1), len(data) - 10)
+    path = tmp_path / 'data.bin'
+    path.write_bytes(corrupted)
+    target = str(path) if source == 'path' else io.BytesIO(corrupted)
+
+    result = fi.verify_merkle(target, manifest, max_workers=2)
+    assert not result['is_valid'] and result['size_matches']
+    assert result['mismatches'] == [
+        {'index': 3, 'offset': CHUNK * 3, 'length': CHUNK},
+        {'index': 40, 'offset': CHUNK * 40, 'length': 123},
+    ]
+    first = fi.verify_merkle(target if source == 'path' else io.BytesIO(corrupted),
+                             manifest, stop_on_first=True, max_workers=2)
+    assert [m['index'] for m in first['mismatches']] == [3]
+
+
+def test_verify_reports_truncation_and_extension(data):
+    manifest = fi.merkle_checksum(io.BytesIO(data), chunk_size=CHUNK)
+    assert fi.verify_merkle(io.BytesIO(data), manifest)['is_valid']
+
+    truncated = fi.verify_merkle(io.BytesIO(data[:CHUNK * 38]), manifest)
+    assert not truncated['size_matches']
+    assert [m['index'] for m in truncated['mismatches']] == [38, 39, 40]
+
+    extended = fi.verify_merkle(io.BytesIO(data + b'x'), manifest)
+    assert not extended['is_valid']
+
+
+@pytest.mark.parametrize('change', [
+    {'chunk_size': 0},
+    {'chunk_size': fi.MAX_MERKLE_CHUNK_SIZE + 1},
+    {'chunk_size': '4096'},
+    {'size': -1},
+])
+def test_verify_rejects_invalid_manifests(data, change):
+    manifest = fi.merkle_checksum(io.BytesIO(data), chunk_size=CHUNK)
+    with pytest.raises(ValueError):
+        fi.verify_merkle(io.BytesIO(data), dict(manifest, **change))
+
+
+def test_verify_rejects_chunk_lists_that_do_not_match_the_size(data):
+    manifest = fi.merkle_checksum(io.BytesIO(data), chunk_size=CHUNK)
+    with pytest.raises(ValueError):
+        fi.verify_merkle(io.BytesIO(data), dict(manifest, chunks=manifest['chunks'][:-1]))
+    with pytest.raises(ValueError):
+        fi.verify_merkle(io.BytesIO(data), dict(manifest, chunks=manifest['chunks'] * 2))
+
+
+def test_path_mode_reuses_one_process_pool(tmp_path, data, monkeypatch):
+    monkeypatch.setattr(fi, 'MERKLE_TASK_CHUNKS', 4)
+    path = tmp_path / 'data.bin'
+    path.write_bytes(data)
+    manifest = fi.merkle_checksum(str(path), chunk_size=CHUNK, max_workers=2)
+    pool = fi._merkle_pools[2]
+    fi.verify_merkle(str(path), manifest, max_workers=2)
+    fi.verify_merkle(str(path), manifest, stop_on_first=True, max_workers=2)
+    assert fi._merkle_pools[2] is pool
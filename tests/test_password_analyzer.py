@@ -0,0 +1,37 @@
+"""Batch password analysis agrees with the single-password path"""
+
+import pytest
+
+from tools.password_analyzer import analyze_password, analyze_passwords
+
+PATTERN_FIELDS = ('pattern_entropy', 'guesses_log10', 'patterns')
+
+PASSWORDS = [
+    '', 'a', 'password', 'Password1', 'P@ssw0rd!', 'qwertyuiop', '11111111',
+    'correct horse battery staple', 'Tr0ub4dor&3', 'jennifer1987', 'zxcvbnm123',
+    'Xk9#mQ2$vL7@pR4!', 'ünïcödé-pässwörd', 'abcabcabcabc', '  spaces  '
+]
+
+
+def test_batch_matches_single_with_patterns():
+    for password, batch in zip(PASSWORDS, analyze_passwords(PASSWORDS, patterns=True)):
+        single = analyze_password(password)
+        assert batch.keys() == single.keys(), password
+        for field, value in single.items():
+            if isinstance(value, float):
+                assert batch[field] == pytest.approx(value, abs=1e-9), (password, field)
+            else:
+                assert batch[field] == value, (password, field)
+
+
+def test_batch_without_patterns_omits_only_pattern_fields():
+    with_patterns = analyze_passwords(PASSWORDS, patterns=True)
+    without = analyze_passwords(PASSWORDS)
+    assert len(without) == len(PASSWORDS)
+    for full, fast in zip(with_patterns, without):
+        assert not set(PATTERN_FIELDS) & fast.keys()
+        assert {k: v for k, v in full.items() if k not in PATTERN_FIELDS} == fast
+
+
+def test_batch_of_nothing():
+    assert analyze_passwords([]) == []
@@ -0,0 +1,62 @@
+import math
+import time
+
+import pytest
+
+from tools import pattern_entropy as pe
+
+REPEAT_SHAPED = [
+    'a' * 40,
+    'ab' * 20,
+    'abc' * 13 + 'a',
+    '1' * 40,
+    '1234567890' * 4,
+    '1qaz2wsx' * 5,
+    'Password1' * 4,
+    'passwordpassword' * 2,
+]
+
+# Generous enough for a slow CI box; the unpruned search took 8-12 ms here
+REPEAT_BUDGET_SECONDS = 0.005
+
+
+def _clear_caches():
+    pe._repeat_base_guesses.cache_clear()
+    pe._digit_date_year.cache_clear()
+
+
+@pytest.mark.parametrize('password', REPEAT_SHAPED + [
+    'correcthorsebatterystaple', 'Tr0ub4dor&3', '13/05/1985qwerty', 'zxcvbn', 'x', ''])
+def test_pruned_search_matches_full_search(password):
+    matches = pe._match_all(password)
+    guesses, sequence = pe._most_guessable(password, matches)
+    if password:
+        expected_guesses, expected_sequence = pe._search(password, _by_end(password, matches), math.inf)
+    else:
+        expected_guesses, expected_sequence = 1, []
+    assert guesses == expected_guesses
+    assert [(m.pattern, m.i, m.j) for m in sequence] == [(m.pattern, m.i, m.j) for m in expected_sequence]
+
+
+def _by_end(password, matches):
+    matches_by_end = [[] for _ in password]
+    for match in matches:
+        matches_by_end[match.j].append(match)
+    return matches_by_end
+
+
+def test_repeats_score_as_one_repeat():
+    assert pe.estimate_guesses('ab' * 20)['patterns'] == ['repeat']
+    assert pe.estimate_guesses('ab' * 20)['guesses_log10'] < pe.estimate_guesses('ab' * 10 + 'x9q' * 6)['guesses_log10']
+
+
+@pytest.mark.parametrize('password', REPEAT_SHAPED)
+def test_repeat_shaped_inputs_stay_fast(password):
+    pe.estimate_guesses('warm up the word index')
+    best = math.inf
+    for _ in range(5):
+        _clear_caches()
+        start = time.perf_counter()
+        pe.estimate_guesses(password)
+        best = min(best, time.perf_counter() - start)
+    assert best < REPEAT_BUDGET_SECONDS
@@ -0,0 +1,69 @@
+"""TTL semantics of the in-process and SQLite result caches"""
+
+import pytest
+
+from tools.result_cache import LRUCache, SQLiteCache
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def cache(request, clock, tmp_path):
+    if request.param == 'sqlite':
+        return SQLiteCache(str(tmp_path / 'cache.sqlite3'), maxsize=100, ttl=60, clock=clock)
+    return LRUCache(maxsize=100, ttl=60, clock=clock)
+
+
+def test_default_ttl_expires(cache, clock):
+    cache.set('key', [1, 2])
+    clock.now += 59
+    assert cache.get('key') == [1, 2]
+    clock.now += 2
+    assert cache.get('key') is None
+
+
+def test_per_entry_ttl_overrides_default(cache, clock):
+    cache.set('short', 'a', ttl=5)
+    cache.set('long', 'b', ttl=500)
+    clock.now += 100
+    assert cache.get('short') is None
+    assert cache.get('long') == 'b'
+
+
+def test_zero_ttl_stores_nothing(cache):
+    cache.set('key', 'cached')
+    cache.set('key', 'not cached', ttl=0)
+    assert cache.get('key') is None
+    cache.set('other', 'not cached', ttl=-1)
+    assert cache.get('other', 'missing') == 'missing'
+
+
+def test_none_ttl_never_expires(clock, tmp_path):
+    for cache in (LRUCache(ttl=None, clock=clock),
+                  SQLiteCache(str(tmp_path / 'cache.sqlite3'), ttl=None, clock=clock)):
+        cache.set('key', 'forever')
+        clock.now += 10 ** 9
+        assert cache.get('key') == 'forever'
+
+
+def test_lru_evicts_least_recently_used(clock):
+    cache = LRUCache(maxsize=2, clock=clock)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is None
+    assert cache.get('a') == 1 and cache.get('c') == 3
+    assert cache.stats()['evictions'] == 1
+
+
+def test_sqlite_cache_is_shared_between_instances(clock, tmp_path):
+    path = str(tmp_path / 'cache.sqlite3')
+    SQLiteCache(path, ttl=60, clock=clock).set('key', {'found': 1})
+    assert SQLiteCache(path, ttl=60, clock=clock).get('key') == {'found': 1}
+
+
+def test_sqlite_cache_custom_serialization(clock, tmp_path):
+    cache = SQLiteCache(str(tmp_path / 'cache.sqlite3'), clock=clock,
+                        encode=lambda value: value.encode('utf-8')[::-1],
+                        decode=lambda stored: stored[::-1].decode('utf-8'))
+    cache.set('key', 'value')
+    assert cache.get('key') == 'value'
@@ -0,0 +1,431 @@
+"""
+Breached Password Index
+Offline lookup of known-compromised passwords against a local hash list.
+
+The index file is built once from a SHA-1 or NTLM hash list (one hex hash per
+line, optionally followed by ":count" as in the Have I Been Pwned downloads)
+and is then memory-mapped by every worker. Its layout is:
+
+    header | Bloom filter bits | sorted, de-duplicated raw hash records
+
+A lookup checks the Bloom filter first, so most clean passwords are rejected
+without touching the records, then binary-searches the sorted records. No
+network access is needed at any point.
+"""
+
+import os
+import bisect
+import heapq
+import itertools
+import hashlib
+import logging
+import math
+import mmap
+import struct
+import tempfile
+import threading
+
+import numpy as np
+
+
+# File signature and header: magic, hash type, hash width, Bloom hash count,
+# record count, Bloom filter size in bits
+INDEX_MAGIC = b'ACGBIDX1'
+_HEADER = struct.Struct('<8s8sIIQQ')
+
+# Sections start on cache-line boundaries
+_ALIGNMENT = 64
+
+# Digest width in bytes for each supported hash list type
+HASH_TYPES = {'sha1': 20, 'ntlm': 16}
+
+_MASK64 = (1 << 64) - 1
+
+
+def _align(offset):
+    return (offset + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def _md4(data):
+    """Pure-Python MD4, used for NTLM when OpenSSL does not provide it"""
+    def rotl(x, n):
+        x &= 0xffffffff
+        return ((x << n) | (x >> (32 - n))) & 0xffffffff
+
+    state = [0x67452301, 0xefcdab89, 0x98badcfe, 0x10325476]
+    message = (data + b'\x80' + b'\x00' * ((55 - len(data)) % 64)
+               + struct.pack('<Q', len(data) * 8))
+
+    for offset in range(0, len(message), 64):
+        x = struct.unpack('<16I', message[offset:offset + 64])
+        a, b, c, d = state
+
+        # Each step updates a, then the registers rotate so the next step's
+        # target is in a again; four steps restore the original order
+        for i in range(16):
+            a = rotl(a + ((b & c) | (~b & d)) + x[i], (3, 7, 11, 19)[i % 4])
+            a, b, c, d = d, a, b, c
+        for i, k in enumerate((0, 4, 8, 12, 1, 5, 9, 13, 2, 6, 10, 14, 3, 7, 11, 15)):
+            a = rotl(a + ((b & c) | (b & d) | (c & d)) + x[k] + 0x5a827999,
+                     (3, 5, 9, 13)[i % 4])
+            a, b, c, d = d, a, b, c
+        for i, k in enumerate((0, 8, 4, 12, 2, 10, 6, 14, 1, 9, 5, 13, 3, 11, 7, 15)):
+            a = rotl(a + (b ^ c ^ d) + x[k] + 0x6ed9eba1, (3, 9, 11, 15)[i % 4])
+            a, b, c, d = d, a, b, c
+
+        state = [(s + v) & 0xffffffff for s, v in zip(state, (a, b, c, d))]
+
+    return struct.pack('<4I', *state)
+
+
+def hash_password(password, hash_type='sha1'):
+    """
+    Hash a password the way breach hash lists store it
+
+    Args:
+        password (str): The password to hash
+        hash_type (str): 'sha1' (UTF-8) or 'ntlm' (MD4 of UTF-16LE)
+
+    Returns:
+        bytes: Raw digest
+    """
+    if hash_type == 'sha1':
+        return hashlib.sha1(password.encode('utf-8', 'surrogatepass')).digest()
+    if hash_type == 'ntlm':
+        data = password.encode('utf-16-le', 'surrogatepass')
+        try:
+            return hashlib.new('md4', data).digest()
+        except ValueError:
+            return _md4(data)
+    raise ValueError(f"Unsupported hash type: {hash_type}")
+
+
+def _bloom_parameters(count, bits_per_entry):
+    """Bloom filter size in bits and number of hash functions for count entries"""
+    bits = max(_ALIGNMENT * 8, int(count * bits_per_entry))
+    return bits, max(1, round(bits_per_entry * math.log(2)))
+
+
+def _bloom_add(bloom, records, width, bits, hash_count):
+    """Set the Bloom filter bits of a block of sorted raw records"""
+    raw = np.frombuffer(records.tobytes(), dtype=np.uint8).reshape(-1, width)
+    # The digests are already uniformly distributed, so their leading
+    # 16 bytes serve directly as the two double-hashing inputs
+    h1 = raw[:, :8].copy().view('<u8').ravel()
+    h2 = raw[:, 8:16].copy().view('<u8').ravel() | np.uint64(1)
+    for i in range(hash_count):
+        positions = (h1 + np.uint64(i) * h2) % np.uint64(bits)
+        np.bitwise_or.at(bloom, (positions >> np.uint64(3)).astype(np.intp),
+                         (np.uint64(1) << (positions & np.uint64(7))).astype(np.uint8))
+
+
+def _parse_hash_lines(lines, width):
+    """Yield raw digests from hash list lines, skipping blanks, comments and junk"""
+    skipped = 0
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        try:
+            digest = bytes.fromhex(line.split(':', 1)[0])
+        except ValueError:
+            digest = b''
+        if len(digest) != width:
+            skipped += 1
+            continue
+        yield digest
+    if skipped:
+        logging.warning(f"Skipped {skipped} malformed lines in breached hash list")
+
+
+def _spill_run(run, directory):
+    """Write a sorted run to a temporary file, returning (path, record count)"""
+    fd, run_path = tempfile.mkstemp(dir=directory, suffix='.run')
+    with os.fdopen(fd, 'wb') as run_file:
+        run_file.write(run.tobytes())
+    return run_path, run.size
+
+
+def _sorted_run_blocks(path, width, block_records=65536):
+    """Yield records from a sorted run file one at a time, reading in blocks"""
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(width * block_records)
+            if not block:
+                return
+            for offset in range(0, len(block), width):
+                yield block[offset:offset + width]
+
+
+def build_index(input_path, output_path, hash_type='sha1', bits_per_entry=10,
+                chunk_size=10_000_000):
+    """
+    Build a breached password index from a hash list file
+
+    Hashes are read in chunks that are sorted and de-duplicated in memory;
+    when the list does not fit in one chunk the sorted runs are spilled to
+    temporary files and merged, so memory stays bounded for lists with
+    hundreds of millions of entries.
+
+    Args:
+        input_path (str): Hash list, one hex digest per line ("HASH" or "HASH:count")
+        output_path (str): Where to write the index
+        hash_type (str): 'sha1' or 'ntlm'
+        bits_per_entry (int): Bloom filter bits per hash (10 gives about 1% false positives)
+        chunk_size (int): Hashes sorted in memory at a time
+
+    Returns:
+        int: Number of distinct hashes in the index
+    """
+    if hash_type not in HASH_TYPES:
+        raise ValueError(f"Unsupported hash type: {hash_type}")
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+    width = HASH_TYPES[hash_type]
+    dtype = f'S{width}'
+    directory = os.path.dirname(os.path.abspath(output_path))
+
+    # Sort and de-duplicate the list chunk by chunk. The first run stays in
+    # memory in case it is the only one; otherwise every run is spilled.
+    first_run = None
+    run_paths = []
+    try:
+        with open(input_path, 'r', encoding='ascii', errors='replace') as f:
+            digests = _parse_hash_lines(f, width)
+            while True:
+                chunk = np.array(list(itertools.islice(digests, chunk_size)), dtype=dtype)
+                if not chunk.size:
+                    break
+                chunk = np.unique(chunk)
+                if first_run is None and not run_paths:
+                    first_run = chunk
+                    continue
+                if first_run is not None:
+                    run_paths.append(_spill_run(first_run, directory))
+                    first_run = None
+                run_paths.append(_spill_run(chunk, directory))
+
+        runs = [first_run] if first_run is not None else []
+        upper_bound = sum(run.size for run in runs) + sum(size for _, size in run_paths)
+        bits, hash_count = _bloom_parameters(upper_bound, bits_per_entry)
+        bloom = np.zeros(bits // 8 + 1, dtype=np.uint8)
+        bloom_offset = _align(_HEADER.size)
+        records_offset = _align(bloom_offset + bloom.size)
+
+        if run_paths:
+            blocks = _merge_runs([path for path, _ in run_paths], width, dtype)
+        else:
+            blocks = runs
+
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+        try:
+            count = 0
+            with os.fdopen(fd, 'wb') as out:
+                out.seek(records_offset)
+                for block in blocks:
+                    _bloom_add(bloom, block, width, bits, hash_count)
+                    out.write(block.tobytes())
+                    count += block.size
+                out.seek(0)
+                out.write(_HEADER.pack(INDEX_MAGIC, hash_type.encode(), width, hash_count,
+                                       count, bits))
+                out.seek(bloom_offset)
+                out.write(bloom.tobytes())
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, output_path)
+        except BaseException:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
+    finally:
+        for run_path, _ in run_paths:
+            try:
+                os.unlink(run_path)
+            except OSError:
+                pass
+
+    logging.info(f"Built breached password index with {count} {hash_type} hashes")
+    return count
+
+
+def _merge_runs(run_paths, width, dtype, block_records=1_000_000):
+    """K-way merge sorted run files, dropping duplicates, in blocks of records"""
+    block = []
+    previous = None
+    for record in heapq.merge(*(_sorted_run_blocks(path, width) for path in run_paths)):
+        if record == previous:
+            continue
+        previous = record
+        block.append(record)
+        if len(block) >= block_records:
+            yield np.array(block, dtype=dtype)
+            block = []
+    if block:
+        yield np.array(block, dtype=dtype)
+
+
+class _SortedRecords:
+    """Sequence view of the fixed-width records in the index, for bisect"""
+
+    def __init__(self, buffer, offset, width, count):
+        self._buffer = buffer
+        self._offset = offset
+        self._width = width
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        start = self._offset + index * self._width
+        return self._buffer[start:start + self._width]
+
+
+class BreachedPasswordIndex:
+    """
+    Memory-mapped, read-only breached password index.
+
+    Lookups cost a handful of Bloom filter probes and, for filter hits,
+    an O(log n) binary search over the mapped records.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, hash_type, width, hash_count, count, bits = _HEADER.unpack_from(self._mmap, 0)
+            if magic != INDEX_MAGIC:
+                raise ValueError(f"Not a breached password index: {path}")
+        except Exception:
+            self._mmap.close()
+            raise
+        self.hash_type = hash_type.rstrip(b'\x00').decode()
+        self._width = width
+        self._hash_count = hash_count
+        self._bits = bits
+        self._bloom_offset = _align(_HEADER.size)
+        records_offset = _align(self._bloom_offset + bits // 8 + 1)
+        self._records = _SortedRecords(self._mmap, records_offset, width, count)
+
+    def __len__(self):
+        return len(self._records)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def close(self):
+        self._mmap.close()
+
+    def _might_contain(self, digest):
+        """Bloom filter check: False means definitely absent"""
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:16], 'little') | 1
+        bloom_offset = self._bloom_offset
+        for i in range(self._hash_count):
+            position = ((h1 + i * h2) & _MASK64) % self._bits
+            if not self._mmap[bloom_offset + (position >> 3)] & (1 << (position & 7)):
+                return False
+        return True
+
+    def contains_hash(self, digest):
+        """
+        Check whether a raw digest is in the index
+
+        Args:
+            digest (bytes): Raw digest of the index's hash type
+
+        Returns:
+            bool: True if the digest is a known breached hash
+        """
+        if len(digest) != self._width or not self._might_contain(digest):
+            return False
+        position = bisect.bisect_left(self._records, digest)
+        return position < len(self._records) and self._records[position] == digest
+
+    def contains(self, password):
+        """Check whether a plaintext password is in the index"""
+        return self.contains_hash(hash_password(password, self.hash_type))
+
+
+# Index configured through BREACHED_PASSWORDS_INDEX, opened on first use
+_default_index = None
+_default_index_opened = False
+_default_index_lock = threading.Lock()
+
+
+def get_default_index():
+    """
+    Return the index named by BREACHED_PASSWORDS_INDEX, opening it once
+
+    Returns:
+        BreachedPasswordIndex: The index, or None if unset or unreadable
+    """
+    global _default_index, _default_index_opened
+
+    if not _default_index_opened:
+        with _default_index_lock:
+            if not _default_index_opened:
+                path = os.environ.get('BREACHED_PASSWORDS_INDEX')
+                if path:
+                    try:
+                        _default_index = BreachedPasswordIndex(path)
+                        logging.info(f"Loaded breached password index with "
+                                     f"{len(_default_index)} hashes")
+                    except Exception as e:
+                        logging.error(f"Error opening breached password index: {str(e)}")
+                _default_index_opened = True
+    return _default_index
+
+
+def is_password_breached(password):
+    """
+    Check a password against the configured breached password index
+
+    Args:
+        password (str): The password to check
+
+    Returns:
+        bool: Whether the password is known to be breached, or None when no
+              index is configured
+    """
+    index = get_default_index()
+    if index is None:
+        return None
+    return index.contains(password)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build or query an offline breached password index')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build_parser = subparsers.add_parser('build', help='Build an index from a hash list file')
+    build_parser.add_argument('input', help='Hash list with one hex hash per line (HASH or HASH:count)')
+    build_parser.add_argument('output', help='Index file to write')
+    build_parser.add_argument('--hash-type', choices=sorted(HASH_TYPES), default='sha1',
+                              help='Hash type of the list (default: sha1)')
+    build_parser.add_argument('--bits-per-entry', type=int, default=10,
+                              help='Bloom filter bits per hash (default: 10)')
+    build_parser.add_argument('--chunk-size', type=int, default=10_000_000,
+                              help='Hashes sorted in memory at a time (default: 10000000)')
+
+    check_parser = subparsers.add_parser('check', help='Check passwords against an index')
+    check_parser.add_argument('index', help='Index file')
+    check_parser.add_argument('passwords', nargs='+', help='Passwords to check')
+
+    args = parser.parse_args()
+    if args.command == 'build':
+        total = build_index(args.input, args.output, args.hash_type,
+                            args.bits_per_entry, args.chunk_size)
+        print(f"Indexed {total} distinct {args.hash_type} hashes into {args.output}")
+    else:
+        with BreachedPasswordIndex(args.index) as index:
+            for password in args.passwords:
+                print(f"{password}: {'BREACHED' if index.contains(password) else 'not found'}")
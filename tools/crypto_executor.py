@@ -0,0 +1,174 @@
+"""
+Crypto Executor
+Runs CPU-bound key derivation and cipher work in a dedicated process pool
+with a bounded queue, so bursts of encryption requests cannot occupy every
+web worker
+
+Each web worker process owns one executor, so the default pool size splits
+the host's CPUs across the WEB_CONCURRENCY web workers instead of giving
+every one of them a pool of cpu_count() processes. The bounded queue only
+rejects work when a web worker has several requests in flight at once,
+i.e. under threaded (gthread) workers as configured in gunicorn.conf.py;
+a sync worker serves one request at a time and never fills it.
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+def default_workers():
+    """
+    Worker processes for one web worker's executor
+    
+    Returns:
+        int: The host's CPUs divided among WEB_CONCURRENCY web workers, at least 1
+    """
+    web_workers = max(1, int(os.environ.get('WEB_CONCURRENCY', 1)))
+    return max(1, (os.cpu_count() or 1) // web_workers)
+
+class CryptoExecutorBusy(Exception):
+    """Raised when the crypto executor queue is full"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Crypto executor is busy, retry after {retry_after}s")
+        self.retry_after = retry_after
+
+
+def _timed_call(function, args):
+    """Worker-process wrapper reporting when the call started running"""
+    return time.time(), function(*args)
+
+
+class CryptoExecutor:
+    """
+    A process pool with admission control.
+
+    At most max_workers calls run at once and at most max_queue more wait
+    for a worker; further calls are rejected immediately with
+    CryptoExecutorBusy instead of piling up. With max_workers set to 0 calls
+    run inline in the calling thread.
+    """
+
+    def __init__(self, max_workers=None, max_queue=None):
+        """
+        Args:
+            max_workers (int, optional): Worker processes (default:
+                default_workers(), the CPU count shared among web workers)
+            max_queue (int, optional): Calls allowed to wait for a worker
+                (default: twice max_workers)
+        """
+        self.max_workers = default_workers() if max_workers is None else max_workers
+        self.max_queue = 2 * self.max_workers if max_queue is None else max_queue
+        self._slots = threading.BoundedSemaphore(max(1, self.max_workers + self.max_queue))
+        self._pool = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.submitted = 0
+        self.rejected = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    def _get_pool(self):
+        """Return the process pool, starting it on first use"""
+        with self._lock:
+            if self._pool is None:
+                # Workers are not forked from the threaded web process
+                methods = multiprocessing.get_all_start_methods()
+                context = multiprocessing.get_context(
+                    'forkserver' if 'forkserver' in methods else 'spawn')
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=context)
+            return self._pool
+
+    def retry_after(self):
+        """Seconds a rejected caller should wait, from the average run time"""
+        with self._lock:
+            average_run = self.total_run / self.completed if self.completed else 1.0
+            waves = (self.in_flight + self.max_workers - 1) // max(self.max_workers, 1)
+        return max(1, math.ceil(average_run * waves))
+
+    def run(self, function, *args):
+        """
+        Run function(*args) on the pool and wait for its result
+
+        Args:
+            function (callable): Module-level function (must be picklable)
+            *args: Picklable arguments
+
+        Returns:
+            The function's return value
+
+        Raises:
+            CryptoExecutorBusy: If max_workers + max_queue calls are pending
+        """
+        if self.max_workers <= 0:
+            return function(*args)
+
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise CryptoExecutorBusy(self.retry_after())
+
+        with self._lock:
+            self.in_flight += 1
+            self.submitted += 1
+        submitted_at = time.time()
+        try:
+            try:
+                started_at, result = self._get_pool().submit(_timed_call, function, args).result()
+            except BrokenProcessPool:
+                # A worker died; start a fresh pool for the next call
+                logging.error("Crypto worker process died, restarting the pool")
+                with self._lock:
+                    self._pool = None
+                raise
+            finished_at = time.time()
+            wait = max(0.0, started_at - submitted_at)
+            with self._lock:
+                self.completed += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+                self.total_run += max(0.0, finished_at - started_at)
+            return result
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._slots.release()
+
+    def stats(self):
+        """
+        Report load and queueing of the executor.
+
+        Returns:
+            dict: Queue depth, calls running, limits, counters and average
+                  and maximum queue wait and run times in milliseconds
+        """
+        with self._lock:
+            completed = self.completed
+            return {
+                'queue_depth': max(0, self.in_flight - self.max_workers),
+                'in_flight': self.in_flight,
+                'max_workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'submitted': self.submitted,
+                'rejected': self.rejected,
+                'completed': completed,
+                'avg_wait_ms': round(1000 * self.total_wait / completed, 2) if completed else 0.0,
+                'max_wait_ms': round(1000 * self.max_wait, 2),
+                'avg_run_ms': round(1000 * self.total_run / completed, 2) if completed else 0.0
+            }
+
+    def shutdown(self):
+        """Stop the worker processes"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown()
@@ -1,10 +1,57 @@
 import base64
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.fernet import Fernet
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM, ChaCha20Poly1305
+from cryptography.exceptions import InvalidTag
+from cryptography.fernet import Fernet, InvalidToken
 import os
+import struct
 import logging
+from tools.key_cache import DerivedKeyCache
+from tools.kdf import derive as run_kdf
+from tools.kdf import (KDF_HEADER_SIZE, LEGACY_KDF, KdfParams, profile_params,
+                       pack_kdf_params, unpack_kdf_params)
+
+# PBKDF2-HMAC-SHA256 work factor of the headerless text format
+PBKDF2_ITERATIONS = LEGACY_KDF.params[0]
+
+# KDF and cost profile for new binary messages and files, which record both
+# in their header (see tools/kdf.py)
+KDF_NAME = os.environ.get('ENCRYPTION_KDF', 'pbkdf2-sha256')
+KDF_PROFILE = os.environ.get('ENCRYPTION_KDF_PROFILE', 'interactive')
+
+# Opt-in cache of keys derived for decryption (size 0 disables it), so
+# decrypting many payloads that share a salt runs the KDF once
+KEY_CACHE_SIZE = int(os.environ.get('ENCRYPTION_KEY_CACHE_SIZE', 0))
+KEY_CACHE_TTL = float(os.environ.get('ENCRYPTION_KEY_CACHE_TTL', 300))
+derived_key_cache = DerivedKeyCache(KEY_CACHE_SIZE, KEY_CACHE_TTL) if KEY_CACHE_SIZE > 0 else None
+
+# Binary transport format: a header, the salt, then the IV/nonce and
+# ciphertext exactly as the text functions produce them before base64
+BINARY_MAGIC = b'CTKB'
+BINARY_VERSION = 2
+# magic, version, algorithm id, salt length, IV/nonce length; version 2
+# follows it with the KDF block, version 1 implies the text format's PBKDF2
+_BINARY_HEADER = struct.Struct('>4sBBBB')
+_BINARY_ALGORITHMS = {'aes': 1, 'fernet': 2, 'chacha20': 3}
+_BINARY_NONCE_SIZES = {'aes': 16, 'fernet': 0, 'chacha20': 16}
+
+# Streaming file format: a header, then plaintext chunks of FILE_CHUNK_SIZE
+# bytes each sealed with an AEAD cipher under its own counter nonce
+FILE_CHUNK_SIZE = int(os.environ.get('ENCRYPTION_FILE_CHUNK_SIZE', 64 * 1024))
+MAX_FILE_CHUNK_SIZE = 16 * 1024 * 1024
+FILE_MAGIC = b'CTKE'
+FILE_VERSION = 2
+# Version 1: magic, version, cipher id, KDF id (1 = PBKDF2), iterations,
+# salt, nonce prefix, chunk size
+_FILE_HEADER_V1 = struct.Struct('>4sBBBI16s7sI')
+# Version 2: magic, version, cipher id, KDF block, salt, nonce prefix, chunk size
+_FILE_HEADER = struct.Struct(f'>4sBB{KDF_HEADER_SIZE}s16s7sI')
+_FILE_TAG_SIZE = 16
+# Algorithm id -> (cipher id in the header, AEAD class); fernet has no streaming form
+_FILE_CIPHERS = {
+    'aes': (1, AESGCM),
+    'chacha20': (2, ChaCha20Poly1305)
+}
 
 def available_algorithms():
     """
@@ -37,14 +84,16 @@ def available_algorithms():
         }
     ]
 
-def derive_key(password, salt=None, algorithm='aes'):
+def derive_key(password, salt=None, algorithm='aes', use_cache=False, kdf=LEGACY_KDF):
     """
-    Derive a key from a password using PBKDF2
+    Derive a key from a password
     
     Args:
         password (str): Password to derive key from
         salt (bytes, optional): Salt for key derivation
         algorithm (str): Encryption algorithm to use
+        use_cache (bool): Reuse a key from derived_key_cache when enabled
+        kdf (KdfParams): KDF and cost (default: the text format's PBKDF2)
         
     Returns:
         tuple: (key, salt)
@@ -56,88 +105,211 @@ def derive_key(password, salt=None, algorithm='aes'):
             salt = base64.b64decode(salt)
     
     password_bytes = password.encode()
+    key_length = _key_length(algorithm)
     
-    # Determine key length based on algorithm
+    cache_tag = None
+    if use_cache and derived_key_cache is not None:
+        cache_tag = _key_cache_tag(password_bytes, salt, algorithm, kdf, key_length)
+        key = derived_key_cache.get(cache_tag)
+        if key is not None:
+            return key, salt
+    
+    key = run_kdf(kdf, password_bytes, salt, key_length)
+    if cache_tag is not None:
+        derived_key_cache.set(cache_tag, key)
+    return key, salt
+
+def _key_length(algorithm):
+    """Derived key length in bytes for an algorithm"""
     if algorithm == 'aes':
-        key_length = 32  # 256 bits for AES-256
+        return 32  # 256 bits for AES-256
     elif algorithm == 'fernet':
-        key_length = 32  # Fernet uses this for key derivation
+        return 32  # Fernet uses this for key derivation
     elif algorithm == 'chacha20':
-        key_length = 32  # 256 bits for ChaCha20
+        return 32  # 256 bits for ChaCha20
     else:
-        key_length = 32  # Default to 256 bits
+        return 32  # Default to 256 bits
+
+def _key_cache_tag(password_bytes, salt, algorithm, kdf, key_length):
+    """derived_key_cache tag for one derivation"""
+    return derived_key_cache.tag(password_bytes, salt, algorithm.encode(),
+                                 kdf.name.encode(), repr(tuple(kdf.params)).encode(),
+                                 str(key_length).encode())
+
+def cached_derive(run):
+    """
+    Build a derive function that checks this process's derived_key_cache
+    and hands only misses to run, e.g. CryptoExecutor.run
     
-    # Derive the key using PBKDF2
-    kdf = PBKDF2HMAC(
-        algorithm=hashes.SHA256(),
-        length=key_length,
-        salt=salt,
-        iterations=100000,
-    )
+    Keys derived in pool workers would otherwise be cached per worker, so a
+    repeated decryption only hit the cache when it landed on the same one.
+    The worker derives without caching and the key is cached here instead.
     
-    key = kdf.derive(password_bytes)
-    return key, salt
+    Args:
+        run (callable): Called as run(derive_key, password, salt, algorithm,
+            False, kdf) to derive a key
+        
+    Returns:
+        callable: A derive function with derive_key's signature
+    """
+    def derive(password, salt=None, algorithm='aes', use_cache=False, kdf=LEGACY_KDF):
+        if isinstance(salt, str):
+            salt = base64.b64decode(salt)
+        
+        cache_tag = None
+        if use_cache and derived_key_cache is not None and salt is not None:
+            cache_tag = _key_cache_tag(password.encode(), salt, algorithm, kdf,
+                                       _key_length(algorithm))
+            key = derived_key_cache.get(cache_tag)
+            if key is not None:
+                return key, salt
+        
+        key, salt = run(derive_key, password, salt, algorithm, False, kdf)
+        if cache_tag is not None:
+            derived_key_cache.set(cache_tag, key)
+        return key, salt
+    
+    return derive
 
-def encrypt_text(text, password, algorithm='aes'):
+def _seal(data, key, algorithm, reserve=0):
     """
-    Encrypt text using the specified algorithm
+    Encrypt data into one new buffer laid out as reserve free bytes, then
+    the IV or nonce, then the ciphertext
+    
+    AES and ChaCha20 write straight into the preallocated buffer, and AES
+    padding only touches the last block, so the plaintext is never copied.
     
     Args:
-        text (str): Text to encrypt
-        password (str): Password for encryption
+        data (bytes-like): Plaintext
+        key (bytes): Derived key
         algorithm (str): Encryption algorithm to use
+        reserve (int): Bytes left free at the start, e.g. for a header
         
     Returns:
-        tuple: (encrypted_base64, salt_base64)
+        bytearray: The output buffer
     """
-    # Convert text to bytes
-    text_bytes = text.encode()
-    
-    # Derive key and generate salt
-    key, salt = derive_key(password, algorithm=algorithm)
+    data = memoryview(data)
     
     if algorithm == 'aes':
         # Generate initialization vector
         iv = os.urandom(16)
+        encryptor = Cipher(algorithms.AES(key), modes.CBC(iv)).encryptor()
         
-        # Create cipher
-        cipher = Cipher(algorithms.AES(key), modes.CBC(iv))
-        encryptor = cipher.encryptor()
-        
-        # Pad the plaintext (AES requires block size of 16 bytes)
-        padder = lambda s: s + (16 - len(s) % 16) * bytes([16 - len(s) % 16])
-        padded_data = padder(text_bytes)
-        
-        # Encrypt
-        encrypted_data = encryptor.update(padded_data) + encryptor.finalize()
-        
-        # Combine IV and ciphertext
-        result = iv + encrypted_data
+        # PKCS#7 padding (AES requires block size of 16 bytes) is applied to
+        # the trailing partial block only
+        pad = 16 - len(data) % 16
+        whole = len(data) - len(data) % 16
+        # update_into needs block_size - 1 spare bytes past the output
+        result = bytearray(reserve + 16 + whole + 16 + 15)
+        with memoryview(result) as view:
+            view[reserve:reserve + 16] = iv
+            position = reserve + 16
+            position += encryptor.update_into(data[:whole], view[position:])
+            position += encryptor.update_into(bytes(data[whole:]) + bytes([pad]) * pad,
+                                              view[position:])
+            encryptor.finalize()
+        del result[position:]
         
     elif algorithm == 'fernet':
         # Generate Fernet key from derived key
         fernet_key = base64.urlsafe_b64encode(key)
         f = Fernet(fernet_key)
         
-        # Encrypt
-        result = f.encrypt(text_bytes)
+        # Fernet only accepts bytes and builds its own token
+        result = bytearray(reserve)
+        result += f.encrypt(bytes(data))
         
     elif algorithm == 'chacha20':
         # ChaCha20 needs a 16-byte nonce
         nonce = os.urandom(16)
+        encryptor = Cipher(algorithms.ChaCha20(key, nonce), mode=None).encryptor()
         
-        # Use ChaCha20 algorithm
-        algorithm = algorithms.ChaCha20(key, nonce)
-        encryptor = Cipher(algorithm, mode=None).encryptor()
+        result = bytearray(reserve + 16 + len(data))
+        with memoryview(result) as view:
+            view[reserve:reserve + 16] = nonce
+            encryptor.update_into(data, view[reserve + 16:])
+            encryptor.finalize()
         
-        # Encrypt
-        encrypted_data = encryptor.update(text_bytes) + encryptor.finalize()
+    else:
+        raise ValueError(f"Unsupported algorithm: {algorithm}")
+    
+    return result
+
+def _open(data, key, algorithm):
+    """
+    Decrypt an IV or nonce followed by ciphertext, as laid out by _seal
+    
+    Args:
+        data (bytes-like): IV or nonce and ciphertext
+        key (bytes): Derived key
+        algorithm (str): Encryption algorithm used
         
-        # Combine nonce and ciphertext
-        result = nonce + encrypted_data
+    Returns:
+        bytes or bytearray: Plaintext
+    """
+    data = memoryview(data)
+    
+    if algorithm == 'aes':
+        # Extract IV (first 16 bytes) and ciphertext
+        iv = data[:16]
+        ciphertext = data[16:]
+        if not ciphertext or len(ciphertext) % 16:
+            raise ValueError("Wrong password or corrupted data")
+        
+        decryptor = Cipher(algorithms.AES(key), modes.CBC(iv)).decryptor()
+        padded_plaintext = bytearray(len(ciphertext) + 15)
+        decryptor.update_into(ciphertext, padded_plaintext)
+        decryptor.finalize()
+        
+        # Check the whole PKCS#7 padding, then unpad in place
+        pad = padded_plaintext[len(ciphertext) - 1]
+        if not 1 <= pad <= 16 or padded_plaintext[len(ciphertext) - pad:len(ciphertext)] != bytes([pad]) * pad:
+            raise ValueError("Wrong password or corrupted data")
+        del padded_plaintext[len(ciphertext) - pad:]
+        return padded_plaintext
+        
+    elif algorithm == 'fernet':
+        # Generate Fernet key from derived key
+        fernet_key = base64.urlsafe_b64encode(key)
+        f = Fernet(fernet_key)
+        
+        # Decrypt
+        try:
+            return f.decrypt(bytes(data))
+        except InvalidToken:
+            raise ValueError("Wrong password or corrupted data")
+        
+    elif algorithm == 'chacha20':
+        # Extract nonce (first 16 bytes) and ciphertext
+        nonce = data[:16]
+        ciphertext = data[16:]
+        
+        decryptor = Cipher(algorithms.ChaCha20(key, bytes(nonce)), mode=None).decryptor()
+        plaintext = bytearray(len(ciphertext))
+        decryptor.update_into(ciphertext, plaintext)
+        decryptor.finalize()
+        return plaintext
         
     else:
         raise ValueError(f"Unsupported algorithm: {algorithm}")
+
+def encrypt_text(text, password, algorithm='aes'):
+    """
+    Encrypt text using the specified algorithm
+    
+    Args:
+        text (str): Text to encrypt
+        password (str): Password for encryption
+        algorithm (str): Encryption algorithm to use
+        
+    Returns:
+        tuple: (encrypted_base64, salt_base64)
+    """
+    # Derive key and generate salt
+    key, salt = derive_key(password, algorithm=algorithm)
+    
+    # IV/nonce followed by the ciphertext
+    result = _seal(text.encode(), key, algorithm)
     
     # Convert to base64 for storage/transmission
     encrypted_base64 = base64.b64encode(result).decode()
@@ -145,7 +317,7 @@ def encrypt_text(text, password, algorithm='aes'):
     
     return encrypted_base64, salt_base64
 
-def decrypt_text(encrypted_base64, salt_base64, password, algorithm='aes'):
+def decrypt_text(encrypted_base64, salt_base64, password, algorithm='aes', derive=derive_key):
     """
     Decrypt text using the specified algorithm
     
@@ -154,6 +326,8 @@ def decrypt_text(encrypted_base64, salt_base64, password, algorithm='aes'):
         salt_base64 (str): Base64-encoded salt
         password (str): Password for decryption
         algorithm (str): Encryption algorithm used
+        derive (callable): Key derivation with derive_key's signature,
+            e.g. one dispatching to a process pool (see cached_derive)
         
     Returns:
         str: Decrypted text
@@ -161,50 +335,228 @@ def decrypt_text(encrypted_base64, salt_base64, password, algorithm='aes'):
     # Convert from base64
     encrypted_data = base64.b64decode(encrypted_base64)
     
-    # Derive the key using the provided salt
-    key, _ = derive_key(password, salt_base64, algorithm)
+    # Derive the key using the provided salt (cached when enabled)
+    key, _ = derive(password, salt_base64, algorithm, use_cache=True)
     
-    if algorithm == 'aes':
-        # Extract IV (first 16 bytes) and ciphertext
-        iv = encrypted_data[:16]
-        ciphertext = encrypted_data[16:]
-        
-        # Create cipher
-        cipher = Cipher(algorithms.AES(key), modes.CBC(iv))
-        decryptor = cipher.decryptor()
-        
-        # Decrypt
-        padded_plaintext = decryptor.update(ciphertext) + decryptor.finalize()
-        
-        # Unpad
-        unpadder = lambda s: s[:-s[-1]]
-        plaintext = unpadder(padded_plaintext)
+    # Convert bytes to string
+    return str(_open(encrypted_data, key, algorithm), 'utf-8')
+
+def _kdf_for(kdf, profile):
+    """Cost for new ciphertexts: the named KDF and profile, or the configured defaults"""
+    return profile_params(kdf or KDF_NAME, profile or KDF_PROFILE)
+
+def encrypt_bytes(data, password, algorithm='aes', derive=derive_key, kdf=None, profile=None):
+    """
+    Encrypt binary data into the self-describing binary transport format
+    
+    Layout: magic, version, algorithm id, salt length and IV/nonce length
+    (8 bytes), the KDF block (KDF, cost profile and parameters), then the
+    salt, the IV or nonce and the ciphertext, with no base64 or JSON wrapping.
+    
+    Args:
+        data (bytes-like): Plaintext, e.g. a memoryview of a request body
+        password (str): Password for encryption
+        algorithm (str): Encryption algorithm to use
+        derive (callable): Key derivation with derive_key's signature
+        kdf (str, optional): KDF name (default: ENCRYPTION_KDF)
+        profile (str, optional): Cost profile (default: ENCRYPTION_KDF_PROFILE)
         
-    elif algorithm == 'fernet':
-        # Generate Fernet key from derived key
-        fernet_key = base64.urlsafe_b64encode(key)
-        f = Fernet(fernet_key)
+    Returns:
+        bytearray: Encrypted message
+    """
+    if algorithm not in _BINARY_ALGORITHMS:
+        raise ValueError(f"Unsupported algorithm: {algorithm}")
+    kdf_params = _kdf_for(kdf, profile)
+    
+    key, salt = derive(password, os.urandom(16), algorithm, False, kdf_params)
+    header = _BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, _BINARY_ALGORITHMS[algorithm],
+                                 len(salt), _BINARY_NONCE_SIZES[algorithm]) + pack_kdf_params(kdf_params)
+    result = _seal(data, key, algorithm, reserve=len(header) + len(salt))
+    result[:len(header)] = header
+    result[len(header):len(header) + len(salt)] = salt
+    return result
+
+def decrypt_bytes(data, password, derive=derive_key):
+    """
+    Decrypt a message produced by encrypt_bytes
+    
+    Args:
+        data (bytes-like): Encrypted message
+        password (str): Password for decryption
+        derive (callable): Key derivation with derive_key's signature
         
-        # Decrypt
-        plaintext = f.decrypt(encrypted_data)
+    Returns:
+        bytes or bytearray: Decrypted data
         
-    elif algorithm == 'chacha20':
-        # Extract nonce (first 16 bytes) and ciphertext
-        nonce = encrypted_data[:16]
-        ciphertext = encrypted_data[16:]
+    Raises:
+        ValueError: If the header is invalid
+    """
+    data = memoryview(data)
+    if len(data) < _BINARY_HEADER.size:
+        raise ValueError("Input is not an encrypted message")
+    magic, version, algorithm_id, salt_size, nonce_size = _BINARY_HEADER.unpack_from(data)
+    if magic != BINARY_MAGIC:
+        raise ValueError("Input is not an encrypted message")
+    if version not in (1, BINARY_VERSION):
+        raise ValueError(f"Unsupported encrypted message version: {version}")
+    algorithm = next((name for name, number in _BINARY_ALGORITHMS.items() if number == algorithm_id), None)
+    if algorithm is None:
+        raise ValueError(f"Unsupported algorithm: {algorithm_id}")
+    if nonce_size != _BINARY_NONCE_SIZES[algorithm] or not salt_size:
+        raise ValueError("Invalid encrypted message header")
+    
+    salt_start = _BINARY_HEADER.size
+    kdf_params = LEGACY_KDF
+    if version >= 2:
+        if len(data) < salt_start + KDF_HEADER_SIZE:
+            raise ValueError("Encrypted message is truncated")
+        kdf_params = unpack_kdf_params(data, salt_start)
+        salt_start += KDF_HEADER_SIZE
+    salt_end = salt_start + salt_size
+    if len(data) < salt_end + nonce_size:
+        raise ValueError("Encrypted message is truncated")
+    key, _ = derive(password, bytes(data[salt_start:salt_end]), algorithm, True, kdf_params)
+    return _open(data[salt_end:], key, algorithm)
+
+def _read_full(stream, size):
+    """Read up to size bytes, returning fewer only at end of stream"""
+    data = stream.read(size)
+    if len(data) == size or not data:
+        return data
+    parts = [data]
+    remaining = size - len(data)
+    while remaining:
+        data = stream.read(remaining)
+        if not data:
+            break
+        parts.append(data)
+        remaining -= len(data)
+    return b''.join(parts)
+
+def _chunk_nonce(prefix, counter, final):
+    """96-bit nonce: 7-byte random prefix, 32-bit chunk counter, final-chunk flag"""
+    if counter > 0xFFFFFFFF:
+        raise ValueError("Stream has too many chunks for one nonce prefix")
+    return prefix + struct.pack('>IB', counter, 1 if final else 0)
+
+def encrypt_stream(source, password, algorithm='aes', chunk_size=None, derive=derive_key,
+                   kdf=None, profile=None):
+    """
+    Encrypt a binary stream in the chunked AEAD file format
+    
+    The header (salt, KDF parameters, cipher, nonce prefix, chunk size) is
+    authenticated as associated data of every chunk. The last chunk is sealed
+    with the final flag set in its nonce, so truncating, reordering or
+    extending the ciphertext fails authentication.
+    
+    Args:
+        source: Readable binary stream with the plaintext
+        password (str): Password for encryption
+        algorithm (str): 'aes' (AES-256-GCM) or 'chacha20' (ChaCha20-Poly1305)
+        chunk_size (int, optional): Plaintext bytes per chunk (default: FILE_CHUNK_SIZE)
+        derive (callable): Key derivation with derive_key's signature, e.g.
+            to run it on a worker pool
+        kdf (str, optional): KDF name (default: ENCRYPTION_KDF)
+        profile (str, optional): Cost profile (default: ENCRYPTION_KDF_PROFILE)
         
-        # Use ChaCha20 algorithm
-        algorithm = algorithms.ChaCha20(key, nonce)
-        decryptor = Cipher(algorithm, mode=None).decryptor()
+    Returns:
+        generator: The header followed by the sealed chunks, as bytes
+    """
+    if algorithm not in _FILE_CIPHERS:
+        raise ValueError(f"Unsupported algorithm for file encryption: {algorithm}")
+    chunk_size = chunk_size or FILE_CHUNK_SIZE
+    if not 0 < chunk_size <= MAX_FILE_CHUNK_SIZE:
+        raise ValueError(f"Chunk size must be between 1 and {MAX_FILE_CHUNK_SIZE} bytes")
+    
+    kdf_params = _kdf_for(kdf, profile)
+    
+    cipher_id, aead_class = _FILE_CIPHERS[algorithm]
+    key, salt = derive(password, os.urandom(16), algorithm, False, kdf_params)
+    nonce_prefix = os.urandom(7)
+    header = _FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, cipher_id, pack_kdf_params(kdf_params),
+                               salt, nonce_prefix, chunk_size)
+    return _seal_chunks(source, aead_class(key), header, nonce_prefix, chunk_size)
+
+def _seal_chunks(source, aead, header, nonce_prefix, chunk_size):
+    """Yield the header and each sealed chunk, reading one chunk ahead to find the last"""
+    yield header
+    counter = 0
+    chunk = _read_full(source, chunk_size)
+    while True:
+        following = _read_full(source, chunk_size) if len(chunk) == chunk_size else b''
+        final = not following
+        yield aead.encrypt(_chunk_nonce(nonce_prefix, counter, final), chunk, header)
+        if final:
+            return
+        chunk = following
+        counter += 1
+
+def decrypt_stream(source, password, derive=derive_key):
+    """
+    Decrypt a stream produced by encrypt_stream
+    
+    The header is parsed, the key derived from its parameters and the first
+    chunk opened before returning, so a wrong password or a foreign file is
+    reported here rather than part way through the output. Later tampering
+    or truncation raises ValueError from the generator.
+    
+    Args:
+        source: Readable binary stream with the ciphertext
+        password (str): Password for decryption
+        derive (callable): Key derivation with derive_key's signature
         
-        # Decrypt
-        plaintext = decryptor.update(ciphertext) + decryptor.finalize()
+    Returns:
+        generator: Decrypted plaintext chunks, as bytes
         
+    Raises:
+        ValueError: If the header is invalid or the first chunk fails authentication
+    """
+    header = _read_full(source, 5)
+    if len(header) < 5 or header[:4] != FILE_MAGIC:
+        raise ValueError("Input is not an encrypted file")
+    layout = {1: _FILE_HEADER_V1, FILE_VERSION: _FILE_HEADER}.get(header[4])
+    if layout is None:
+        raise ValueError(f"Unsupported encrypted file version: {header[4]}")
+    header += _read_full(source, layout.size - 5)
+    if len(header) < layout.size:
+        raise ValueError("Input is not an encrypted file")
+    if layout is _FILE_HEADER_V1:
+        _, _, cipher_id, kdf_id, iterations, salt, nonce_prefix, chunk_size = layout.unpack(header)
+        if kdf_id != 1:
+            raise ValueError(f"Unsupported key derivation function: {kdf_id}")
+        kdf_params = KdfParams('pbkdf2-sha256', None, (iterations,))
     else:
-        raise ValueError(f"Unsupported algorithm: {algorithm}")
+        _, _, cipher_id, kdf_block, salt, nonce_prefix, chunk_size = layout.unpack(header)
+        kdf_params = unpack_kdf_params(kdf_block)
+    if not 0 < chunk_size <= MAX_FILE_CHUNK_SIZE:
+        raise ValueError(f"Invalid chunk size in header: {chunk_size}")
+    algorithm = next((name for name, (number, _) in _FILE_CIPHERS.items() if number == cipher_id), None)
+    if algorithm is None:
+        raise ValueError(f"Unsupported cipher: {cipher_id}")
     
-    # Convert bytes to string
-    return plaintext.decode()
+    key, _ = derive(password, salt, algorithm, True, kdf_params)
+    aead = _FILE_CIPHERS[algorithm][1](key)
+    record_size = chunk_size + _FILE_TAG_SIZE
+    record = _read_full(source, record_size)
+    following = _read_full(source, record_size) if len(record) == record_size else b''
+    try:
+        first = aead.decrypt(_chunk_nonce(nonce_prefix, 0, not following), record, header)
+    except InvalidTag:
+        raise ValueError("Wrong password or corrupted data")
+    return _open_chunks(source, aead, header, nonce_prefix, record_size, first, following)
+
+def _open_chunks(source, aead, header, nonce_prefix, record_size, first, record):
+    """Yield the already opened first chunk, then open the remaining records in order"""
+    yield first
+    counter = 1
+    while record:
+        following = _read_full(source, record_size) if len(record) == record_size else b''
+        try:
+            yield aead.decrypt(_chunk_nonce(nonce_prefix, counter, not following), record, header)
+        except InvalidTag:
+            raise ValueError(f"Encrypted data is corrupted or truncated at chunk {counter}")
+        record = following
+        counter += 1
 
 def explain_algorithm(algorithm_id):
     """
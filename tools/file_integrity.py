@@ -1,5 +1,115 @@
+import os
+import re
+import mmap
+import stat
+import sqlite3
+import tarfile
+import zipfile
 import hashlib
+import tempfile
 import logging
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    import blake3
+except ImportError:  # Optional: multi-threaded BLAKE3
+    blake3 = None
+
+try:
+    import xxhash
+except ImportError:  # Optional: non-cryptographic xxHash for dedup checks
+    xxhash = None
+
+# Bytes read per chunk when hashing; one buffer of this size is reused
+DEFAULT_CHUNK_SIZE = int(os.environ.get('CHECKSUM_CHUNK_SIZE', 1024 * 1024))
+
+# Files at least this large are hashed on one thread per algorithm when
+# more than one algorithm is requested (see _hash_buffer)
+PIPELINE_MIN_SIZE = int(os.environ.get('CHECKSUM_PIPELINE_MIN_SIZE', 8 * 1024 * 1024))
+
+# Bytes covered by one leaf of a Merkle manifest, and leaves hashed per
+# worker task (see merkle_checksum)
+MERKLE_CHUNK_SIZE = int(os.environ.get('MERKLE_CHUNK_SIZE', 4 * 1024 * 1024))
+MERKLE_TASK_CHUNKS = 16
+
+# Largest chunk size accepted from a manifest passed to verify_merkle
+MAX_MERKLE_CHUNK_SIZE = int(os.environ.get('MAX_MERKLE_CHUNK_SIZE', 256 * 1024 * 1024))
+
+# Limits on uploaded archives hashed by archive_manifest, so a small zip or
+# tar.gz bomb cannot keep a worker decompressing gigabytes
+MAX_ARCHIVE_UNCOMPRESSED_BYTES = int(os.environ.get('MAX_ARCHIVE_UNCOMPRESSED_BYTES',
+                                                    1024 * 1024 * 1024))
+MAX_ARCHIVE_MEMBERS = int(os.environ.get('MAX_ARCHIVE_MEMBERS', 10000))
+
+# Files hashed per worker task in directory sweeps (see build_directory_manifest)
+SWEEP_TASK_FILES = 64
+
+# Escape sequences in sha256sum manifest file names
+_MANIFEST_UNESCAPES = {'\\': '\\', 'n': '\n', 'r': '\r'}
+
+# Domain-separation prefixes so a leaf digest can never equal a node digest
+_MERKLE_LEAF = b'\x00'
+_MERKLE_NODE = b'\x01'
+
+class ArchiveTooLarge(ValueError):
+    """Raised when an archive exceeds MAX_ARCHIVE_UNCOMPRESSED_BYTES or MAX_ARCHIVE_MEMBERS"""
+
+class HashAlgorithm(namedtuple('HashAlgorithm',
+                                 'name label summary factory cryptographic')):
+    """A registered hashing algorithm: a factory returning new hash objects plus UI metadata"""
+    __slots__ = ()
+
+# Registered hashing algorithms by name, in display order (see register_algorithm)
+HASH_ALGORITHMS = {}
+
+# Measured throughput in MB/s per algorithm, filled on first request
+_throughput = {}
+_throughput_lock = threading.Lock()
+
+# Process pools for Merkle leaf hashing by max_workers, created on first use
+# and reused across calls (see _merkle_pool)
+_merkle_pools = {}
+_merkle_pools_lock = threading.Lock()
+
+# Bytes hashed per algorithm when measuring throughput
+THROUGHPUT_SAMPLE_SIZE = 4 * 1024 * 1024
+
+def register_algorithm(name, factory, label, summary='', cryptographic=True):
+    """
+    Register a hashing algorithm for checksums, manifests and Merkle trees
+    
+    Args:
+        name (str): Algorithm identifier used by the API
+        factory (callable): Returns a new object with update() and hexdigest()
+        label (str): Display name
+        summary (str): Short description shown next to the label
+        cryptographic (bool): Whether the hash resists deliberate collisions
+    """
+    HASH_ALGORITHMS[name] = HashAlgorithm(name, label, summary, factory, cryptographic)
+
+register_algorithm('md5', hashlib.md5, 'MD5', 'Fast, not secure for cryptographic use',
+                   cryptographic=False)
+register_algorithm('sha1', hashlib.sha1, 'SHA-1', 'Legacy, not recommended for security',
+                   cryptographic=False)
+register_algorithm('sha256', hashlib.sha256, 'SHA-256', 'Recommended standard')
+register_algorithm('sha384', hashlib.sha384, 'SHA-384', 'Higher security')
+register_algorithm('sha512', hashlib.sha512, 'SHA-512', 'Maximum security, slower')
+register_algorithm('sha3_256', hashlib.sha3_256, 'SHA3-256', 'Modern algorithm')
+register_algorithm('sha3_512', hashlib.sha3_512, 'SHA3-512', 'Modern maximum security')
+register_algorithm('blake2b', hashlib.blake2b, 'BLAKE2b', 'Secure and faster than SHA-2 on 64-bit CPUs')
+register_algorithm('blake2s', hashlib.blake2s, 'BLAKE2s', 'Secure, optimized for 32-bit CPUs')
+if blake3 is not None:
+    register_algorithm('blake3', lambda: blake3.blake3(max_threads=blake3.blake3.AUTO),
+                       'BLAKE3', 'Secure, multi-threaded, fastest for large files')
+if xxhash is not None:
+    register_algorithm('xxh3_128', xxhash.xxh3_128, 'XXH3-128',
+                       'Very fast, non-cryptographic (deduplication only)', cryptographic=False)
+    register_algorithm('xxh64', xxhash.xxh64, 'XXH64',
+                       'Very fast, non-cryptographic (deduplication only)', cryptographic=False)
 
 def available_algorithms():
     """
@@ -8,7 +118,77 @@ def available_algorithms():
     Returns:
         list: Available hashing algorithms
     """
-    return ['md5', 'sha1', 'sha256', 'sha384', 'sha512', 'sha3_256', 'sha3_512']
+    return list(HASH_ALGORITHMS)
+
+def _new_hash(algorithm):
+    """
+    Create a hash object for one of available_algorithms()
+    
+    Raises:
+        ValueError: If the algorithm is not registered
+    """
+    spec = HASH_ALGORITHMS.get(algorithm)
+    if spec is None:
+        raise ValueError(f"Unsupported hashing algorithm: {algorithm}")
+    return spec.factory()
+
+def measure_throughput():
+    """
+    Measure hashing throughput of every registered algorithm on this host
+    
+    Each algorithm hashes an in-memory sample once; results are cached
+    for the life of the process.
+    
+    Returns:
+        dict: Throughput in MB/s per algorithm
+    """
+    with _throughput_lock:
+        missing = [name for name in HASH_ALGORITHMS if name not in _throughput]
+        if missing:
+            sample = memoryview(os.urandom(THROUGHPUT_SAMPLE_SIZE))
+            for name in missing:
+                hash_obj = HASH_ALGORITHMS[name].factory()
+                start = time.perf_counter()
+                hash_obj.update(sample)
+                hash_obj.hexdigest()
+                elapsed = max(time.perf_counter() - start, 1e-9)
+                _throughput[name] = round(THROUGHPUT_SAMPLE_SIZE / elapsed / 1e6, 1)
+        return dict(_throughput)
+
+def algorithm_info(measure=True):
+    """
+    Describe the registered hashing algorithms for the UI
+    
+    Args:
+        measure (bool): Include measured throughput (runs measure_throughput)
+        
+    Returns:
+        list: One dict per algorithm with name, label, summary,
+              cryptographic and throughput_mb_s (None when not measured)
+    """
+    throughput = measure_throughput() if measure else {}
+    return [{
+        'name': spec.name,
+        'label': spec.label,
+        'summary': spec.summary,
+        'cryptographic': spec.cryptographic,
+        'throughput_mb_s': throughput.get(spec.name)
+    } for spec in HASH_ALGORITHMS.values()]
+
+def recommend_algorithm(cryptographic=True):
+    """
+    Pick the fastest measured algorithm suitable for the use case
+    
+    Args:
+        cryptographic (bool): Require tamper resistance
+        
+    Returns:
+        str: Algorithm name
+    """
+    throughput = measure_throughput()
+    candidates = [spec.name for spec in HASH_ALGORITHMS.values()
+                  if not cryptographic or spec.cryptographic]
+    return max(candidates, key=lambda name: throughput[name])
 
 def calculate_checksum(file, algorithm='sha256'):
     """
@@ -20,38 +200,695 @@ def calculate_checksum(file, algorithm='sha256'):
         
     Returns:
         str: Calculated checksum
+        
+    Raises:
+        ValueError: If the algorithm is not registered
+    """
+    return calculate_checksums(file, [algorithm])[algorithm]
+
+def calculate_checksums(file, algorithms=('sha256',), chunk_size=DEFAULT_CHUNK_SIZE):
     """
+    Calculate several checksums for a file in a single read pass
+    
+    In-memory uploads and regular files on disk are hashed straight from
+    their buffer or a read-only mmap, without a read loop or a copy. Other files are
+    read into a reused buffer and each chunk is fed to every requested
+    hash object, so asking for MD5, SHA-256 and SHA-512 together reads the
+    file once instead of three times. On multi-core hosts, large buffered
+    or mapped files with several algorithms are hashed by one thread per
+    algorithm.
+    
+    Args:
+        file: File object (from request.files)
+        algorithms (list): Hashing algorithms to use
+        chunk_size (int): Bytes read per chunk
+        
+    Returns:
+        dict: Hexadecimal checksum per algorithm, in the order requested
+        
+    Raises:
+        ValueError: If an algorithm is not registered
+    """
+    hashers = {algorithm: _new_hash(algorithm) for algorithm in algorithms}
+    hash_objs = list(hashers.values())
+    
+    # Measure the file, then reset file pointer to the beginning
+    file.seek(0, os.SEEK_END)
+    size = file.tell()
+    file.seek(0)
+    parallel = len(hash_objs) > 1 and size >= PIPELINE_MIN_SIZE and (os.cpu_count() or 1) > 1
+    
+    with _whole_file_view(file) as view:
+        if view is not None:
+            _hash_buffer(view, hash_objs, parallel)
+        elif len(hash_objs) == 1 and hasattr(hashlib, 'file_digest') and _is_binary_reader(file):
+            hashlib.file_digest(file, lambda: hash_objs[0])
+        else:
+            _hash_sequential(file, hash_objs, chunk_size)
+    
     # Reset file pointer to the beginning
     file.seek(0)
     
-    # Select the appropriate hashing algorithm
-    if algorithm == 'md5':
-        hash_obj = hashlib.md5()
-    elif algorithm == 'sha1':
-        hash_obj = hashlib.sha1()
-    elif algorithm == 'sha256':
-        hash_obj = hashlib.sha256()
-    elif algorithm == 'sha384':
-        hash_obj = hashlib.sha384()
-    elif algorithm == 'sha512':
-        hash_obj = hashlib.sha512()
-    elif algorithm == 'sha3_256':
-        hash_obj = hashlib.sha3_256()
-    elif algorithm == 'sha3_512':
-        hash_obj = hashlib.sha3_512()
+    # Return the hexadecimal digests
+    return {algorithm: hash_obj.hexdigest() for algorithm, hash_obj in hashers.items()}
+
+@contextmanager
+def _whole_file_view(file):
+    """
+    Yield a zero-copy view of a whole file's bytes, or None if unavailable
+    
+    In-memory files expose their buffer directly: BytesIO, and Werkzeug's
+    upload spool (a SpooledTemporaryFile) until it rolls over to disk,
+    whose fileno() would force that rollover. Non-empty regular files on
+    disk (rolled-over uploads, paths opened in batch mode) are
+    memory-mapped read-only.
+    """
+    file = getattr(file, 'stream', file)  # Werkzeug FileStorage
+    if isinstance(file, tempfile.SpooledTemporaryFile) and not file._rolled:
+        file = file._file
+    
+    getbuffer = getattr(file, 'getbuffer', None)
+    if getbuffer is not None:
+        view = getbuffer()
+        try:
+            yield view
+        finally:
+            view.release()
+        return
+    
+    try:
+        fd = file.fileno()
+        file_stat = os.fstat(fd)
+    except (AttributeError, OSError, ValueError):
+        yield None
+        return
+    if not stat.S_ISREG(file_stat.st_mode) or file_stat.st_size == 0:
+        yield None
+        return
+    
+    try:
+        mapped = mmap.mmap(fd, 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        yield None
+        return
+    with mapped:
+        view = memoryview(mapped)
+        try:
+            yield view
+        finally:
+            view.release()
+
+def _is_binary_reader(file):
+    """Whether hashlib.file_digest accepts file as a binary reader"""
+    try:
+        return hasattr(file, 'readinto') and file.readable()
+    except (AttributeError, ValueError):
+        return False
+
+def _hash_buffer(view, hash_objs, parallel=False):
+    """
+    Feed a whole in-memory buffer to every hash object
+    
+    hashlib releases the GIL on large updates, so with parallel set each
+    hash runs on its own thread and core; an error in any of them is
+    re-raised here once all have finished.
+    """
+    if not parallel:
+        for hash_obj in hash_objs:
+            hash_obj.update(view)
+        return
+    errors = []
+    
+    def update(hash_obj):
+        try:
+            hash_obj.update(view)
+        except BaseException as e:
+            errors.append(e)
+    
+    threads = [threading.Thread(target=update, args=(hash_obj,)) for hash_obj in hash_objs]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+def _hash_sequential(file, hash_objs, chunk_size, limit=None):
+    """
+    Feed the rest of file to every hash object on the calling thread
+    
+    Args:
+        limit (int, optional): Raise ArchiveTooLarge once more than this
+            many bytes have been read
+    
+    Returns:
+        int: Number of bytes read
+    """
+    updates = [hash_obj.update for hash_obj in hash_objs]
+    total = 0
+    
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    readinto = getattr(file, 'readinto', None)
+    if readinto is not None:
+        # Fill the same buffer on every read instead of allocating a chunk
+        while True:
+            size = readinto(buffer)
+            if not size:
+                break
+            total += size
+            if limit is not None and total > limit:
+                view.release()
+                raise ArchiveTooLarge(f"Archive expands to more than {MAX_ARCHIVE_UNCOMPRESSED_BYTES} bytes")
+            chunk = view[:size]
+            for update in updates:
+                update(chunk)
     else:
-        # Default to SHA-256
-        hash_obj = hashlib.sha256()
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            total += len(chunk)
+            if limit is not None and total > limit:
+                raise ArchiveTooLarge(f"Archive expands to more than {MAX_ARCHIVE_UNCOMPRESSED_BYTES} bytes")
+            for update in updates:
+                update(chunk)
+    view.release()
+    return total
+
+def calculate_checksums_stream(stream, algorithms=('sha256',), chunk_size=DEFAULT_CHUNK_SIZE):
+    """
+    Calculate checksums of a non-seekable stream as its bytes arrive
     
-    # Read and update hash in chunks for memory efficiency
-    for chunk in iter(lambda: file.read(4096), b''):
-        hash_obj.update(chunk)
+    Used for request bodies: each chunk is hashed as soon as it is received,
+    so nothing is spooled to disk and the digests are ready when the last
+    byte arrives.
     
-    # Reset file pointer to the beginning
-    file.seek(0)
+    Args:
+        stream: Readable binary stream, consumed to EOF (e.g. request.stream)
+        algorithms (list): Hashing algorithms to use
+        chunk_size (int): Bytes read per chunk
+        
+    Returns:
+        tuple: (checksums dict per algorithm, number of bytes read)
+    """
+    hashers = {algorithm: _new_hash(algorithm) for algorithm in algorithms}
+    size = _hash_sequential(stream, list(hashers.values()), chunk_size)
+    return {algorithm: hash_obj.hexdigest() for algorithm, hash_obj in hashers.items()}, size
+
+def _merkle_leaves(file, algorithm, chunk_size, first, count):
+    """Leaf digests of count chunks of file, starting at chunk index first"""
+    file.seek(first * chunk_size)
+    buffer = bytearray(chunk_size)
+    view = memoryview(buffer)
+    leaves = []
+    for _ in range(count):
+        size = file.readinto(buffer)
+        hash_obj = _new_hash(algorithm)
+        hash_obj.update(_MERKLE_LEAF)
+        hash_obj.update(view[:size])
+        leaves.append(hash_obj.digest())
+    view.release()
+    return leaves
+
+def _merkle_leaves_at_path(path, algorithm, chunk_size, first, count):
+    """Worker-process entry point: leaf digests of a range of chunks of a file"""
+    with open(path, 'rb') as file:
+        return _merkle_leaves(file, algorithm, chunk_size, first, count)
+
+def _merkle_root(leaves, algorithm):
+    """Combine leaf digests pairwise into the root; an odd last node is carried up"""
+    level = leaves
+    while len(level) > 1:
+        parents = []
+        for i in range(0, len(level) - 1, 2):
+            hash_obj = _new_hash(algorithm)
+            hash_obj.update(_MERKLE_NODE)
+            hash_obj.update(level[i])
+            hash_obj.update(level[i + 1])
+            parents.append(hash_obj.digest())
+        if len(level) % 2:
+            parents.append(level[-1])
+        level = parents
+    return level[0]
+
+def _merkle_pool(max_workers):
+    """Return the shared process pool for max_workers, creating it once"""
+    pool = _merkle_pools.get(max_workers)
+    if pool is None:
+        with _merkle_pools_lock:
+            pool = _merkle_pools.get(max_workers)
+            if pool is None:
+                pool = _merkle_pools[max_workers] = ProcessPoolExecutor(max_workers=max_workers)
+    return pool
+
+def _iter_merkle_leaves(source, algorithm, chunk_size, chunk_count, max_workers):
+    """
+    Yield leaf digests in order, hashing tasks of MERKLE_TASK_CHUNKS chunks
+    
+    A path with more than one task is hashed by the shared process pool,
+    each worker opening the file itself; a file object is hashed in this
+    process. Closing the generator early cancels tasks that have not started.
+    """
+    tasks = [(first, min(MERKLE_TASK_CHUNKS, chunk_count - first))
+             for first in range(0, chunk_count, MERKLE_TASK_CHUNKS)]
+    
+    if not isinstance(source, (str, os.PathLike)):
+        for first, count in tasks:
+            yield from _merkle_leaves(source, algorithm, chunk_size, first, count)
+        source.seek(0)
+        return
+    
+    if len(tasks) <= 1 or max_workers == 1:
+        for first, count in tasks:
+            yield from _merkle_leaves_at_path(source, algorithm, chunk_size, first, count)
+        return
+    
+    executor = _merkle_pool(max_workers)
+    futures = []
+    try:
+        for first, count in tasks:
+            futures.append(executor.submit(_merkle_leaves_at_path, source, algorithm,
+                                           chunk_size, first, count))
+        for future in futures:
+            yield from future.result()
+    finally:
+        for future in futures:
+            future.cancel()
+
+def _source_size(source):
+    """Size in bytes of a path or seekable file object"""
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.getsize(source)
+    source.seek(0, os.SEEK_END)
+    size = source.tell()
+    source.seek(0)
+    return size
+
+def merkle_checksum(source, algorithm='sha256', chunk_size=MERKLE_CHUNK_SIZE, max_workers=None):
+    """
+    Calculate a Merkle-tree checksum and its per-chunk manifest
+    
+    The file is split into fixed-size chunks that are hashed independently
+    (in parallel across processes when source is a path) and combined
+    pairwise into a root digest. The manifest can later be checked with
+    verify_merkle to locate corrupted byte ranges.
+    
+    Args:
+        source: Path of the file, or a seekable binary file object
+        algorithm (str): Hashing algorithm for leaves and nodes
+        chunk_size (int): Bytes per chunk
+        max_workers (int, optional): Worker processes (default: CPU count)
+        
+    Returns:
+        dict: Manifest with algorithm, chunk_size, size, root and the
+              hexadecimal digest of every chunk
+    """
+    size = _source_size(source)
+    chunk_count = max(1, -(-size // chunk_size))
+    leaves = list(_iter_merkle_leaves(source, algorithm, chunk_size, chunk_count, max_workers))
+    
+    return {
+        'algorithm': algorithm,
+        'chunk_size': chunk_size,
+        'size': size,
+        'root': _merkle_root(leaves, algorithm).hex(),
+        'chunks': [leaf.hex() for leaf in leaves]
+    }
+
+def verify_merkle(source, manifest, stop_on_first=False, max_workers=None):
+    """
+    Verify a file against a Merkle manifest from merkle_checksum
+    
+    Args:
+        source: Path of the file, or a seekable binary file object
+        manifest (dict): Manifest to verify against
+        stop_on_first (bool): Stop hashing at the first corrupted chunk
+        max_workers (int, optional): Worker processes (default: CPU count)
+        
+    Returns:
+        dict: is_valid, size_matches and the corrupted byte ranges
+              ({'index', 'offset', 'length'} per mismatching chunk)
+        
+    Raises:
+        ValueError: If the manifest's chunk size is out of range or its
+                    chunk list does not match its size
+    """
+    algorithm = manifest['algorithm']
+    chunk_size = manifest['chunk_size']
+    if not isinstance(chunk_size, int) or not 0 < chunk_size <= MAX_MERKLE_CHUNK_SIZE:
+        raise ValueError(f"Manifest chunk size must be between 1 and {MAX_MERKLE_CHUNK_SIZE} bytes")
+    manifest_size = manifest['size']
+    if not isinstance(manifest_size, int) or manifest_size < 0:
+        raise ValueError("Manifest size must be a non-negative integer")
+    if len(manifest['chunks']) != max(1, -(-manifest_size // chunk_size)):
+        raise ValueError("Manifest chunk count does not match its size")
+    expected = [bytes.fromhex(digest) for digest in manifest['chunks']]
+    size = _source_size(source)
+    chunk_count = max(1, -(-size // chunk_size))
+    
+    mismatches = []
+    leaves = _iter_merkle_leaves(source, algorithm, chunk_size,
+                                 min(chunk_count, len(expected)), max_workers)
+    try:
+        for index, leaf in enumerate(leaves):
+            if leaf != expected[index]:
+                offset = index * chunk_size
+                mismatches.append({'index': index, 'offset': offset,
+                                   'length': max(0, min(chunk_size, size - offset))})
+                if stop_on_first:
+                    break
+    finally:
+        leaves.close()
+    
+    # Chunks present in only one of the file and the manifest
+    if not (stop_on_first and mismatches):
+        for index in range(min(chunk_count, len(expected)), max(chunk_count, len(expected))):
+            offset = index * chunk_size
+            mismatches.append({'index': index, 'offset': offset,
+                               'length': max(0, min(chunk_size, size - offset))})
+    
+    size_matches = size == manifest_size
+    return {
+        'is_valid': size_matches and not mismatches,
+        'size_matches': size_matches,
+        'mismatches': mismatches
+    }
+
+def _checksum_path(path, algorithm):
+    """Worker-process entry point: checksum of one file by path, or None if unreadable"""
+    try:
+        with open(path, 'rb') as file:
+            return calculate_checksum(file, algorithm)
+    except OSError as e:
+        logging.warning(f"Could not read {path}: {e.strerror or e}")
+        return None
+
+def _checksum_paths(paths, algorithm):
+    """Worker-process entry point: checksums of a batch of files"""
+    return [_checksum_path(path, algorithm) for path in paths]
+
+class HashIndex:
+    """
+    Persistent SQLite index of file checksums keyed by path, size and mtime
     
-    # Return the hexadecimal digest
-    return hash_obj.hexdigest()
+    A file whose size and modification time are unchanged since it was
+    last hashed is served from the index instead of being read again.
+    """
+    
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Database file, created if missing
+        """
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('CREATE TABLE IF NOT EXISTS file_hashes ('
+                           'path TEXT NOT NULL, algorithm TEXT NOT NULL, '
+                           'size INTEGER NOT NULL, mtime_ns INTEGER NOT NULL, '
+                           'digest TEXT NOT NULL, PRIMARY KEY (path, algorithm))')
+    
+    def lookup(self, path, algorithm, size, mtime_ns):
+        """Return the indexed checksum, or None if missing or out of date"""
+        row = self._conn.execute(
+            'SELECT digest FROM file_hashes WHERE path = ? AND algorithm = ? '
+            'AND size = ? AND mtime_ns = ?', (path, algorithm, size, mtime_ns)).fetchone()
+        return row[0] if row else None
+    
+    def store_many(self, rows):
+        """Record (path, algorithm, size, mtime_ns, digest) rows in one transaction"""
+        with self._conn:
+            self._conn.executemany('INSERT OR REPLACE INTO file_hashes '
+                                   '(path, algorithm, size, mtime_ns, digest) '
+                                   'VALUES (?, ?, ?, ?, ?)', rows)
+    
+    def close(self):
+        self._conn.close()
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.close()
+
+def walk_files(root):
+    """
+    List the regular files below a directory
+    
+    Args:
+        root (str): Directory to walk
+        
+    Returns:
+        list: Paths relative to root using "/" separators, sorted
+    """
+    paths = []
+    for directory, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for filename in filenames:
+            full_path = os.path.join(directory, filename)
+            if os.path.isfile(full_path) and not os.path.islink(full_path):
+                paths.append(os.path.relpath(full_path, root).replace(os.sep, '/'))
+    return sorted(paths)
+
+def checksum_tree(root, paths=None, algorithm='sha256', index_path=None, max_workers=None):
+    """
+    Checksum many files below a directory, skipping unchanged indexed files
+    
+    Files missing from the index, or whose size or mtime changed, are
+    hashed by a process pool in batches of SWEEP_TASK_FILES and recorded in
+    the index for the next sweep. Paths that resolve outside root, are not
+    regular files or cannot be read are counted as missing and left out
+    of the checksums, so the rest of the tree is still hashed.
+    
+    Args:
+        root (str): Directory the paths are relative to
+        paths (list, optional): Relative paths to hash (default: walk_files(root))
+        algorithm (str): Hashing algorithm to use
+        index_path (str, optional): SQLite hash index to consult and update
+        max_workers (int, optional): Worker processes (default: CPU count)
+        
+    Returns:
+        tuple: (dict of checksum per relative path, dict of hashed/skipped/missing counts)
+    """
+    paths = walk_files(root) if paths is None else list(paths)
+    root = os.path.realpath(root)
+    index = HashIndex(index_path) if index_path else None
+    checksums = {}
+    stale = []
+    missing = 0
+    try:
+        for relative_path in paths:
+            full_path = os.path.realpath(os.path.join(root, relative_path))
+            if os.path.commonpath([root, full_path]) != root:
+                logging.warning(f"Skipping {relative_path!r}: resolves outside {root}")
+                missing += 1
+                continue
+            try:
+                st = os.stat(full_path)
+            except OSError:
+                missing += 1
+                continue
+            if not stat.S_ISREG(st.st_mode):
+                missing += 1
+                continue
+            digest = index.lookup(full_path, algorithm, st.st_size,
+                                  st.st_mtime_ns) if index else None
+            if digest is None:
+                stale.append((relative_path, full_path, st))
+            else:
+                checksums[relative_path] = digest
+        
+        batches = [stale[i:i + SWEEP_TASK_FILES] for i in range(0, len(stale), SWEEP_TASK_FILES)]
+        if len(batches) > 1 and max_workers != 1:
+            executor = ProcessPoolExecutor(max_workers=max_workers)
+            results = executor.map(_checksum_paths,
+                                   [[full_path for _, full_path, _ in batch] for batch in batches],
+                                   [algorithm] * len(batches))
+        else:
+            executor = None
+            results = (_checksum_paths([full_path for _, full_path, _ in batch], algorithm)
+                       for batch in batches)
+        hashed = 0
+        try:
+            for batch, digests in zip(batches, results):
+                rows = []
+                for (relative_path, full_path, st), digest in zip(batch, digests):
+                    if digest is None:
+                        missing += 1
+                        continue
+                    checksums[relative_path] = digest
+                    rows.append((full_path, algorithm, st.st_size, st.st_mtime_ns, digest))
+                hashed += len(rows)
+                if index:
+                    index.store_many(rows)
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+    finally:
+        if index:
+            index.close()
+    
+    stats = {'hashed': hashed, 'skipped': len(paths) - hashed - missing,
+             'missing': missing}
+    return checksums, stats
+
+def _escape_manifest_name(name):
+    """Escape a file name the way sha256sum does; returns (prefix, name)"""
+    if '\\' in name or '\n' in name or '\r' in name:
+        return '\\', name.replace('\\', '\\\\').replace('\n', '\\n').replace('\r', '\\r')
+    return '', name
+
+def format_manifest(checksums):
+    """
+    Render checksums in sha256sum (coreutils) format
+    
+    Args:
+        checksums (dict): Checksum per relative path
+        
+    Returns:
+        str: One "<digest>  <path>" line per file, sorted by path
+    """
+    lines = []
+    for path in sorted(checksums):
+        prefix, name = _escape_manifest_name(path)
+        lines.append(f"{prefix}{checksums[path]}  {name}\n")
+    return ''.join(lines)
+
+def parse_manifest(text):
+    """
+    Parse a sha256sum-format manifest
+    
+    Args:
+        text (str): Manifest content
+        
+    Returns:
+        dict: Checksum per path
+        
+    Raises:
+        ValueError: If a line is not in sha256sum format
+    """
+    checksums = {}
+    for line_number, line in enumerate(text.splitlines(), start=1):
+        if not line.strip():
+            continue
+        escaped = line.startswith('\\')
+        if escaped:
+            line = line[1:]
+        digest, separator, name = line.partition(' ')
+        if not separator or not name or name[0] not in ' *':
+            raise ValueError(f"Invalid manifest line {line_number}")
+        name = name[1:]
+        if escaped:
+            name = re.sub(r'\\([\\nr])', lambda match: _MANIFEST_UNESCAPES[match.group(1)], name)
+        checksums[name] = digest.lower()
+    return checksums
+
+def build_directory_manifest(root, algorithm='sha256', index_path=None, max_workers=None):
+    """
+    Build a sha256sum-format manifest for every file below a directory
+    
+    Args:
+        root (str): Directory to sweep
+        algorithm (str): Hashing algorithm to use
+        index_path (str, optional): SQLite hash index used to skip unchanged files
+        max_workers (int, optional): Worker processes (default: CPU count)
+        
+    Returns:
+        tuple: (manifest text, dict of hashed/skipped/missing counts)
+    """
+    checksums, stats = checksum_tree(root, algorithm=algorithm, index_path=index_path,
+                                     max_workers=max_workers)
+    return format_manifest(checksums), stats
+
+def verify_directory_manifest(root, manifest_text, algorithm='sha256', index_path=None,
+                              max_workers=None):
+    """
+    Verify the files below a directory against a sha256sum-format manifest
+    
+    Args:
+        root (str): Directory the manifest paths are relative to
+        manifest_text (str): Manifest content
+        algorithm (str): Hashing algorithm the manifest was built with
+        index_path (str, optional): SQLite hash index used to skip unchanged files
+        max_workers (int, optional): Worker processes (default: CPU count)
+        
+    Returns:
+        dict: Sorted lists of 'ok', 'failed' and 'missing' paths, and the
+              hashed/skipped counts
+    """
+    expected = parse_manifest(manifest_text)
+    checksums, stats = checksum_tree(root, expected, algorithm=algorithm,
+                                     index_path=index_path, max_workers=max_workers)
+    result = {'ok': [], 'failed': [], 'missing': []}
+    for path in sorted(expected):
+        if path not in checksums:
+            result['missing'].append(path)
+        elif checksums[path] == expected[path]:
+            result['ok'].append(path)
+        else:
+            result['failed'].append(path)
+    result['hashed'] = stats['hashed']
+    result['skipped'] = stats['skipped']
+    return result
+
+def archive_manifest(file, algorithm='sha256'):
+    """
+    Build a sha256sum-format manifest of the files inside a tar or zip archive
+    
+    Members are hashed straight from the archive without extracting them
+    to disk. At most MAX_ARCHIVE_MEMBERS entries and
+    MAX_ARCHIVE_UNCOMPRESSED_BYTES of member data are processed.
+    
+    Args:
+        file: Seekable binary file object holding a tar (optionally
+              compressed) or zip archive
+        algorithm (str): Hashing algorithm to use
+        
+    Returns:
+        tuple: (manifest text, number of files)
+        
+    Raises:
+        ValueError: If the file is not a supported archive
+        ArchiveTooLarge: If the archive exceeds the member or size limits
+    """
+    checksums = {}
+    remaining = MAX_ARCHIVE_UNCOMPRESSED_BYTES
+    file.seek(0)
+    if zipfile.is_zipfile(file):
+        file.seek(0)
+        with zipfile.ZipFile(file) as archive:
+            members = archive.infolist()
+            if len(members) > MAX_ARCHIVE_MEMBERS:
+                raise ArchiveTooLarge(f"Archive has more than {MAX_ARCHIVE_MEMBERS} entries")
+            # Declared sizes reject most bombs up front; actual bytes are
+            # still counted since the directory can lie
+            if sum(info.file_size for info in members) > remaining:
+                raise ArchiveTooLarge(f"Archive expands to more than {MAX_ARCHIVE_UNCOMPRESSED_BYTES} bytes")
+            for info in members:
+                if info.is_dir():
+                    continue
+                hash_obj = _new_hash(algorithm)
+                with archive.open(info) as member:
+                    remaining -= _hash_sequential(member, [hash_obj], DEFAULT_CHUNK_SIZE, remaining)
+                checksums[info.filename] = hash_obj.hexdigest()
+    else:
+        file.seek(0)
+        try:
+            archive = tarfile.open(fileobj=file, mode='r:*')
+        except tarfile.TarError:
+            raise ValueError("Unsupported archive format (expected tar or zip)")
+        with archive:
+            for count, member in enumerate(archive, 1):
+                if count > MAX_ARCHIVE_MEMBERS:
+                    raise ArchiveTooLarge(f"Archive has more than {MAX_ARCHIVE_MEMBERS} entries")
+                if not member.isfile():
+                    continue
+                if member.size > remaining:
+                    raise ArchiveTooLarge(f"Archive expands to more than {MAX_ARCHIVE_UNCOMPRESSED_BYTES} bytes")
+                hash_obj = _new_hash(algorithm)
+                remaining -= _hash_sequential(archive.extractfile(member), [hash_obj],
+                                              DEFAULT_CHUNK_SIZE, remaining)
+                checksums[member.name] = hash_obj.hexdigest()
+    file.seek(0)
+    return format_manifest(checksums), len(checksums)
 
 def verify_checksum(file, provided_checksum, algorithm='sha256'):
     """
@@ -122,6 +959,36 @@ def explain_algorithm(algorithm):
             'description': 'The 512-bit variant of SHA-3, offering maximum security in the SHA-3 family.',
             'use_case': 'Highest security requirements, long-term data integrity',
             'security_level': 'Extremely High - no known practical attacks, different mathematical foundation than SHA-2'
+        },
+        'blake2b': {
+            'name': 'BLAKE2b (512-bit)',
+            'description': 'Successor of the SHA-3 finalist BLAKE, faster than MD5 and SHA-2 on 64-bit CPUs while remaining secure.',
+            'use_case': 'Fast secure checksums of large files and bulk integrity checks',
+            'security_level': 'Very High - no known practical attacks'
+        },
+        'blake2s': {
+            'name': 'BLAKE2s (256-bit)',
+            'description': 'The BLAKE2 variant optimized for 8- to 32-bit platforms, producing a 256-bit hash.',
+            'use_case': 'Secure checksums on small or 32-bit devices',
+            'security_level': 'High - no known practical attacks'
+        },
+        'blake3': {
+            'name': 'BLAKE3 (256-bit)',
+            'description': 'Tree-structured evolution of BLAKE2 that hashes in parallel across CPU cores and SIMD lanes.',
+            'use_case': 'Fastest secure hashing of very large files and bulk deduplication',
+            'security_level': 'High - no known practical attacks'
+        },
+        'xxh3_128': {
+            'name': 'XXH3 (128-bit xxHash)',
+            'description': 'Extremely fast non-cryptographic hash designed for checksums and hash tables.',
+            'use_case': 'Detecting accidental corruption and duplicate files',
+            'security_level': 'None - offers no protection against deliberate tampering'
+        },
+        'xxh64': {
+            'name': 'XXH64 (64-bit xxHash)',
+            'description': 'Fast 64-bit non-cryptographic hash from the xxHash family.',
+            'use_case': 'Quick deduplication and corruption checks',
+            'security_level': 'None - offers no protection against deliberate tampering'
         }
     }
     
@@ -0,0 +1,414 @@
+"""
+Key Derivation Functions
+Registry of password-based KDFs with named cost profiles, header encoding
+of the chosen parameters and host calibration.
+
+Each KDF takes up to three integer cost parameters:
+
+    pbkdf2-sha256   iterations
+    scrypt          log2(N), block size r, parallelism p
+    argon2id        iterations, memory in KiB, lanes (cryptography >= 44)
+
+Ciphertext headers carry the KDF id, the profile id and the parameters
+(see pack_kdf_params), so decryption reads the cost instead of assuming it
+and profiles can be retuned per deployment without breaking old data.
+Parameters are untrusted input on decryption, so no derivation may cost
+more than DECODE_COST_FACTOR times the archival profile or use more than
+MAX_KDF_MEMORY. The archival cost used there is the higher of the built-in
+archival profile and the calibrated one, so calibrating a slow host low
+does not reject ciphertexts written with the defaults elsewhere.
+
+Calibrate a host with:
+
+    python -m tools.kdf calibrate -o kdf_calibration.json
+
+and point ENCRYPTION_KDF_CALIBRATION at the file to use its parameters.
+"""
+
+import os
+import json
+import time
+import struct
+import logging
+from collections import namedtuple
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+from cryptography.hazmat.primitives.kdf.scrypt import Scrypt
+
+try:
+    from cryptography.hazmat.primitives.kdf.argon2 import Argon2id
+except ImportError:  # cryptography < 44
+    Argon2id = None
+
+# Cost profile -> (id in headers, target derivation latency in seconds used
+# by calibration). interactive: a user waits on the request; bulk: batch and
+# file jobs where one derivation is amortized over a large payload;
+# archival: long-term storage
+COST_PROFILES = {
+    'interactive': (1, 0.1),
+    'bulk': (2, 0.5),
+    'archival': (3, 2.0)
+}
+
+# Header profile id for parameters that do not come from a profile
+CUSTOM_PROFILE_ID = 0
+
+# Upper bound on memory a header may make one derivation use, so a crafted
+# ciphertext cannot exhaust the host
+MAX_KDF_MEMORY = int(os.environ.get('ENCRYPTION_KDF_MAX_MEMORY', 256 * 1024 * 1024))
+
+# Upper bound on the work of one derivation, as a multiple of the KDF's
+# archival profile (built-in or calibrated, whichever costs more), so a
+# crafted header cannot pin a crypto worker
+DECODE_COST_FACTOR = float(os.environ.get('ENCRYPTION_KDF_DECODE_FACTOR', 2))
+
+# KDF id, profile id and three cost parameters (unused ones are zero)
+_KDF_BLOCK = struct.Struct('>BBIII')
+KDF_HEADER_SIZE = _KDF_BLOCK.size
+
+class KeyDerivationFunction(namedtuple('KeyDerivationFunction',
+                                       'name kdf_id label parameters limits derive work memory '
+                                       'profiles calibrate reference_work')):
+    """
+    A registered KDF: derive(password, salt, length, params) plus cost
+    metadata; reference_work is the work of the registered archival profile
+    """
+    __slots__ = ()
+
+class KdfParams(namedtuple('KdfParams', 'name profile params')):
+    """One derivation's cost: KDF name, profile name (None if custom) and parameter tuple"""
+    __slots__ = ()
+
+# Registered KDFs by name (see register_kdf)
+KDFS = {}
+
+def register_kdf(name, kdf_id, derive, label, parameters, limits, profiles, work,
+                 memory=None, calibrate=None):
+    """
+    Register a password-based key derivation function
+
+    Args:
+        name (str): KDF identifier used by the API
+        kdf_id (int): Identifier written into headers (1-255, never reused)
+        derive (callable): derive(password, salt, length, params) -> bytes
+        label (str): Display name
+        parameters (tuple): Names of the cost parameters
+        limits (tuple): Largest accepted value of each parameter
+        profiles (dict): Profile name -> default parameter tuple
+        work (callable): Relative time cost of a parameter tuple, compared
+            against the archival profile to bound decoded parameters; the
+            registered archival profile stays a floor for that bound after
+            calibration
+        memory (callable, optional): Bytes of memory used for a parameter tuple
+        calibrate (callable, optional): calibrate(target_seconds, max_memory,
+            default_params) -> parameter tuple meeting the target latency
+    """
+    KDFS[name] = KeyDerivationFunction(name, kdf_id, label, tuple(parameters), tuple(limits),
+                                       derive, work, memory, dict(profiles), calibrate,
+                                       work(profiles['archival']))
+
+def _timed(function, *args):
+    """Seconds taken by one call"""
+    started = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - started
+
+def _pbkdf2(password, salt, length, params):
+    iterations, = params
+    return PBKDF2HMAC(algorithm=hashes.SHA256(), length=length, salt=salt,
+                      iterations=iterations).derive(password)
+
+def _calibrate_pbkdf2(target, max_memory, default_params):
+    """Scale iterations linearly from a timed sample"""
+    sample = 20000
+    # The first derivation pays one-time setup costs; time the second
+    _pbkdf2(b'calibration', os.urandom(16), 32, (1000,))
+    elapsed = _timed(_pbkdf2, b'calibration', os.urandom(16), 32, (sample,))
+    return (max(1000, int(sample * target / elapsed) // 1000 * 1000),)
+
+def _scrypt(password, salt, length, params):
+    log2_n, block_size, parallelism = params
+    return Scrypt(salt=salt, length=length, n=1 << log2_n, r=block_size,
+                  p=parallelism).derive(password)
+
+def _scrypt_work(params):
+    log2_n, block_size, parallelism = params
+    return (1 << log2_n) * block_size * parallelism
+
+def _scrypt_memory(params):
+    # The N-entry V array dominates; the p lanes run one after another
+    log2_n, block_size, _ = params
+    return 128 * block_size * (1 << log2_n)
+
+def _calibrate_scrypt(target, max_memory, default_params):
+    """Double N while a derivation stays within the target and the memory cap"""
+    _, block_size, parallelism = default_params
+    best = (14, block_size, parallelism)
+    for log2_n in range(14, 25):
+        params = (log2_n, block_size, parallelism)
+        if _scrypt_memory(params) > max_memory:
+            break
+        elapsed = _timed(_scrypt, b'calibration', os.urandom(16), 32, params)
+        if elapsed > target and log2_n > 14:
+            break
+        best = params
+        if elapsed * 2 > target:
+            break
+    return best
+
+def _argon2id(password, salt, length, params):
+    iterations, memory_kib, lanes = params
+    return Argon2id(salt=salt, length=length, iterations=iterations, lanes=lanes,
+                    memory_cost=memory_kib).derive(password)
+
+def _argon2id_work(params):
+    return params[0] * params[1]
+
+def _argon2id_memory(params):
+    return params[1] * 1024
+
+def _calibrate_argon2id(target, max_memory, default_params):
+    """Keep the profile's memory (halving it if one pass is too slow) and scale passes"""
+    _, memory_kib, lanes = default_params
+    lanes = min(lanes, os.cpu_count() or 1)
+    memory_kib = max(8 * lanes, min(memory_kib, max_memory // 1024))
+    while True:
+        elapsed = _timed(_argon2id, b'calibration', os.urandom(16), 32, (1, memory_kib, lanes))
+        if elapsed <= target or memory_kib <= 8 * lanes:
+            break
+        memory_kib = max(8 * lanes, memory_kib // 2)
+    return (max(1, int(target / elapsed)), memory_kib, lanes)
+
+register_kdf('pbkdf2-sha256', 1, _pbkdf2, 'PBKDF2-HMAC-SHA256', ('iterations',),
+             (10_000_000,),
+             {'interactive': (100000,), 'bulk': (600000,), 'archival': (2000000,)},
+             work=lambda params: params[0], calibrate=_calibrate_pbkdf2)
+register_kdf('scrypt', 2, _scrypt, 'scrypt', ('log2_n', 'r', 'p'), (24, 32, 16),
+             {'interactive': (15, 8, 1), 'bulk': (17, 8, 1), 'archival': (18, 8, 2)},
+             work=_scrypt_work, memory=_scrypt_memory, calibrate=_calibrate_scrypt)
+if Argon2id is not None:
+    register_kdf('argon2id', 3, _argon2id, 'Argon2id', ('iterations', 'memory_kib', 'lanes'),
+                 (64, 4 * 1024 * 1024, 64),
+                 {'interactive': (2, 19456, 1), 'bulk': (3, 65536, 4), 'archival': (4, 262144, 4)},
+                 work=_argon2id_work, memory=_argon2id_memory, calibrate=_calibrate_argon2id)
+
+# Cost of the headerless base64 text format, which cannot record parameters
+LEGACY_KDF = KdfParams('pbkdf2-sha256', None, (100000,))
+
+def load_calibration(path):
+    """
+    Replace profile defaults with parameters written by the calibrate command
+
+    Args:
+        path (str): JSON file mapping KDF name -> profile -> parameter list
+    """
+    with open(path) as f:
+        calibration = json.load(f)
+    for name, profiles in calibration.items():
+        if name not in KDFS:
+            logging.warning(f"Ignoring calibration for unavailable KDF {name}")
+            continue
+        spec = KDFS[name]
+        updated = dict(spec.profiles)
+        for profile, params in profiles.items():
+            if profile in COST_PROFILES:
+                updated[profile] = _check_params(spec, tuple(params), ceiling=False)
+        KDFS[name] = spec._replace(profiles=updated)
+
+def _check_params(spec, params, ceiling=True):
+    """
+    Validate a parameter tuple against the KDF's limits, the memory cap and,
+    with ceiling set, DECODE_COST_FACTOR times the archival profile's work
+    (the built-in profile's if calibration lowered it)
+    """
+    if len(params) != len(spec.parameters):
+        raise ValueError(f"{spec.label} takes {len(spec.parameters)} cost parameter(s)")
+    for name, value, limit in zip(spec.parameters, params, spec.limits):
+        if not 1 <= value <= limit:
+            raise ValueError(f"{spec.label} {name} must be between 1 and {limit}")
+    if spec.memory is not None and spec.memory(params) > MAX_KDF_MEMORY:
+        raise ValueError(f"{spec.label} parameters exceed the {MAX_KDF_MEMORY} byte memory limit")
+    archival_work = max(spec.reference_work, spec.work(spec.profiles['archival']))
+    if ceiling and spec.work(params) > DECODE_COST_FACTOR * archival_work:
+        raise ValueError(f"{spec.label} parameters exceed {DECODE_COST_FACTOR:g} times "
+                         f"the archival profile's cost")
+    return params
+
+def _clamp_params(spec, params):
+    """Lower calibrated parameters to the KDF's limits, with a warning"""
+    clamped = tuple(min(value, limit) for value, limit in zip(params, spec.limits))
+    if clamped != tuple(params):
+        logging.warning(f"Calibrated {spec.label} parameters {tuple(params)} exceed the "
+                        f"format limits, using {clamped}")
+    return clamped
+
+def available_kdfs():
+    """
+    Returns the names of the registered KDFs
+
+    Returns:
+        list: KDF names
+    """
+    return list(KDFS)
+
+def profile_params(name, profile):
+    """
+    Parameters of a KDF cost profile
+
+    Args:
+        name (str): KDF name
+        profile (str): 'interactive', 'bulk' or 'archival'
+
+    Returns:
+        KdfParams: The profile's cost
+    """
+    if name not in KDFS:
+        raise ValueError(f"Unsupported key derivation function: {name}")
+    if profile not in COST_PROFILES:
+        raise ValueError(f"Unknown KDF cost profile: {profile}")
+    return KdfParams(name, profile, KDFS[name].profiles[profile])
+
+def derive(kdf_params, password, salt, length=32):
+    """
+    Derive a key
+
+    Args:
+        kdf_params (KdfParams): KDF and cost
+        password (bytes): Password
+        salt (bytes): Salt
+        length (int): Key length in bytes
+
+    Returns:
+        bytes: Derived key
+    """
+    spec = KDFS.get(kdf_params.name)
+    if spec is None:
+        raise ValueError(f"Unsupported key derivation function: {kdf_params.name}")
+    return spec.derive(password, salt, length, _check_params(spec, tuple(kdf_params.params)))
+
+def pack_kdf_params(kdf_params):
+    """
+    Encode a KDF and its cost for a ciphertext header
+
+    Returns:
+        bytes: KDF_HEADER_SIZE bytes
+    """
+    spec = KDFS[kdf_params.name]
+    profile_id = COST_PROFILES[kdf_params.profile][0] if kdf_params.profile else CUSTOM_PROFILE_ID
+    params = tuple(kdf_params.params) + (0,) * (3 - len(kdf_params.params))
+    return _KDF_BLOCK.pack(spec.kdf_id, profile_id, *params)
+
+def unpack_kdf_params(buffer, offset=0):
+    """
+    Decode a KDF block written by pack_kdf_params
+
+    Args:
+        buffer (bytes-like): Header bytes
+        offset (int): Position of the block
+
+    Returns:
+        KdfParams: The recorded KDF and cost
+
+    Raises:
+        ValueError: If the KDF is unknown here or the cost is out of bounds
+    """
+    kdf_id, profile_id, *params = _KDF_BLOCK.unpack_from(buffer, offset)
+    spec = next((spec for spec in KDFS.values() if spec.kdf_id == kdf_id), None)
+    if spec is None:
+        raise ValueError(f"Unsupported key derivation function: {kdf_id}")
+    profile = next((name for name, (number, _) in COST_PROFILES.items() if number == profile_id), None)
+    params = _check_params(spec, tuple(params[:len(spec.parameters)]))
+    return KdfParams(spec.name, profile, params)
+
+def kdf_info():
+    """
+    Describe the registered KDFs and their profiles for the API
+
+    Returns:
+        list: One dict per KDF with name, label, parameter names and the
+              parameters of each profile
+    """
+    return [{
+        'name': spec.name,
+        'label': spec.label,
+        'parameters': list(spec.parameters),
+        'profiles': {profile: dict(zip(spec.parameters, params))
+                     for profile, params in spec.profiles.items()}
+    } for spec in KDFS.values()]
+
+def calibrate(name, target_seconds, max_memory=None, profile='interactive'):
+    """
+    Benchmark this host and pick parameters for a target derivation latency
+
+    Args:
+        name (str): KDF name
+        target_seconds (float): Desired time for one derivation
+        max_memory (int, optional): Memory cap in bytes (default: MAX_KDF_MEMORY)
+        profile (str): Profile whose defaults seed the search (e.g. the
+            block size for scrypt, memory and lanes for Argon2id)
+
+    Returns:
+        tuple: (parameter tuple, measured seconds for one derivation)
+    """
+    spec = KDFS.get(name)
+    if spec is None:
+        raise ValueError(f"Unsupported key derivation function: {name}")
+    if spec.calibrate is None:
+        raise ValueError(f"{spec.label} does not support calibration")
+    max_memory = min(max_memory or MAX_KDF_MEMORY, MAX_KDF_MEMORY)
+    params = _clamp_params(spec, spec.calibrate(target_seconds, max_memory, spec.profiles[profile]))
+    params = _check_params(spec, params, ceiling=False)
+    return params, _timed(spec.derive, b'calibration', os.urandom(16), 32, params)
+
+if os.environ.get('ENCRYPTION_KDF_CALIBRATION'):
+    load_calibration(os.environ['ENCRYPTION_KDF_CALIBRATION'])
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Inspect and calibrate key derivation cost profiles')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('list', help='Show registered KDFs and their profile parameters')
+
+    calibrate_parser = subparsers.add_parser('calibrate', help='Pick parameters for target latencies on this host')
+    calibrate_parser.add_argument('--kdf', action='append', choices=available_kdfs(),
+                                  help='KDF to calibrate (repeatable, default: all)')
+    calibrate_parser.add_argument('--target', action='append', default=[], metavar='PROFILE=MS',
+                                  help='Target latency of a profile in milliseconds '
+                                       '(default: interactive=100, bulk=500, archival=2000)')
+    calibrate_parser.add_argument('--max-memory-mb', type=int,
+                                  help=f'Memory cap per derivation (default: {MAX_KDF_MEMORY // 2 ** 20})')
+    calibrate_parser.add_argument('-o', '--output', help='Write the parameters as JSON for ENCRYPTION_KDF_CALIBRATION')
+
+    args = parser.parse_args()
+    if args.command == 'list':
+        for info in kdf_info():
+            print(f"{info['name']} ({info['label']})")
+            for profile, params in info['profiles'].items():
+                print(f"  {profile:12} {', '.join(f'{key}={value}' for key, value in params.items())}")
+    else:
+        targets = {profile: target for profile, (_, target) in COST_PROFILES.items()}
+        for value in args.target:
+            profile, _, milliseconds = value.partition('=')
+            if profile not in COST_PROFILES or not milliseconds:
+                parser.error(f"--target must be PROFILE=MS with PROFILE one of {', '.join(COST_PROFILES)}")
+            targets[profile] = float(milliseconds) / 1000
+        max_memory = args.max_memory_mb * 2 ** 20 if args.max_memory_mb else None
+
+        calibration = {}
+        for name in args.kdf or available_kdfs():
+            calibration[name] = {}
+            for profile, target in targets.items():
+                params, elapsed = calibrate(name, target, max_memory, profile)
+                calibration[name][profile] = list(params)
+                described = ', '.join(f'{key}={value}' for key, value in zip(KDFS[name].parameters, params))
+                print(f"{name:14} {profile:12} {described:40} {elapsed * 1000:8.1f} ms "
+                      f"(target {target * 1000:.0f} ms)")
+
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(calibration, f, indent=2)
+            print(f"Wrote {args.output}; set ENCRYPTION_KDF_CALIBRATION={args.output} to use it")
@@ -0,0 +1,194 @@
+"""
+Derived Key Cache
+Bounded, expiring cache of password-derived keys held in one locked,
+zeroed-on-eviction memory slab
+"""
+
+import os
+import hmac
+import ctypes
+import struct
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+
+def _lock_memory(buffer):
+    """
+    Ask the OS to keep a buffer out of swap (mlock), best effort
+
+    Returns:
+        bool: True if the pages were locked
+    """
+    if not buffer:
+        return False
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+        address = ctypes.addressof((ctypes.c_char * len(buffer)).from_buffer(buffer))
+        if libc.mlock(ctypes.c_void_p(address), ctypes.c_size_t(len(buffer))) == 0:
+            return True
+        logging.warning(f"Could not lock derived key cache memory: "
+                        f"{os.strerror(ctypes.get_errno())}")
+    except (OSError, AttributeError) as e:
+        logging.warning(f"Could not lock derived key cache memory: {str(e)}")
+    return False
+
+
+class DerivedKeyCache:
+    """
+    A bounded least-recently-used cache of derived keys with expiry.
+
+    Keys are stored in fixed-size slots of a single preallocated bytearray
+    that is mlock'ed where the OS allows it, and a slot is overwritten with
+    zeros as soon as its entry is evicted, expires or is cleared: expired
+    entries are purged at the start of every get and set, and by a timer
+    armed for the oldest entry's expiry while the cache is idle. Entries are
+    looked up by an HMAC tag of the derivation inputs under a per-process
+    secret, so neither passwords nor salts are kept in the cache.
+    """
+
+    def __init__(self, maxsize=128, ttl=300, key_size=32, clock=time.monotonic):
+        """
+        Args:
+            maxsize (int): Maximum number of keys kept
+            ttl (float): Lifetime of an entry in seconds
+            key_size (int): Slot size; longer keys are not cached
+            clock (callable): Monotonic time source, replaceable for testing
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.key_size = key_size
+        self._clock = clock
+        self._secret = os.urandom(32)
+        self._slab = bytearray(maxsize * key_size)
+        self.locked = _lock_memory(self._slab)
+        self._free_slots = list(range(maxsize))
+        self._entries = OrderedDict()  # tag -> (slot, key length, expires_at), LRU order
+        self._expiry = OrderedDict()  # tag -> expires_at, oldest first (the TTL is fixed)
+        self._timer = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def tag(self, *parts):
+        """
+        Keyed hash identifying one derivation
+
+        Args:
+            *parts (bytes): Derivation inputs, e.g. password, salt, algorithm
+                and cost parameters; each is length-prefixed so different
+                splits of the same bytes give different tags
+
+        Returns:
+            bytes: HMAC-SHA256 tag
+        """
+        mac = hmac.new(self._secret, digestmod=hashlib.sha256)
+        for part in parts:
+            mac.update(struct.pack('>I', len(part)))
+            mac.update(part)
+        return mac.digest()
+
+    def get(self, tag):
+        """Return a copy of the cached key for tag, or None on a miss or expiry"""
+        with self._lock:
+            self._purge_expired()
+            entry = self._entries.get(tag)
+            if entry is not None:
+                slot, length, _ = entry
+                self._entries.move_to_end(tag)
+                self.hits += 1
+                start = slot * self.key_size
+                return bytes(self._slab[start:start + length])
+            self.misses += 1
+            return None
+
+    def set(self, tag, key):
+        """
+        Store a derived key, evicting the least recently used entry when full.
+
+        Args:
+            tag (bytes): Tag from tag()
+            key (bytes): Derived key
+        """
+        if self.maxsize <= 0 or len(key) > self.key_size:
+            return
+        with self._lock:
+            self._purge_expired()
+            if tag in self._entries:
+                self._discard(tag)
+            elif not self._free_slots:
+                self._discard(next(iter(self._entries)))
+                self.evictions += 1
+            slot = self._free_slots.pop()
+            start = slot * self.key_size
+            self._slab[start:start + len(key)] = key
+            expires_at = self._clock() + self.ttl
+            self._entries[tag] = (slot, len(key), expires_at)
+            self._expiry[tag] = expires_at
+            self._schedule_purge()
+
+    def _purge_expired(self):
+        """Zero and drop every expired entry, oldest first; the caller holds the lock"""
+        now = self._clock()
+        while self._expiry:
+            tag, expires_at = next(iter(self._expiry.items()))
+            if expires_at > now:
+                break
+            self._discard(tag)
+
+    def _schedule_purge(self):
+        """Arm a timer for the oldest entry's expiry; the caller holds the lock"""
+        if self._timer is not None or not self._expiry:
+            return
+        delay = max(0.0, next(iter(self._expiry.values())) - self._clock())
+        self._timer = threading.Timer(delay, self._purge_on_timer)
+        self._timer.daemon = True
+        self._timer.start()
+
+    def _purge_on_timer(self):
+        """Timer callback: purge, then re-arm for the next expiry"""
+        with self._lock:
+            self._timer = None
+            self._purge_expired()
+            self._schedule_purge()
+
+    def _discard(self, tag):
+        """Drop an entry and zero its slot; the caller holds the lock"""
+        slot, _, _ = self._entries.pop(tag)
+        del self._expiry[tag]
+        start = slot * self.key_size
+        self._slab[start:start + self.key_size] = bytes(self.key_size)
+        self._free_slots.append(slot)
+
+    def clear(self):
+        """Zero and drop every entry; hit and miss counters are kept"""
+        with self._lock:
+            for tag in list(self._entries):
+                self._discard(tag)
+
+    def stats(self):
+        """
+        Report cache effectiveness.
+
+        Returns:
+            dict: Hits, misses, hit rate, evictions, current size, limits and
+                  whether the memory is locked
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'locked': self.locked
+            }
+
+    def __len__(self):
+        return len(self._entries)
@@ -1,62 +1,276 @@
-import re
 import os
+import re
+import hmac
+import json
 import pickle
+import hashlib
+import tempfile
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
 import numpy as np
-from sklearn.feature_extraction.text import CountVectorizer
-from sklearn.linear_model import LogisticRegression
 import logging
+from tools.result_cache import LRUCache
+from tools.breach_index import is_password_breached
+from tools.pattern_entropy import estimate_guesses
 
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process artifact lock
+    fcntl = None
 
-# Password strength model class
-class PasswordStrengthModel:
+
+# Version of the saved model artifact layout; bump when it changes
+MODEL_ARTIFACT_VERSION = 1
+
+# Version of the pickle-free compact artifact layout (see export_compact)
+COMPACT_ARTIFACT_VERSION = 1
+
+# How the model is brought up when the app starts (see init_password_model)
+MODEL_STARTUP_MODES = ('lazy', 'eager', 'prebuilt')
+
+
+# Characters counted as "special" by every composition check
+SPECIAL_CHARACTERS = '!@#$%^&*(),.?":{}|<>'
+
+# Descriptive labels for strength scores 0-4
+STRENGTH_RATINGS = ["Very Weak", "Weak", "Moderate", "Strong", "Very Strong"]
+
+# Charset size contributed by each character class to the entropy estimate
+LOWERCASE_CHARSET_SIZE = 26
+UPPERCASE_CHARSET_SIZE = 26
+DIGIT_CHARSET_SIZE = 10
+SPECIAL_CHARSET_SIZE = 30  # Approximate special character count
+
+# Translation table collapsing every classified character to one symbol per
+# class. The symbols are members of their own class, so characters left
+# untouched by the table can never be mistaken for a classified one.
+_CLASS_SYMBOLS = str.maketrans({
+    **{c: 'a' for c in 'abcdefghijklmnopqrstuvwxyz'},
+    **{c: 'A' for c in 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'},
+    **{c: '0' for c in '0123456789'},
+    **{c: '!' for c in SPECIAL_CHARACTERS},
+})
+
+
+class PasswordComposition(namedtuple('PasswordComposition',
+                                     'length lowercase uppercase digit special')):
+    """Character class counts for a password, as returned by scan_composition"""
+    __slots__ = ()
+
+    @property
+    def has_lowercase(self):
+        return self.lowercase > 0
+
+    @property
+    def has_uppercase(self):
+        return self.uppercase > 0
+
+    @property
+    def has_digit(self):
+        return self.digit > 0
+
+    @property
+    def has_special(self):
+        return self.special > 0
+
+    @property
+    def all_char_types(self):
+        return bool(self.lowercase and self.uppercase and self.digit and self.special)
+
+    @property
+    def criteria_count(self):
+        return (self.has_lowercase + self.has_uppercase
+                + self.has_digit + self.has_special)
+
+    @property
+    def charset_size(self):
+        return ((LOWERCASE_CHARSET_SIZE if self.lowercase else 0)
+                + (UPPERCASE_CHARSET_SIZE if self.uppercase else 0)
+                + (DIGIT_CHARSET_SIZE if self.digit else 0)
+                + (SPECIAL_CHARSET_SIZE if self.special else 0))
+
+
+def scan_composition(password):
     """
-    A model for predicting password strength using scikit-learn.
-    This model uses character n-grams and length features to predict password strength.
+    Scan a password's character composition once.
+    
+    A single str.translate pass collapses the password to one symbol per
+    character class; the class counts are read off that short string. This
+    replaces separate regex searches for each class and is shared by the
+    model, the heuristic and the feedback/entropy code.
+    
+    Args:
+        password (str): The password to scan
+        
+    Returns:
+        PasswordComposition: Length and per-class character counts
+    """
+    symbols = password.translate(_CLASS_SYMBOLS)
+    digit = symbols.count('0')
+    if not password.isascii():
+        # \d semantics: non-ASCII decimal digits count as digits too
+        digit += sum(1 for c in password if c > '\x7f' and c.isdecimal())
+    return PasswordComposition(len(password), symbols.count('a'), symbols.count('A'),
+                               digit, symbols.count('!'))
+
+
+# Bit flags for the character classes used in composition checks
+_LOWER, _UPPER, _DIGIT, _SPECIAL = 1, 2, 4, 8
+
+# ASCII code point -> character class flags. DEL (127) has no class, so
+# clipping non-ASCII code points to 127 maps them to "no class".
+_ASCII_CLASS_FLAGS = np.zeros(128, dtype=np.uint8)
+_ASCII_CLASS_FLAGS[ord('a'):ord('z') + 1] = _LOWER
+_ASCII_CLASS_FLAGS[ord('A'):ord('Z') + 1] = _UPPER
+_ASCII_CLASS_FLAGS[ord('0'):ord('9') + 1] = _DIGIT
+_ASCII_CLASS_FLAGS[[ord(c) for c in SPECIAL_CHARACTERS]] = _SPECIAL
+
+
+def _composition_arrays(passwords):
+    """
+    Compute character composition for many passwords at once.
+    
+    All passwords are concatenated into one code point array and classified
+    with a lookup table; per-password counts come from cumulative sums over
+    the password boundaries, so there is no per-password regex work.
+    
+    Args:
+        passwords (list): List of password strings
+        
+    Returns:
+        dict: Arrays of lengths and lowercase/uppercase/digit/special counts
+    """
+    lengths = np.fromiter(map(len, passwords), dtype=np.int64, count=len(passwords))
+    codes = np.frombuffer(
+        ''.join(passwords).encode('utf-32-le', 'surrogatepass'), dtype=np.uint32)
+    flags = _ASCII_CLASS_FLAGS[np.minimum(codes, 127)]
+
+    # \d also matches non-ASCII decimal digits, which the table cannot see
+    non_ascii = np.flatnonzero(codes > 127)
+    if non_ascii.size:
+        is_decimal = np.fromiter((chr(c).isdecimal() for c in codes[non_ascii].tolist()),
+                                 dtype=bool, count=non_ascii.size)
+        flags[non_ascii[is_decimal]] = _DIGIT
+
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    counts = {}
+    for name, flag in (('lowercase', _LOWER), ('uppercase', _UPPER),
+                       ('digit', _DIGIT), ('special', _SPECIAL)):
+        cumulative = np.zeros(codes.size + 1, dtype=np.int64)
+        np.cumsum((flags & flag) != 0, out=cumulative[1:])
+        counts[name] = cumulative[ends] - cumulative[starts]
+    counts['length'] = lengths
+    return counts
+
+
+def _atomic_write(filepath, write):
+    """
+    Write a model artifact via a temporary file in the same directory.
+    
+    The file is renamed into place once complete, so readers never see a
+    partially written artifact.
+    
+    Args:
+        filepath (str): Destination path
+        write (callable): Called with the open binary file object
+    """
+    directory = os.path.dirname(os.path.abspath(filepath))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.password_model-',
+                                    suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        # mkstemp creates the file owner-only; artifacts are meant to be shared
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, filepath)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class _StrengthScorer:
+    """
+    Strength rules and linear scoring shared by the scikit-learn model and
+    the NumPy-only CompactPasswordScorer.
+    
+    Subclasses provide the n-gram part of the decision values through
+    _ngram_scores/_ngram_scores_batch and fill in the cached weights.
     """
 
     def __init__(self):
-        # Initialize the model components
-        self.vectorizer = CountVectorizer(analyzer='char', ngram_range=(1, 3))
-        self.classifier = LogisticRegression(solver='liblinear', max_iter=200)
         self.is_trained = False
 
-    def train(self, passwords, strengths):
+        # Classifier weights split into n-gram and length parts for sparse scoring
+        self._ngram_weights = None
+        self._length_weights = None
+        self._intercept = None
+        self._classes = None
+
+    def _ngram_scores(self, password):
+        """Decision value contribution of a single password's n-grams"""
+        raise NotImplementedError
+
+    def _ngram_scores_batch(self, passwords):
+        """Decision value contributions of many passwords' n-grams, one row each"""
+        raise NotImplementedError
+
+    def _decision_scores(self, password, length):
         """
-        Train the model with example passwords and their strength ratings.
+        Score a single password against the classifier weights.
+        
+        Only the n-grams present in the password are touched, so no dense
+        feature vector the size of the vocabulary is ever built.
         
         Args:
-            passwords (list): List of password strings
-            strengths (list): List of strength ratings (0-4, where 0 is very weak, 4 is very strong)
+            password (str): The password to score
+            length (int): Password length feature
+            
+        Returns:
+            numpy.ndarray: Decision value per classifier row
         """
-        # Extract character n-gram features
-        X_chars = self.vectorizer.fit_transform(passwords)
+        return self._intercept + length * self._length_weights + self._ngram_scores(password)
 
-        # Add password length as a feature
-        length_feature = np.array([len(p) for p in passwords]).reshape(-1, 1)
+    def _scores_to_class(self, scores):
+        """Map decision values to a class label the same way LogisticRegression.predict does"""
+        if scores.shape[-1] == 1:
+            # Binary problem: a single decision value, positive means classes[1]
+            return self._classes[int(scores[0] > 0)]
+        return self._classes[int(np.argmax(scores))]
 
-        # Combine features
-        X = np.hstack((X_chars.toarray(), length_feature))
+    def _decision_scores_batch(self, passwords, lengths):
+        """Score many passwords against the classifier weights in one pass"""
+        scores = self._ngram_scores_batch(passwords)
+        scores += np.outer(lengths, self._length_weights)
+        scores += self._intercept
+        return scores
 
-        # Train the classifier
-        self.classifier.fit(X, strengths)
-        self.is_trained = True
+    def _scores_to_classes(self, scores):
+        """Vectorized version of _scores_to_class for a matrix of decision values"""
+        if scores.shape[1] == 1:
+            return self._classes[(scores[:, 0] > 0).astype(np.intp)]
+        return self._classes[np.argmax(scores, axis=1)]
 
-    def predict(self, password):
+    def predict(self, password, composition=None):
         """
         Predict the strength of a password.
         
         Args:
             password (str): The password to evaluate
+            composition (PasswordComposition, optional): Precomputed scan_composition result
             
         Returns:
             int: Predicted strength (0-4)
         """
         # Check character composition requirements
-        length = len(password)
-        has_lowercase = bool(re.search(r'[a-z]', password))
-        has_uppercase = bool(re.search(r'[A-Z]', password))
-        has_digit = bool(re.search(r'\d', password))
-        has_special = bool(re.search(r'[!@#$%^&*(),.?":{}|<>]', password))
+        if composition is None:
+            composition = scan_composition(password)
+        length = composition.length
         
         # STRICT RULE: Passwords under 8 characters can never be strong
         if length < 8:
@@ -66,23 +280,14 @@ class PasswordStrengthModel:
                 return 1  # Weak maximum for short passwords
         
         # STRICT RULE: For Strong (3) or Very Strong (4), must have ALL character types
-        all_char_types = has_lowercase and has_uppercase and has_digit and has_special
+        all_char_types = composition.all_char_types
         
         if not self.is_trained:
             # If model is not trained, use a simple heuristic
-            return self._simple_strength_check(password)
-
-        # Extract character n-gram features
-        X_chars = self.vectorizer.transform([password])
-
-        # Add password length as a feature
-        length_feature = np.array([length]).reshape(-1, 1)
+            return self._simple_strength_check(password, composition)
 
-        # Combine features
-        X = np.hstack((X_chars.toarray(), length_feature))
-
-        # Predict strength
-        prediction = self.classifier.predict(X)[0]
+        # Predict strength from the n-grams plus the length feature
+        prediction = self._scores_to_class(self._decision_scores(password, length))
         
         # Apply strict character type requirements
         if prediction >= 3 and not all_char_types:
@@ -91,13 +296,51 @@ class PasswordStrengthModel:
         
         return prediction
 
-    def _simple_strength_check(self, password):
+    def predict_batch(self, passwords, composition=None):
+        """
+        Predict the strength of many passwords in one vectorized pass.
+        
+        Applies the same strict length and character type rules as predict().
+        
+        Args:
+            passwords (list): List of password strings
+            composition (dict, optional): Precomputed result of _composition_arrays
+            
+        Returns:
+            numpy.ndarray: Predicted strength (0-4) per password
+        """
+        if composition is None:
+            composition = _composition_arrays(passwords)
+        lengths = composition['length']
+        has_lowercase = composition['lowercase'] > 0
+        has_uppercase = composition['uppercase'] > 0
+        has_digit = composition['digit'] > 0
+        has_special = composition['special'] > 0
+        all_char_types = has_lowercase & has_uppercase & has_digit & has_special
+
+        if not self.is_trained:
+            # Vectorized form of _simple_strength_check
+            criteria_count = (has_lowercase.astype(np.int64) + has_uppercase
+                              + has_digit + has_special)
+            predictions = np.where(criteria_count <= 1, 1,
+                          np.where(~all_char_types, 2,
+                          np.where(lengths >= 12, 4, 3)))
+        else:
+            scores = self._decision_scores_batch(passwords, lengths)
+            predictions = self._scores_to_classes(scores).astype(np.int64)
+
+            # Downgrade to Moderate (2) if missing any character type
+            predictions[(predictions >= 3) & ~all_char_types] = 2
+
+        # STRICT RULE: Passwords under 8 characters can never be strong
+        predictions = np.where(lengths < 4, 0, np.where(lengths < 8, 1, predictions))
+        return predictions
+
+    def _simple_strength_check(self, password, composition=None):
         """Simple heuristic for password strength if model isn't trained"""
-        length = len(password)
-        has_lowercase = bool(re.search(r'[a-z]', password))
-        has_uppercase = bool(re.search(r'[A-Z]', password))
-        has_digit = bool(re.search(r'\d', password))
-        has_special = bool(re.search(r'[!@#$%^&*(),.?":{}|<>]', password))
+        if composition is None:
+            composition = scan_composition(password)
+        length = composition.length
 
         # STRICT RULE: Passwords under 8 characters can never be strong
         if length < 8:
@@ -107,12 +350,10 @@ class PasswordStrengthModel:
                 return 1  # Weak maximum for short passwords
 
         # STRICT RULE: For Strong (3) or Very Strong (4), must have ALL character types
-        all_char_types = has_lowercase and has_uppercase and has_digit and has_special
+        all_char_types = composition.all_char_types
         
         # Count criteria met (only for passwords 8+ characters)
-        criteria_count = sum([
-            has_lowercase, has_uppercase, has_digit, has_special
-        ])
+        criteria_count = composition.criteria_count
 
         # Map to strength score (0-4) for passwords 8+ characters
         if criteria_count <= 1:
@@ -128,30 +369,215 @@ class PasswordStrengthModel:
         else:
             return 2  # Moderate (should not reach here, but safety)
 
+
+# Password strength model class
+class PasswordStrengthModel(_StrengthScorer):
+    """
+    A model for predicting password strength using scikit-learn.
+    This model uses character n-grams and length features to predict password strength.
+    """
+
+    def __init__(self):
+        super().__init__()
+
+        # scikit-learn is imported here rather than at module import so the
+        # app can start without paying for it until a model is needed
+        from sklearn.feature_extraction.text import CountVectorizer
+        from sklearn.linear_model import LogisticRegression
+
+        # Initialize the model components
+        self.vectorizer = CountVectorizer(analyzer='char', ngram_range=(1, 3))
+        self.classifier = LogisticRegression(solver='liblinear', max_iter=200)
+
+    def train(self, passwords, strengths):
+        """
+        Train the model with example passwords and their strength ratings.
+        
+        Args:
+            passwords (list): List of password strings
+            strengths (list): List of strength ratings (0-4, where 0 is very weak, 4 is very strong)
+        """
+        from scipy import sparse
+
+        # Extract character n-gram features
+        X_chars = self.vectorizer.fit_transform(passwords)
+
+        # Add password length as a feature
+        length_feature = sparse.csr_matrix(
+            np.array([len(p) for p in passwords], dtype=np.float64).reshape(-1, 1))
+
+        # Combine features without densifying the n-gram matrix
+        X = sparse.hstack((X_chars, length_feature), format='csr')
+
+        # Train the classifier
+        self.classifier.fit(X, strengths)
+        self._prepare_scorer()
+        self.is_trained = True
+
+    def _prepare_scorer(self):
+        """Cache the classifier weights in the layout used by _decision_scores"""
+        coef = self.classifier.coef_
+        self._ngram_weights = np.ascontiguousarray(coef[:, :-1].T)
+        self._length_weights = coef[:, -1].copy()
+        self._intercept = np.asarray(self.classifier.intercept_, dtype=np.float64).copy()
+        self._classes = self.classifier.classes_
+
+    def _ngram_scores(self, password):
+        X_chars = self.vectorizer.transform([password])
+        if not X_chars.nnz:
+            return 0.0
+        return X_chars.data @ self._ngram_weights[X_chars.indices]
+
+    def _ngram_scores_batch(self, passwords):
+        # Sparse (n x vocabulary) @ dense (vocabulary x classes) -> dense (n x classes)
+        return self.vectorizer.transform(passwords) @ self._ngram_weights
+
     def save_model(self, filepath):
         """Save the trained model to a file"""
-        with open(filepath, 'wb') as f:
-            pickle.dump(
-                {
-                    'vectorizer': self.vectorizer,
-                    'classifier': self.classifier,
-                    'is_trained': self.is_trained
-                }, f)
+        _atomic_write(filepath, lambda f: pickle.dump(
+            {
+                'version': MODEL_ARTIFACT_VERSION,
+                'vectorizer': self.vectorizer,
+                'classifier': self.classifier,
+                'is_trained': self.is_trained
+            }, f))
         return True
 
     def load_model(self, filepath):
         """Load a trained model from a file"""
+        if not os.path.exists(filepath):
+            return False
         try:
             with open(filepath, 'rb') as f:
                 model_data = pickle.load(f)
-                self.vectorizer = model_data['vectorizer']
-                self.classifier = model_data['classifier']
-                self.is_trained = model_data['is_trained']
+            # Artifacts written before versioning share the version 1 layout
+            version = model_data.get('version', 1)
+            if version != MODEL_ARTIFACT_VERSION:
+                logging.warning(f"Ignoring password model artifact version {version} "
+                                f"(expected {MODEL_ARTIFACT_VERSION})")
+                return False
+            self.vectorizer = model_data['vectorizer']
+            self.classifier = model_data['classifier']
+            self.is_trained = model_data['is_trained']
+            if self.is_trained:
+                self._prepare_scorer()
             return True
         except Exception as e:
             logging.error(f"Error loading model: {str(e)}")
             return False
 
+    def export_compact(self, filepath):
+        """
+        Export the trained model as a pickle-free .npz artifact.
+        
+        The artifact holds the n-gram vocabulary and the classifier weights as
+        plain arrays and is loaded by CompactPasswordScorer with NumPy alone.
+        
+        Args:
+            filepath (str): Destination path of the .npz file
+        """
+        if not self.is_trained:
+            raise ValueError("Cannot export an untrained password model")
+        vectorizer = self.vectorizer
+        if vectorizer.analyzer != 'char' or vectorizer.strip_accents or vectorizer.preprocessor:
+            raise ValueError("Compact export only supports a plain 'char' analyzer")
+
+        terms = [None] * len(vectorizer.vocabulary_)
+        for term, index in vectorizer.vocabulary_.items():
+            terms[index] = term
+
+        _atomic_write(filepath, lambda f: np.savez(
+            f,
+            version=np.array(COMPACT_ARTIFACT_VERSION),
+            ngram_range=np.array(vectorizer.ngram_range),
+            lowercase=np.array(bool(vectorizer.lowercase)),
+            # JSON bytes rather than a unicode array: NumPy strips trailing NULs
+            terms=np.frombuffer(json.dumps(terms).encode('utf-8'), dtype=np.uint8),
+            ngram_weights=self._ngram_weights,
+            length_weights=self._length_weights,
+            intercept=self._intercept,
+            classes=np.asarray(self._classes)))
+        return True
+
+
+class CompactPasswordScorer(_StrengthScorer):
+    """
+    NumPy-only password strength scorer loaded from an export_compact artifact.
+    
+    Reproduces the CountVectorizer 'char' analyzer and the LogisticRegression
+    decision function, so predictions match PasswordStrengthModel without
+    importing scikit-learn.
+    """
+
+    # Runs of whitespace are collapsed to one space, as in CountVectorizer
+    _white_spaces = re.compile(r"\s\s+")
+
+    def __init__(self):
+        super().__init__()
+        self._vocabulary = {}
+        self._ngram_range = (1, 1)
+        self._lowercase = True
+
+    def load_model(self, filepath):
+        """Load a compact model artifact from a file"""
+        if not os.path.exists(filepath):
+            return False
+        try:
+            with np.load(filepath, allow_pickle=False) as data:
+                version = int(data['version'])
+                if version != COMPACT_ARTIFACT_VERSION:
+                    logging.warning(f"Ignoring compact password model version {version} "
+                                    f"(expected {COMPACT_ARTIFACT_VERSION})")
+                    return False
+                terms = json.loads(data['terms'].tobytes().decode('utf-8'))
+                self._vocabulary = {term: index for index, term in enumerate(terms)}
+                self._ngram_range = tuple(int(n) for n in data['ngram_range'])
+                self._lowercase = bool(data['lowercase'])
+                self._ngram_weights = data['ngram_weights']
+                self._length_weights = data['length_weights']
+                self._intercept = data['intercept']
+                self._classes = data['classes']
+            self.is_trained = True
+            return True
+        except Exception as e:
+            logging.error(f"Error loading compact model: {str(e)}")
+            return False
+
+    def _ngram_indices(self, password):
+        """Vocabulary indices of the password's character n-grams, with repeats"""
+        text = password.lower() if self._lowercase else password
+        text = self._white_spaces.sub(" ", text)
+        get = self._vocabulary.get
+        min_n, max_n = self._ngram_range
+        indices = []
+        for n in range(min_n, min(max_n, len(text)) + 1):
+            for i in range(len(text) - n + 1):
+                index = get(text[i:i + n])
+                if index is not None:
+                    indices.append(index)
+        return indices
+
+    def _ngram_scores(self, password):
+        # Each repeated n-gram adds its weights once more, like a count would
+        return self._ngram_weights[self._ngram_indices(password)].sum(axis=0)
+
+    def _ngram_scores_batch(self, passwords):
+        rows = []
+        indices = []
+        for row, password in enumerate(passwords):
+            password_indices = self._ngram_indices(password)
+            rows.extend([row] * len(password_indices))
+            indices.extend(password_indices)
+
+        # Sum the weight rows per password one class column at a time
+        weights = self._ngram_weights[indices]
+        scores = np.empty((len(passwords), weights.shape[1]))
+        for column in range(weights.shape[1]):
+            scores[:, column] = np.bincount(np.asarray(rows, dtype=np.intp),
+                                            weights=weights[:, column],
+                                            minlength=len(passwords))
+        return scores
+
 
 def initialize_default_model():
     """Initialize and train a default password strength model"""
@@ -273,67 +699,186 @@ def initialize_default_model():
 # Store the model globally
 password_model = None
 
+# Timing and source of the last model load, for startup reporting
+model_load_info = None
 
-def load_password_model():
-    """Load or initialize the password strength prediction model"""
-    global password_model
+# Serializes model loading between threads of one process
+_model_lock = threading.Lock()
 
-    model_path = os.path.join(os.path.dirname(__file__),
-                              '../password_model.pkl')
+# Recent analysis results, keyed by an HMAC of the password under a
+# per-process secret so the plaintext is never kept as a cache key
+_analysis_cache_secret = os.urandom(32)
+analysis_cache = LRUCache(
+    maxsize=int(os.environ.get('PASSWORD_CACHE_SIZE', 4096)),
+    ttl=float(os.environ.get('PASSWORD_CACHE_TTL', 0)) or None)
 
-    password_model = PasswordStrengthModel()
 
-    # Try to load an existing model
-    if os.path.exists(model_path):
-        try:
-            success = password_model.load_model(model_path)
-            if success:
-                logging.info("Loaded existing password strength model")
-                return
-        except Exception as e:
-            logging.error(f"Error loading password model: {str(e)}")
+def get_model_path():
+    """Path of the saved model artifact, overridable with PASSWORD_MODEL_PATH"""
+    return os.environ.get('PASSWORD_MODEL_PATH') or os.path.join(
+        os.path.dirname(__file__), '../password_model.pkl')
+
 
-    # If no model exists or loading failed, initialize a default model
-    logging.info("Initializing default password strength model")
-    password_model = initialize_default_model()
+def get_compact_model_path():
+    """Path of the compact model artifact, overridable with PASSWORD_MODEL_COMPACT_PATH"""
+    return os.environ.get('PASSWORD_MODEL_COMPACT_PATH') or os.path.join(
+        os.path.dirname(__file__), '../password_model.npz')
 
-    # Save the model for future use
+
+@contextmanager
+def _artifact_lock(model_path):
+    """
+    Hold an exclusive cross-process lock for building the model artifact.
+    
+    Only one worker trains and writes the artifact; the others block here
+    and then load what it wrote.
+    """
+    if fcntl is None:
+        yield
+        return
     try:
-        password_model.save_model(model_path)
-    except Exception as e:
-        logging.error(f"Error saving password model: {str(e)}")
+        lock_file = open(model_path + '.lock', 'a')
+    except OSError as e:
+        logging.warning(f"Could not open password model lock file: {str(e)}")
+        yield
+        return
+    with lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        yield
 
 
-def analyze_password(password):
+def load_password_model(model_path=None, allow_train=True, compact_path=None):
     """
-    Analyze password strength and provide feedback
+    Load or initialize the password strength prediction model
+    
+    The compact artifact is preferred because it is served without importing
+    scikit-learn. Otherwise the pickled model is loaded, or a default model is
+    trained, and the compact artifact is exported for the next start.
     
     Args:
-        password (str): The password to analyze
+        model_path (str, optional): Artifact path, defaults to get_model_path()
+        allow_train (bool): Train and save a default model if no usable
+                            artifact exists; otherwise raise RuntimeError
+        compact_path (str, optional): Compact artifact path, defaults to
+                                      get_compact_model_path()
         
     Returns:
-        dict: Analysis results including strength score, rating, and feedback
+        dict: Where the model came from and how long loading took
     """
-    global password_model
+    global password_model, model_load_info
 
-    if not password_model:
-        load_password_model()
+    model_path = model_path or get_model_path()
+    compact_path = compact_path or get_compact_model_path()
+    start = time.perf_counter()
 
-    # Use ML model to predict strength category (0-4)
-    strength_score = password_model.predict(password)
+    model = CompactPasswordScorer()
+    source = 'compact'
+    loaded_path = compact_path
 
-    # Convert NumPy types to Python native types for JSON serialization
-    strength_score = int(strength_score)
+    if not model.load_model(compact_path):
+        if not allow_train and not os.path.exists(model_path):
+            raise RuntimeError(f"No usable password model artifact at {compact_path} "
+                               f"or {model_path}")
 
-    # Calculate common password metrics
-    length = len(password)
-    has_lowercase = bool(re.search(r'[a-z]', password))
-    has_uppercase = bool(re.search(r'[A-Z]', password))
-    has_digit = bool(re.search(r'\d', password))
-    has_special = bool(re.search(r'[!@#$%^&*(),.?":{}|<>]', password))
+        with _artifact_lock(model_path):
+            # Another worker may have built the artifacts while we waited
+            if not model.load_model(compact_path):
+                model = PasswordStrengthModel()
+                source = 'artifact'
+                loaded_path = model_path
 
-    # Generate feedback
+                # Try to load an existing model
+                if not model.load_model(model_path):
+                    if not allow_train:
+                        raise RuntimeError(f"No usable password model artifact at {model_path}")
+
+                    # If no model exists or loading failed, initialize a default model
+                    logging.info("Initializing default password strength model")
+                    model = initialize_default_model()
+                    source = 'trained'
+
+                    # Save the model for future use
+                    try:
+                        model.save_model(model_path)
+                    except Exception as e:
+                        logging.error(f"Error saving password model: {str(e)}")
+
+                # Export the scikit-learn-free artifact for later starts
+                try:
+                    model.export_compact(compact_path)
+                except Exception as e:
+                    logging.error(f"Error exporting compact password model: {str(e)}")
+
+    password_model = model
+    # Cached results came from the previous model
+    analysis_cache.clear()
+    model_load_info = {
+        'source': source,
+        'path': os.path.abspath(loaded_path),
+        'seconds': round(time.perf_counter() - start, 3)
+    }
+    logging.info(f"Password strength model ready from {source} "
+                 f"in {model_load_info['seconds']:.3f}s")
+    return model_load_info
+
+
+def get_password_model():
+    """Return the password model, loading it on first use"""
+    if password_model is None:
+        with _model_lock:
+            if password_model is None:
+                load_password_model()
+    return password_model
+
+
+def init_password_model(mode='lazy'):
+    """
+    Bring up the password model according to the configured startup mode
+    
+    Args:
+        mode (str): 'lazy' defers loading to the first request, 'eager' loads
+                    (or trains) now, 'prebuilt' loads an existing artifact now
+                    and fails instead of training
+        
+    Returns:
+        dict: Load timing info, or None when loading is deferred
+    """
+    if mode not in MODEL_STARTUP_MODES:
+        raise ValueError(f"Unknown password model startup mode: {mode}")
+    if mode == 'lazy':
+        logging.info("Password strength model will load on first use")
+        return None
+    with _model_lock:
+        return load_password_model(allow_train=(mode == 'eager'))
+
+
+def build_model_artifact(model_path=None, compact_path=None):
+    """
+    Train the default model and write it as prebuilt artifacts
+    
+    Args:
+        model_path (str, optional): Pickle output path, defaults to get_model_path()
+        compact_path (str, optional): Compact output path, defaults to
+                                      get_compact_model_path()
+        
+    Returns:
+        tuple: (model_path, compact_path) of the written artifacts
+    """
+    model_path = model_path or get_model_path()
+    compact_path = compact_path or get_compact_model_path()
+    model = initialize_default_model()
+    model.save_model(model_path)
+    model.export_compact(compact_path)
+    return model_path, compact_path
+
+
+def _generate_feedback(length, has_lowercase, has_uppercase, has_digit, has_special,
+                       strength_score, is_breached=False):
+    """Build the list of improvement suggestions for a single password"""
     feedback = []
+    if is_breached:
+        feedback.append(
+            "This password appears in a known data breach - do not use it")
     if length < 8:
         feedback.append(
             "Password is too short (minimum 8 characters recommended)")
@@ -354,31 +899,178 @@ def analyze_password(password):
     if length >= 12 and has_lowercase and has_uppercase and has_digit and has_special:
         feedback.append("Good password complexity")
 
+    return feedback
+
+
+def _analysis_cache_key(password):
+    """Keyed hash identifying a password in the analysis cache"""
+    return hmac.new(_analysis_cache_secret,
+                    password.encode('utf-8', 'surrogatepass'),
+                    hashlib.sha256).digest()
+
+
+def analyze_password(password):
+    """
+    Analyze password strength and provide feedback
+    
+    Results are served from analysis_cache when the same password was
+    analyzed recently, skipping model scoring and feedback generation.
+    
+    Args:
+        password (str): The password to analyze
+        
+    Returns:
+        dict: Analysis results including strength score, rating, and feedback
+    """
+    cache_key = _analysis_cache_key(password)
+    result = analysis_cache.get(cache_key)
+    if result is None:
+        result = _analyze_password(password)
+        analysis_cache.set(cache_key, result)
+
+    # Hand out a copy so callers cannot alter the cached entry
+    return dict(result, feedback=list(result['feedback']),
+                patterns=list(result['patterns']))
+
+
+def _analyze_password(password):
+    """Uncached implementation of analyze_password"""
+    model = get_password_model()
+
+    # Scan the character composition once for the model, feedback and entropy
+    composition = scan_composition(password)
+
+    # Use ML model to predict strength category (0-4)
+    strength_score = model.predict(password, composition)
+
+    # Convert NumPy types to Python native types for JSON serialization
+    strength_score = int(strength_score)
+
+    # Calculate common password metrics
+    length = composition.length
+    has_lowercase = composition.has_lowercase
+    has_uppercase = composition.has_uppercase
+    has_digit = composition.has_digit
+    has_special = composition.has_special
+
+    # Check the offline breached password index (None if not configured)
+    is_breached = is_password_breached(password)
+
+    # Generate feedback
+    feedback = _generate_feedback(length, has_lowercase, has_uppercase, has_digit,
+                                  has_special, strength_score, is_breached)
+
     # Calculate entropy (rough estimate)
-    charset_size = 0
-    if has_lowercase: charset_size += 26
-    if has_uppercase: charset_size += 26
-    if has_digit: charset_size += 10
-    if has_special: charset_size += 30  # Approximate special character count
+    charset_size = composition.charset_size
 
     entropy = 0
     if charset_size > 0:
         entropy = float(length * (np.log2(charset_size)))
 
+    # Pattern-aware estimate (dictionary words, keyboard walks, dates, ...)
+    guess_estimate = estimate_guesses(password)
+
     # Map strength score to descriptive rating
-    strength_ratings = [
-        "Very Weak", "Weak", "Moderate", "Strong", "Very Strong"
-    ]
-    rating = strength_ratings[min(strength_score, 4)]
+    rating = STRENGTH_RATINGS[min(strength_score, 4)]
 
     return {
         'strength': strength_score,
         'rating': rating,
         'entropy': round(float(entropy), 1),
+        'pattern_entropy': guess_estimate['pattern_entropy'],
+        'guesses_log10': guess_estimate['guesses_log10'],
+        'patterns': guess_estimate['patterns'],
         'length': length,
         'has_lowercase': has_lowercase,
         'has_uppercase': has_uppercase,
         'has_digit': has_digit,
         'has_special': has_special,
+        'is_breached': is_breached,
         'feedback': feedback
     }
+
+
+def analyze_passwords(passwords, patterns=False):
+    """
+    Analyze the strength of many passwords in one vectorized pass
+    
+    Composition checks, entropy and model scoring are computed as arrays
+    over the whole batch; only the per-password result dicts and feedback
+    lists are built in Python.
+    
+    Args:
+        passwords (list): The passwords to analyze
+        patterns (bool): Also run the per-password pattern search
+            (pattern_entropy, guesses_log10, patterns); it runs in Python
+            and costs roughly ten times the rest of the batch analysis
+        
+    Returns:
+        list: One analysis dict per password, in input order, with the same
+              fields as analyze_password (the pattern fields only when
+              patterns is set)
+    """
+    model = get_password_model()
+
+    passwords = list(passwords)
+    if not passwords:
+        return []
+
+    composition = _composition_arrays(passwords)
+    strength_scores = model.predict_batch(passwords, composition)
+
+    lengths = composition['length']
+    has_lowercase = composition['lowercase'] > 0
+    has_uppercase = composition['uppercase'] > 0
+    has_digit = composition['digit'] > 0
+    has_special = composition['special'] > 0
+
+    # Calculate entropy (rough estimate), 0 when no known character class is present
+    charset_sizes = (LOWERCASE_CHARSET_SIZE * has_lowercase
+                     + UPPERCASE_CHARSET_SIZE * has_uppercase
+                     + DIGIT_CHARSET_SIZE * has_digit
+                     + SPECIAL_CHARSET_SIZE * has_special)
+    entropies = lengths * np.log2(np.maximum(charset_sizes, 1))
+
+    results = []
+    for password, strength_score, entropy, length, lower, upper, digit, special in zip(
+            passwords, strength_scores.tolist(), entropies.tolist(), lengths.tolist(),
+            has_lowercase.tolist(), has_uppercase.tolist(), has_digit.tolist(),
+            has_special.tolist()):
+        is_breached = is_password_breached(password)
+        result = {
+            'strength': strength_score,
+            'rating': STRENGTH_RATINGS[min(strength_score, 4)],
+            'entropy': round(entropy, 1)
+        }
+        if patterns:
+            guess_estimate = estimate_guesses(password)
+            result['pattern_entropy'] = guess_estimate['pattern_entropy']
+            result['guesses_log10'] = guess_estimate['guesses_log10']
+            result['patterns'] = guess_estimate['patterns']
+        result.update({
+            'length': length,
+            'has_lowercase': lower,
+            'has_uppercase': upper,
+            'has_digit': digit,
+            'has_special': special,
+            'is_breached': is_breached,
+            'feedback': _generate_feedback(length, lower, upper, digit, special,
+                                           strength_score, is_breached)
+        })
+        results.append(result)
+    return results
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Build the prebuilt password strength model artifacts')
+    parser.add_argument('--output', type=str, default=None,
+                        help='Artifact path (defaults to PASSWORD_MODEL_PATH or password_model.pkl)')
+    parser.add_argument('--compact-output', type=str, default=None,
+                        help='Compact artifact path (defaults to PASSWORD_MODEL_COMPACT_PATH '
+                             'or password_model.npz)')
+    args = parser.parse_args()
+
+    model_path, compact_path = build_model_artifact(args.output, args.compact_output)
+    print(f"Password model artifacts written to {model_path} and {compact_path}")
@@ -0,0 +1,737 @@
+"""
+Pattern-Aware Password Entropy
+Estimates how many guesses an attacker needs for a password, in the style of
+zxcvbn: the password is matched against dictionary, l33t, keyboard-walk,
+repeat, sequence and date patterns, and a dynamic-programming search picks
+the cheapest way to cover it with those matches plus brute-force segments.
+
+The ranked dictionaries are merged once into a single prefix/rank dict index.
+Extra frequency-ranked word lists (one word per line, most common first) can
+be loaded from the directory named by PASSWORD_DICTIONARIES_DIR.
+"""
+
+import os
+import re
+import math
+import logging
+import datetime
+import threading
+from functools import lru_cache
+
+
+# Guess-count constants from the zxcvbn scoring model
+BRUTEFORCE_CARDINALITY = 10
+MIN_GUESSES_BEFORE_GROWING_SEQUENCE = 10000
+MIN_SUBMATCH_GUESSES_SINGLE_CHAR = 10
+MIN_SUBMATCH_GUESSES_MULTI_CHAR = 50
+MIN_YEAR_SPACE = 20
+REFERENCE_YEAR = datetime.date.today().year
+
+# Only this many leading characters are pattern-matched; the rest of a longer
+# password is scored as brute force, which keeps the search within budget on
+# the keystroke endpoint
+MAX_MATCH_LENGTH = 40
+
+# Frequency-ranked built-in dictionaries, most common first
+_BUILTIN_DICTIONARIES = {
+    'passwords': """
+        123456 password 12345678 qwerty 123456789 12345 1234 111111 1234567 dragon
+        123123 baseball abc123 football monkey letmein 696969 shadow master 666666
+        qwertyuiop 123321 mustang 1234567890 michael 654321 superman 1qaz2wsx 7777777
+        121212 000000 qazwsx 123qwe killer trustno1 jordan jennifer zxcvbnm asdfgh
+        hunter buster soccer harley batman andrew tigger sunshine iloveyou 2000
+        charlie robert thomas hockey ranger daniel starwars klaster 112233 george
+        computer michelle jessica pepper 1111 zxcvbn 555555 11111111 131313 freedom
+        777777 pass maggie 159753 aaaaaa ginger princess joshua cheese amanda summer
+        love ashley 6969 nicole chelsea biteme matthew access yankees 987654321
+        dallas austin thunder taylor matrix william corvette hello martin heather
+        secret fucker merlin diamond 1234qwer gfhjkm hammer silver 222222 88888888
+        anthony justin test bailey q1w2e3r4t5 patrick internet scooter orange 11111
+        golfer cookie richard samantha bigdog guitar jackson whatever mickey chicken
+        sparky snoopy maverick phoenix camaro sexy peanut morgan welcome falcon
+        cowboy ferrari samsung andrea smokey steelers joseph mercedes dakota arsenal
+        eagles melissa boomer booboo spider nascar monster tigers yellow xxxxxx
+        123123123 gateway marina diablo bulldog qwer1234 compaq purple hardcore
+        banana junior hannah 123654 porsche lakers iceman money cowboys 987654
+        london tennis 999999 ncc1701 coffee scooby 0000 miller boston q1w2e3r4
+        fuckoff brandon yamaha chester mother forever johnny edward 333333 oliver
+        redsox player nikita knight fender barney midnight please brandy chicago
+        badboy iwantu slayer rangers charles angel flower bigdaddy rabbit wizard
+        bigdick jasper enter rachel chris steven winner adidas victoria natasha
+        1q2w3e4r jasmine winter prince panties marine ghbdtn fishing cocacola casper
+        james 232323 raiders 888888 marlboro gandalf asdfasdf crystal 87654321
+        12344321 sexsex golden blowme bigtits 8675309 panther lauren angela bitch
+        spanky thx1138 angels madison winston shannon mike toyota blowjob jordan23
+        canada sophie apples dick tiger razz 123abc pokemon qazxsw 55555 qwaszx
+        muffin johnson murphy cooper jonathan liverpoo david danielle 159357 jackie
+        1990 123456a 789456 turtle horny abcd1234 scorpion qazwsxedc 101010 butter
+        carlos password1 dennis slipknot qwerty123 booger asdf 1991 black startrek
+        12341234 cameron newyork rainbow nathan john 1992 rocket viking redskins
+        butthead asdfghjkl 1212 sierra peaches gemini doctor wilson sandra helpme
+        qwertyui victor florida dolphin pookie captain tucker blue liverpool theman
+        bandit dolphins maddog packers jaguar lovers nicholas united tiffany maxwell
+        zzzzzz nirvana jeremy suckit stupid porn monica elephant giants jackass
+        hotdog rosebud success debbie mountain 444444 xxxxxxxx warrior 1q2w3e4r5t
+        q1w2e3 123456q albert metallic lucky azerty 7777 shithead alex bond007
+        alexis 1111111 samson 5150 willie scorpio bonnie gators benjamin voodoo
+        driver dexter 2112 jason calvin freddy 212121 creative 12345a sydney
+        rush2112 1989 asdfghjk red123 bubba 4815162342 passw0rd trouble gunner happy
+        admin welcome1 admin123 letmein1 login changeme secret1 iloveyou1
+    """,
+    'english': """
+        you the to it not that and of is what in me this my your for have on do
+        no be we are can all know was get just like but with so he here there
+        out up one about if right she go now how they got want think time well
+        come love good see then back yeah an at did say his oh her from look man
+        let okay tell something why mean will been going would who take never
+        really make us sorry way said them need could little thing when life
+        please great any first money day world night home family friend house
+        water school people work game word power dream heart blue black white
+        green red yellow summer winter spring autumn happy sunshine flower star
+        moon light dark fire earth wind angel devil king queen prince princess
+        dragon tiger lion eagle wolf bear horse monkey cat dog fish bird snake
+        secret freedom welcome hello magic music rock metal love forever baby
+        sweet honey sugar candy apple orange banana cherry lemon chocolate coffee
+        computer internet windows system security access login admin master user
+        guest test private office company business password pass word letter
+        number change thunder storm shadow ghost hunter killer soldier warrior
+        ninja pirate cowboy doctor captain lucky golden silver diamond crystal
+        football baseball soccer hockey tennis golf basketball player winner
+    """,
+    'names': """
+        james john robert michael william david richard charles joseph thomas
+        christopher daniel paul mark donald george kenneth steven edward brian
+        ronald anthony kevin jason matthew gary timothy jose larry jeffrey frank
+        scott eric stephen andrew raymond gregory joshua jerry dennis walter
+        mary patricia linda barbara elizabeth jennifer maria susan margaret
+        dorothy lisa nancy karen betty helen sandra donna carol ruth sharon
+        michelle laura sarah kimberly deborah jessica shirley cynthia angela
+        melissa brenda amy anna rebecca virginia kathleen pamela martha debra
+        amanda stephanie carolyn christine marie janet catherine frances ann
+        smith johnson williams jones brown davis miller wilson moore taylor
+        anderson thomas jackson white harris martin thompson garcia martinez
+        robinson clark rodriguez lewis lee walker hall allen young king wright
+    """,
+}
+
+# Common character substitutions matched by the l33t matcher
+_L33T_TABLE = {
+    'a': '4@', 'b': '8', 'c': '({[<', 'e': '3', 'g': '69', 'i': '1!|',
+    'l': '1|7', 'o': '0', 's': '$5', 't': '+7', 'x': '%', 'z': '2',
+}
+
+# l33t character -> letters it can stand for
+_L33T_CHARS = {}
+for _letter, _subs in _L33T_TABLE.items():
+    for _sub in _subs:
+        _L33T_CHARS.setdefault(_sub, []).append(_letter)
+
+# Keyboard layouts as rows of (unshifted, shifted) keys; None pads the
+# aligned keypad grid. Rows of the slanted keyboard after the first start
+# one column in, so a key's upper neighbours are (x, y-1) and (x+1, y-1).
+_QWERTY_ROWS = [
+    ['`~', '1!', '2@', '3#', '4$', '5%', '6^', '7&', '8*', '9(', '0)', '-_', '=+'],
+    [None, 'qQ', 'wW', 'eE', 'rR', 'tT', 'yY', 'uU', 'iI', 'oO', 'pP', '[{', ']}', '\\|'],
+    [None, 'aA', 'sS', 'dD', 'fF', 'gG', 'hH', 'jJ', 'kK', 'lL', ';:', '\'"'],
+    [None, 'zZ', 'xX', 'cC', 'vV', 'bB', 'nN', 'mM', ',<', '.>', '/?'],
+]
+_KEYPAD_ROWS = [
+    [None, '/', '*', '-'],
+    ['7', '8', '9', '+'],
+    ['4', '5', '6', None],
+    ['1', '2', '3', None],
+    [None, '0', '.', None],
+]
+_SLANTED_DIRECTIONS = [(-1, 0), (0, -1), (1, -1), (1, 0), (0, 1), (-1, 1)]
+_ALIGNED_DIRECTIONS = [(-1, 0), (-1, -1), (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1)]
+
+_SHIFTED_CHARS = frozenset('~!@#$%^&*()_+QWERTYUIOP{}|ASDFGHJKL:"ZXCVBNM<>?')
+
+_REPEAT_GREEDY = re.compile(r'(.+)\1+', re.DOTALL)
+_REPEAT_LAZY = re.compile(r'(.+?)\1+', re.DOTALL)
+_REPEAT_LAZY_ANCHORED = re.compile(r'^(.+?)\1+$', re.DOTALL)
+_RECENT_YEAR = re.compile(r'19\d\d|200\d|201\d|202\d')
+_DATE_WITH_SEPARATOR = re.compile(r'^(\d{1,4})([\s/\\_.-])(\d{1,2})\2(\d{1,4})$')
+_MAX_SEQUENCE_DELTA = 5
+
+# Where to split digit runs of each length into day/month/year candidates
+_DATE_SPLITS = {
+    4: [(1, 2), (2, 3)],
+    5: [(1, 3), (2, 3)],
+    6: [(1, 2), (2, 4), (4, 5)],
+    7: [(1, 3), (2, 3), (4, 5), (4, 6)],
+    8: [(2, 4), (4, 6)],
+}
+_DATE_MIN_YEAR = 1000
+_DATE_MAX_YEAR = 2050
+
+
+def _build_keyboard_graph(rows, directions):
+    """Map every key character to its neighbouring keys, one slot per direction"""
+    positions = {}
+    for y, row in enumerate(rows):
+        for x, key in enumerate(row):
+            if key is not None:
+                positions[(x, y)] = key
+    graph = {}
+    for (x, y), key in positions.items():
+        neighbours = [positions.get((x + dx, y + dy)) for dx, dy in directions]
+        for char in key:
+            graph[char] = neighbours
+    return graph
+
+
+def _graph_stats(graph):
+    """Starting positions and average degree of a keyboard graph"""
+    degrees = [sum(1 for n in neighbours if n) for neighbours in graph.values()]
+    return len(graph), sum(degrees) / len(degrees)
+
+
+_KEYBOARD_GRAPHS = {
+    'qwerty': _build_keyboard_graph(_QWERTY_ROWS, _SLANTED_DIRECTIONS),
+    'keypad': _build_keyboard_graph(_KEYPAD_ROWS, _ALIGNED_DIRECTIONS),
+}
+_KEYBOARD_STATS = {name: _graph_stats(graph) for name, graph in _KEYBOARD_GRAPHS.items()}
+
+
+class _Match:
+    """A matched pattern covering password[i:j + 1] and its guess estimate"""
+    __slots__ = ('pattern', 'i', 'j', 'token', 'guesses')
+
+    def __init__(self, pattern, i, j, token, guesses):
+        self.pattern = pattern
+        self.i = i
+        self.j = j
+        self.token = token
+        self.guesses = guesses
+
+
+# Merged dictionary index, loaded once on first use. Every word maps to its
+# best rank and every proper prefix of a word maps to 0, so one lookup per
+# extended substring both finds words and tells when to stop extending.
+_word_index = None
+_dictionary_lock = threading.Lock()
+
+
+def _load_word_index():
+    """Merge the built-in and configured word lists into one prefix/rank index"""
+    global _word_index
+
+    if _word_index is not None:
+        return _word_index
+    with _dictionary_lock:
+        if _word_index is not None:
+            return _word_index
+
+        word_lists = [text.split() for text in _BUILTIN_DICTIONARIES.values()]
+        directory = os.environ.get('PASSWORD_DICTIONARIES_DIR')
+        if directory:
+            try:
+                for filename in sorted(os.listdir(directory)):
+                    if filename.endswith('.txt'):
+                        with open(os.path.join(directory, filename), encoding='utf-8',
+                                  errors='replace') as f:
+                            word_lists.append([line.strip() for line in f if line.strip()])
+            except OSError as e:
+                logging.error(f"Error loading password dictionaries: {str(e)}")
+
+        # A word listed in several dictionaries keeps its best rank
+        index = {}
+        for words in word_lists:
+            for rank, word in enumerate(words, start=1):
+                word = word.lower()
+                if rank < (index.get(word) or float('inf')):
+                    index[word] = rank
+        for word in list(index):
+            for end in range(1, len(word)):
+                index.setdefault(word[:end], 0)
+        _word_index = index
+    return _word_index
+
+
+def _uppercase_variations(token):
+    """Extra guesses for capitalization beyond all-lowercase"""
+    if token.islower() or not any(c.isupper() for c in token):
+        return 1
+    # Capitalized first letter, last letter, or all caps are the common cases
+    letters = [c for c in token if c.isalpha()]
+    if (token[0].isupper() and not any(c.isupper() for c in token[1:])) or \
+            (token[-1].isupper() and not any(c.isupper() for c in token[:-1])) or \
+            all(c.isupper() for c in letters):
+        return 2
+    upper = sum(1 for c in token if c.isupper())
+    lower = sum(1 for c in token if c.islower())
+    return sum(math.comb(upper + lower, i) for i in range(1, min(upper, lower) + 1))
+
+
+def _l33t_variations(token, substitutions):
+    """Extra guesses for the l33t substitutions used in token"""
+    variations = 1
+    lowered = token.lower()
+    for sub, letter in substitutions.items():
+        subbed = lowered.count(sub)
+        unsubbed = lowered.count(letter)
+        if subbed == 0 or unsubbed == 0:
+            variations *= 2
+        else:
+            variations *= sum(math.comb(subbed + unsubbed, i)
+                              for i in range(1, min(subbed, unsubbed) + 1))
+    return variations
+
+
+def _dictionary_matches(password, lowered, index):
+    """Dictionary words, forwards and reversed, anywhere in the password"""
+    matches = []
+    n = len(password)
+    reversed_lowered = lowered[::-1]
+    for i in range(n):
+        for j in range(i, n):
+            rank = index.get(lowered[i:j + 1])
+            if rank is None:
+                break
+            if rank:
+                token = password[i:j + 1]
+                matches.append(_Match('dictionary', i, j, token,
+                                      rank * _uppercase_variations(token)))
+        for j in range(i + 1, n):
+            reversed_word = reversed_lowered[i:j + 1]
+            rank = index.get(reversed_word)
+            if rank is None:
+                break
+            if rank and reversed_word != reversed_word[::-1]:
+                # Positions in the reversed string map back from the end
+                start, end = n - 1 - j, n - 1 - i
+                token = password[start:end + 1]
+                matches.append(_Match('dictionary', start, end, token,
+                                      rank * _uppercase_variations(token) * 2))
+    return matches
+
+
+def _l33t_substitution_maps(password):
+    """Possible l33t-to-letter maps for the l33t characters in the password"""
+    present = [c for c in dict.fromkeys(password) if c in _L33T_CHARS]
+    maps = [{}]
+    for char in present:
+        maps = [dict(m, **{char: letter}) for m in maps for letter in _L33T_CHARS[char]]
+    return [m for m in maps if m]
+
+
+def _l33t_matches(password, lowered, index):
+    """Dictionary words hidden behind l33t substitutions"""
+    matches = []
+    n = len(password)
+    for substitutions in _l33t_substitution_maps(lowered):
+        unsubbed = lowered.translate(str.maketrans(substitutions))
+        for i in range(n):
+            for j in range(i, n):
+                rank = index.get(unsubbed[i:j + 1])
+                if rank is None:
+                    break
+                if not rank or j == i:
+                    continue
+                token = password[i:j + 1]
+                used = {sub: letter for sub, letter in substitutions.items()
+                        if sub in token}
+                # Words with no substitution are found by the dictionary matcher
+                if not used:
+                    continue
+                matches.append(_Match('l33t', i, j, token,
+                                      rank * _uppercase_variations(token)
+                                      * _l33t_variations(token, used)))
+    return matches
+
+
+def _spatial_guesses(graph_name, length, turns, shifted_count):
+    starting_positions, average_degree = _KEYBOARD_STATS[graph_name]
+    guesses = 0
+    for i in range(2, length + 1):
+        for j in range(1, min(turns, i - 1) + 1):
+            guesses += math.comb(i - 1, j - 1) * starting_positions * average_degree ** j
+    if shifted_count:
+        unshifted = length - shifted_count
+        if unshifted == 0:
+            guesses *= 2
+        else:
+            guesses *= sum(math.comb(shifted_count + unshifted, i)
+                           for i in range(1, min(shifted_count, unshifted) + 1))
+    return guesses
+
+
+def _spatial_matches(password):
+    """Keyboard walks of three or more adjacent keys, e.g. qwerty or 7896"""
+    matches = []
+    n = len(password)
+    for graph_name, graph in _KEYBOARD_GRAPHS.items():
+        i = 0
+        while i < n - 1:
+            j = i + 1
+            last_direction = None
+            turns = 0
+            shifted_count = 1 if graph_name == 'qwerty' and password[i] in _SHIFTED_CHARS else 0
+            while True:
+                found = False
+                if j < n:
+                    char = password[j]
+                    for direction, neighbour in enumerate(graph.get(password[j - 1], ())):
+                        if neighbour and char in neighbour:
+                            found = True
+                            if neighbour.index(char) == 1:
+                                shifted_count += 1
+                            if last_direction != direction:
+                                turns += 1
+                                last_direction = direction
+                            break
+                if found:
+                    j += 1
+                    continue
+                if j - i > 2:
+                    matches.append(_Match('spatial', i, j - 1, password[i:j],
+                                          _spatial_guesses(graph_name, j - i, turns,
+                                                           shifted_count)))
+                i = j
+                break
+    return matches
+
+
+def _repeat_matches(password):
+    """Repeated characters or blocks, e.g. aaaa or abcabc"""
+    matches = []
+    last_index = 0
+    while last_index < len(password):
+        greedy = _REPEAT_GREEDY.search(password, last_index)
+        if not greedy:
+            break
+        lazy = _REPEAT_LAZY.search(password, last_index)
+        if len(greedy.group(0)) > len(lazy.group(0)):
+            match = greedy
+            base = _REPEAT_LAZY_ANCHORED.match(match.group(0)).group(1)
+        else:
+            match = lazy
+            base = match.group(1)
+        i, j = match.start(), match.end() - 1
+        repeat_count = len(match.group(0)) / len(base)
+        base_guesses = _repeat_base_guesses(base)
+        matches.append(_Match('repeat', i, j, match.group(0), base_guesses * repeat_count))
+        last_index = j + 1
+    return matches
+
+
+@lru_cache(maxsize=4096)
+def _repeat_base_guesses(base):
+    """Guesses for the block of a repeat, memoized since common blocks recur"""
+    return _most_guessable(base, _match_all(base))[0]
+
+
+def _sequence_guesses(token, ascending):
+    if token[0] in 'aAzZ019':
+        base_guesses = 4  # Obvious starting points
+    elif token[0].isdigit():
+        base_guesses = 10
+    else:
+        base_guesses = 26
+    if not ascending:
+        base_guesses *= 2
+    return base_guesses * len(token)
+
+
+def _sequence_matches(password):
+    """Runs with a constant code point step, e.g. abcd, 2468 or zyx"""
+    matches = []
+    n = len(password)
+    if n < 2:
+        return matches
+
+    def add(i, j, delta):
+        if (j - i > 1 or abs(delta) == 1) and 0 < abs(delta) <= _MAX_SEQUENCE_DELTA:
+            token = password[i:j + 1]
+            matches.append(_Match('sequence', i, j, token,
+                                  _sequence_guesses(token, delta > 0)))
+
+    i = 0
+    last_delta = None
+    for k in range(1, n):
+        delta = ord(password[k]) - ord(password[k - 1])
+        if last_delta is None:
+            last_delta = delta
+        if delta == last_delta:
+            continue
+        add(i, k - 1, last_delta)
+        i = k - 1
+        last_delta = delta
+    add(i, n - 1, last_delta)
+    return matches
+
+
+def _two_to_four_digit_year(year):
+    if year > 99:
+        return year
+    return 1900 + year if year > 50 else 2000 + year
+
+
+def _day_month(pair):
+    for day, month in (pair, pair[::-1]):
+        if 1 <= day <= 31 and 1 <= month <= 12:
+            return day, month
+    return None
+
+
+def _date_year(ints):
+    """Year of a plausible (day, month, year) reading of three integers, or None"""
+    if ints[1] > 31 or ints[1] <= 0:
+        return None
+    over_12 = over_31 = under_1 = 0
+    for value in ints:
+        if 99 < value < _DATE_MIN_YEAR or value > _DATE_MAX_YEAR:
+            return None
+        over_31 += value > 31
+        over_12 += value > 12
+        under_1 += value <= 0
+    if over_31 >= 2 or over_12 == 3 or under_1 >= 2:
+        return None
+
+    year_splits = [(ints[2], ints[0:2]), (ints[0], ints[1:3])]
+    for year, rest in year_splits:
+        if _DATE_MIN_YEAR <= year <= _DATE_MAX_YEAR:
+            return year if _day_month(rest) else None
+    for year, rest in year_splits:
+        if _day_month(rest):
+            return _two_to_four_digit_year(year)
+    return None
+
+
+def _date_guesses(year, has_separator):
+    guesses = max(abs(year - REFERENCE_YEAR), MIN_YEAR_SPACE) * 365
+    return guesses * 4 if has_separator else guesses
+
+
+@lru_cache(maxsize=4096)
+def _digit_date_year(token):
+    """Year of the split of a digit run closest to REFERENCE_YEAR, or None"""
+    best_year = None
+    for k, l in _DATE_SPLITS[len(token)]:
+        year = _date_year([int(token[:k]), int(token[k:l]), int(token[l:])])
+        if year is not None and (best_year is None or
+                                 abs(year - REFERENCE_YEAR) < abs(best_year - REFERENCE_YEAR)):
+            best_year = year
+    return best_year
+
+
+def _date_matches(password):
+    """Dates with or without separators, e.g. 13051985, 5/13/85 or 1985-05-13"""
+    matches = []
+    n = len(password)
+    for i in range(n - 3):
+        for j in range(i + 3, min(n, i + 8)):
+            token = password[i:j + 1]
+            if not token.isdigit():
+                break
+            best_year = _digit_date_year(token)
+            if best_year is not None:
+                matches.append(_Match('date', i, j, token, _date_guesses(best_year, False)))
+
+    for i in range(n - 5):
+        for j in range(i + 5, min(n, i + 10)):
+            token = password[i:j + 1]
+            parsed = _DATE_WITH_SEPARATOR.match(token)
+            if not parsed:
+                continue
+            year = _date_year([int(parsed.group(1)), int(parsed.group(3)), int(parsed.group(4))])
+            if year is not None:
+                matches.append(_Match('date', i, j, token, _date_guesses(year, True)))
+    return matches
+
+
+def _year_matches(password):
+    """Recent years on their own, e.g. 1987 or 2024"""
+    return [_Match('year', m.start(), m.end() - 1, m.group(0),
+                   max(abs(int(m.group(0)) - REFERENCE_YEAR), MIN_YEAR_SPACE))
+            for m in _RECENT_YEAR.finditer(password)]
+
+
+def _match_all(password):
+    """Run every matcher over the password"""
+    index = _load_word_index()
+    lowered = password.lower()
+    return (_dictionary_matches(password, lowered, index)
+            + _l33t_matches(password, lowered, index)
+            + _spatial_matches(password)
+            + _repeat_matches(password)
+            + _sequence_matches(password)
+            + _date_matches(password)
+            + _year_matches(password))
+
+
+def _min_guesses(length, n):
+    """Lower bound on a match's guesses, so short matches are not free"""
+    if length == n:
+        return 1
+    if length == 1:
+        return MIN_SUBMATCH_GUESSES_SINGLE_CHAR
+    return MIN_SUBMATCH_GUESSES_MULTI_CHAR
+
+
+def _bruteforce_guesses(length):
+    """Guesses for an unmatched run of characters"""
+    return max(BRUTEFORCE_CARDINALITY ** length,
+               MIN_SUBMATCH_GUESSES_MULTI_CHAR + 1 if length > 1
+               else MIN_SUBMATCH_GUESSES_SINGLE_CHAR + 1)
+
+
+def _greedy_guesses(n, matches):
+    """
+    Score of one valid covering, the longest match at each position with
+    brute force in between; an upper bound for _most_guessable's search
+    """
+    longest = {}
+    for match in matches:
+        best = longest.get(match.i)
+        if best is None or (match.j, -match.guesses) > (best.j, -best.guesses):
+            longest[match.i] = match
+    pi = 1
+    length = 0
+    gap = 0
+    k = 0
+    while k < n:
+        match = longest.get(k)
+        if match is None:
+            gap += 1
+            k += 1
+            continue
+        if gap:
+            pi *= max(_bruteforce_guesses(gap), _min_guesses(gap, n))
+            length += 1
+            gap = 0
+        pi *= max(match.guesses, _min_guesses(match.j - match.i + 1, n))
+        length += 1
+        k = match.j + 1
+    if gap:
+        pi *= max(_bruteforce_guesses(gap), _min_guesses(gap, n))
+        length += 1
+    return math.factorial(length) * pi + MIN_GUESSES_BEFORE_GROWING_SEQUENCE ** (length - 1)
+
+
+def _most_guessable(password, matches):
+    """
+    Find the match sequence that minimizes the total guess estimate.
+
+    optimal_g[k][l] is the best score for password[:k + 1] covered by exactly
+    l matches: l! * product(match guesses) + D^(l - 1), which penalizes
+    chopping the password into many small pieces. Gaps between matches are
+    filled with brute-force segments.
+
+    Extending a sequence never lowers its score, so partial sequences
+    scoring above a greedy covering of the whole password cannot win and
+    are not kept; the states at or below that bound, and so the result,
+    are the same as without it. This prunes most of the search, above all
+    for repeat-shaped passwords. In the rare case where the search cannot
+    finish under the bound, it is run again without one.
+
+    Returns:
+        tuple: (guesses, list of _Match covering the password)
+    """
+    n = len(password)
+    if n == 0:
+        return 1, []
+
+    matches_by_end = [[] for _ in range(n)]
+    for match in matches:
+        matches_by_end[match.j].append(match)
+
+    bound = _greedy_guesses(n, matches)
+    result = _search(password, matches_by_end, bound)
+    if result is None:
+        result = _search(password, matches_by_end, math.inf)
+    return result
+
+
+def _search(password, matches_by_end, bound):
+    """The dynamic program of _most_guessable; None if nothing scores <= bound"""
+    n = len(password)
+    optimal_match = [{} for _ in range(n)]
+    optimal_pi = [{} for _ in range(n)]
+    optimal_g = [{} for _ in range(n)]
+
+    factorials = [math.factorial(length) for length in range(n + 1)]
+    sequence_penalties = [MIN_GUESSES_BEFORE_GROWING_SEQUENCE ** (length - 1)
+                          for length in range(n + 1)]
+    # Positions where some kept sequence ends in a non-brute-force match
+    match_ends = []
+
+    def update(i, k, guesses, length, match=None):
+        pi = max(guesses, _min_guesses(k - i + 1, n))
+        if length > 1:
+            pi *= optimal_pi[i - 1][length - 1]
+        g = factorials[length] * pi + sequence_penalties[length]
+        if g > bound:
+            return
+        for competing_length, competing_g in optimal_g[k].items():
+            if competing_length <= length and competing_g <= g:
+                return
+        if match is None:
+            match = _Match('bruteforce', i, k, password[i:k + 1], guesses)
+        optimal_g[k][length] = g
+        optimal_match[k][length] = match
+        optimal_pi[k][length] = pi
+
+    for k in range(n):
+        for match in matches_by_end[k]:
+            if match.i > 0:
+                for length in optimal_match[match.i - 1]:
+                    update(match.i, k, match.guesses, length + 1, match)
+            else:
+                update(0, k, match.guesses, 1, match)
+
+        # Brute force from the start, or after any non-brute-force match
+        update(0, k, _bruteforce_guesses(k + 1), 1)
+        for end in match_ends:
+            i = end + 1
+            guesses = None
+            for length, last_match in optimal_match[end].items():
+                if last_match.pattern != 'bruteforce':
+                    guesses = guesses or _bruteforce_guesses(k - i + 1)
+                    update(i, k, guesses, length + 1)
+        if any(last_match.pattern != 'bruteforce' for last_match in optimal_match[k].values()):
+            match_ends.append(k)
+
+    # Unwind the best sequence for the whole password
+    k = n - 1
+    if not optimal_g[k]:
+        return None
+    length = min(optimal_g[k], key=optimal_g[k].get)
+    guesses = optimal_g[k][length]
+    sequence = []
+    while k >= 0:
+        match = optimal_match[k][length]
+        sequence.append(match)
+        k = match.i - 1
+        length -= 1
+    sequence.reverse()
+    return guesses, sequence
+
+
+def estimate_guesses(password):
+    """
+    Estimate the guesses needed to crack a password from its patterns
+
+    Args:
+        password (str): The password to evaluate
+
+    Returns:
+        dict: guesses_log10, pattern_entropy (log2 of the guesses, in bits)
+              and the pattern names of the cheapest match sequence
+    """
+    head = password[:MAX_MATCH_LENGTH]
+    guesses, sequence = _most_guessable(head, _match_all(head))
+
+    # Characters past the matched prefix are scored as brute force
+    tail_length = len(password) - len(head)
+    guesses_log10 = math.log10(guesses) + tail_length * math.log10(BRUTEFORCE_CARDINALITY)
+    patterns = [match.pattern for match in sequence]
+    if tail_length:
+        patterns.append('bruteforce')
+
+    return {
+        'guesses_log10': round(guesses_log10, 2),
+        'pattern_entropy': round(guesses_log10 * math.log2(10), 1),
+        'patterns': patterns
+    }
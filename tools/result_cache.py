@@ -0,0 +1,310 @@
+"""
+Result Cache
+Bounded, thread-safe result caches with optional per-entry expiry: an
+in-process LRU, a SQLite store shared by every worker process on a host,
+and single-flight coalescing of concurrent computations of the same key
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import partial
+
+
+class LRUCache:
+    """
+    A bounded least-recently-used cache with optional time-to-live.
+
+    Entries past their expiry are treated as misses and dropped on access.
+    All operations are guarded by a lock so one instance can be shared by
+    the threads of a worker process.
+    """
+
+    def __init__(self, maxsize=1024, ttl=None, clock=time.monotonic):
+        """
+        Args:
+            maxsize (int): Maximum number of entries kept (0 disables caching)
+            ttl (float, optional): Default lifetime of an entry in seconds
+                (None: no expiry, <= 0: entries are not stored)
+            clock (callable): Monotonic time source, replaceable for testing
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default on a miss or expiry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                if expires_at is None or expires_at > self._clock():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a value, evicting the least recently used entry when full.
+
+        Args:
+            key: Hashable cache key
+            value: Value to cache
+            ttl (float, optional): Lifetime in seconds, overriding the default;
+                None means no expiry and a value <= 0 stores nothing
+        """
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        if ttl is not None and ttl <= 0:
+            with self._lock:
+                self._entries.pop(key, None)
+            return
+        expires_at = None if ttl is None else self._clock() + ttl
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        """Remove key from the cache if present"""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop every entry; hit and miss counters are kept"""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """
+        Report cache effectiveness.
+
+        Returns:
+            dict: Hits, misses, hit rate, evictions, current size and limits
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl
+            }
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    A bounded cache stored in a local SQLite database.
+
+    Every process that opens the same file shares its entries, so one
+    worker's result is a hit for the others. Values are stored as JSON
+    (or with the given encode/decode pair). Each thread uses its own connection; when the cache
+    grows past maxsize the entries closest to expiry are dropped first.
+    """
+
+    # Expired entries are purged and the size checked once per this many writes
+    PRUNE_INTERVAL = 64
+
+    def __init__(self, path, maxsize=100000, ttl=None, clock=time.time,
+                 encode=None, decode=json.loads):
+        """
+        Args:
+            path (str): Database file, created if missing
+            maxsize (int): Maximum number of entries kept (0 disables caching)
+            ttl (float, optional): Default lifetime of an entry in seconds
+                (None: no expiry, <= 0: entries are not stored)
+            clock (callable): Wall-clock time source shared by all processes
+            encode (callable, optional): Serializes a value to str or bytes
+                (default: compact JSON)
+            decode (callable): Turns a stored value back into an object
+        """
+        self.path = path
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._encode = encode or partial(json.dumps, separators=(',', ':'))
+        self._decode = decode
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._connect()
+
+    def _connect(self):
+        """Return this thread's connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('CREATE TABLE IF NOT EXISTS cache_entries ('
+                         'key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL)')
+            self._local.conn = conn
+        return conn
+
+    def get(self, key, default=None):
+        """Return the cached value for key, or default on a miss or expiry"""
+        row = self._connect().execute(
+            'SELECT value FROM cache_entries WHERE key = ? '
+            'AND (expires_at IS NULL OR expires_at > ?)',
+            (key, self._clock())).fetchone()
+        with self._lock:
+            if row is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+        return self._decode(row[0])
+
+    def set(self, key, value, ttl=None):
+        """
+        Store a value, replacing any existing entry for key.
+
+        Args:
+            key (str): Cache key
+            value: Value to cache, serializable by the cache's encode
+            ttl (float, optional): Lifetime in seconds, overriding the default;
+                None means no expiry and a value <= 0 stores nothing
+        """
+        if self.maxsize <= 0:
+            return
+        ttl = self.ttl if ttl is None else ttl
+        now = self._clock()
+        conn = self._connect()
+        if ttl is not None and ttl <= 0:
+            conn.execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+            return
+        conn.execute('INSERT OR REPLACE INTO cache_entries (key, value, expires_at) '
+                     'VALUES (?, ?, ?)',
+                     (key, self._encode(value),
+                      None if ttl is None else now + ttl))
+        with self._lock:
+            self._writes += 1
+            prune = self._writes % self.PRUNE_INTERVAL == 0
+        if prune:
+            self._prune(conn, now)
+
+    def _prune(self, conn, now):
+        """Purge expired entries and trim the table back to maxsize"""
+        conn.execute('DELETE FROM cache_entries WHERE expires_at <= ?', (now,))
+        excess = conn.execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0] - self.maxsize
+        if excess > 0:
+            # Entries without expiry sort last and are evicted last
+            conn.execute('DELETE FROM cache_entries WHERE key IN ('
+                         'SELECT key FROM cache_entries '
+                         'ORDER BY expires_at IS NULL, expires_at LIMIT ?)', (excess,))
+            with self._lock:
+                self.evictions += excess
+
+    def delete(self, key):
+        """Remove key from the cache if present"""
+        self._connect().execute('DELETE FROM cache_entries WHERE key = ?', (key,))
+
+    def clear(self):
+        """Drop every entry; hit and miss counters are kept"""
+        self._connect().execute('DELETE FROM cache_entries')
+
+    def stats(self):
+        """
+        Report cache effectiveness for this process.
+
+        Returns:
+            dict: Hits, misses, hit rate, evictions, current size and limits
+        """
+        size = len(self)
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else 0.0,
+                'evictions': self.evictions,
+                'size': size,
+                'maxsize': self.maxsize,
+                'ttl': self.ttl
+            }
+
+    def __len__(self):
+        return self._connect().execute('SELECT COUNT(*) FROM cache_entries').fetchone()[0]
+
+
+class _Flight:
+    """A computation in progress that other callers can wait on"""
+
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent computations of the same key.
+
+    While one thread computes a key, other threads asking for the same key
+    wait for that computation and share its result (or its exception)
+    instead of starting their own.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+        self.coalesced = 0
+
+    def do(self, key, function, *args, **kwargs):
+        """
+        Return function(*args, **kwargs), sharing one call per key at a time
+
+        Args:
+            key: Hashable key identifying the computation
+            function (callable): Computation run by the first caller
+
+        Returns:
+            The result of the single shared call
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = function(*args, **kwargs)
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result